@@ -16,7 +16,10 @@ from .db import init_db
 from .db_bootstrap import ensure_database_exists
 from .auth.routes import auth_bp
 from .bankruptcy.routes import bankruptcy_bp
+from .bankruptcy.service import warm_bankruptcy_runtime
+from .rag.query_log_writer import start_query_log_writer
 from .rag.routes import rag_bp
+from .rag.worker import start_embedded_index_workers
 from .user.routes import user_bp
 from .workspace.routes import workspace_bp
 from .logging_utils import ACCESS_LOGGER_NAME, REQUEST_ID_HEADER, bind_log_context, clear_log_context, configure_logging
@@ -115,6 +118,12 @@ def create_app(config_overrides: dict | None = None) -> Flask:
     init_db(app)
     if app.config.get("AGENT_CHAT_JOBS_ENABLED", True):
         initialize_agent_chat_jobs(app)
+    if app.config.get("RAG_INDEX_QUEUE_MODE", "embedded") == "embedded" and not app.config.get("TESTING", False):
+        start_embedded_index_workers(app)
+    if app.config.get("RAG_QUERY_LOG_ASYNC", True) and not app.config.get("TESTING", False):
+        start_query_log_writer(app)
+    if app.config.get("BANKRUPTCY_ANALYSIS_ENABLED") and app.config.get("BANKRUPTCY_WARM_RUNTIME_ON_STARTUP"):
+        warm_bankruptcy_runtime(app)
 
     if app.config.get("EMAIL_BACKEND") == "memory":
         app.extensions["email_outbox"] = []
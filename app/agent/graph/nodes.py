@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import Any
+from typing import Any, Callable
 
 from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
 from pydantic import BaseModel, Field
@@ -58,11 +58,11 @@ class PlannerOutput(BaseModel):
     clarification_question: str = Field(default="")
 
 
-def _extract_segment_context(chunk: dict) -> tuple[str, str] | None:
+def _extract_segment_context(chunk: dict, segments: dict[str, str]) -> tuple[str, str] | None:
     semantic_segment = chunk.get("semantic_segment")
     if isinstance(semantic_segment, dict):
         seg_id = str(semantic_segment.get("id", "")).strip()
-        seg_text = str(semantic_segment.get("text", "")).strip()
+        seg_text = str(segments.get(seg_id) or semantic_segment.get("text", "")).strip()
         if seg_id and seg_text:
             return seg_id, seg_text
     metadata = chunk.get("metadata")
@@ -234,6 +234,7 @@ def plan_route_node(state: AgentState):
         "search_completed": False,
         "mcp_completed": False,
         "rag_chunks": [],
+        "rag_segments": {},
         "rag_citations": [],
         "rag_no_evidence": False,
         "rag_debug": {},
@@ -294,6 +295,7 @@ def search_subagent_node(state: AgentState):
             "graph_data": {},
             "graph_meta": {},
             "rag_chunks": [],
+            "rag_segments": {},
             "rag_debug": {},
             "sufficient": False,
             "status": "pending",
@@ -317,6 +319,7 @@ def search_subagent_node(state: AgentState):
         "graph_data": result.get("graph_data", {}) if isinstance(result.get("graph_data"), dict) else {},
         "graph_meta": result.get("graph_meta", {}) if isinstance(result.get("graph_meta"), dict) else {},
         "rag_chunks": result.get("rag_chunks", []) if isinstance(result.get("rag_chunks"), list) else [],
+        "rag_segments": result.get("rag_segments", {}) if isinstance(result.get("rag_segments"), dict) else {},
         "rag_debug": result.get("rag_debug", {}) if isinstance(result.get("rag_debug"), dict) else {},
         "debug": {
             **(state.get("debug", {}) if isinstance(state.get("debug"), dict) else {}),
@@ -417,12 +420,15 @@ def _build_system_content(state: AgentState) -> str:
 
     rag_chunks = state.get("rag_chunks", [])
     if isinstance(rag_chunks, list) and rag_chunks:
+        rag_segments = state.get("rag_segments", {})
+        if not isinstance(rag_segments, dict):
+            rag_segments = {}
         segment_contexts: list[tuple[str, str]] = []
         seen_segment_ids: set[str] = set()
         for item in rag_chunks:
             if not isinstance(item, dict):
                 continue
-            segment_context = _extract_segment_context(item)
+            segment_context = _extract_segment_context(item, rag_segments)
             if segment_context is None:
                 continue
             segment_id, segment_text = segment_context
@@ -465,13 +471,39 @@ def _history_messages_for_compose(state: AgentState, *, limit: int = _MAX_COMPOS
     return normalized
 
 
+def _stream_reply(llm: Any, messages: list[Any], on_token: Callable[[str], None]) -> str:
+    parts: list[str] = []
+    pending = ""
+    started = False
+    for chunk in llm.stream(messages):
+        text = getattr(chunk, "content", "")
+        if not isinstance(text, str) or not text:
+            continue
+        parts.append(text)
+        if not started:
+            text = text.lstrip()
+            if not text:
+                continue
+            started = True
+        pending += text
+        emitted = pending.rstrip()
+        if emitted:
+            on_token(emitted)
+            pending = pending[len(emitted) :]
+    return "".join(parts)
+
+
 def compose_answer_node(state: AgentState):
     llm = state["main_llm"]
     system_content = _build_system_content(state)
     history_messages = _history_messages_for_compose(state)
     messages: list[Any] = [SystemMessage(content=system_content), *history_messages, HumanMessage(content=state["user_message"])]
-    response = llm.invoke(messages)
-    reply = str(getattr(response, "content", "")).strip()
+    on_token = state.get("stream_callback")
+    if callable(on_token) and hasattr(llm, "stream"):
+        reply = _stream_reply(llm, messages, on_token).strip()
+    else:
+        response = llm.invoke(messages)
+        reply = str(getattr(response, "content", "")).strip()
     if not reply:
         reply = "暂时无法生成有效回复，请稍后重试。"
     return {"reply": reply}
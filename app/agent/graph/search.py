@@ -1,7 +1,11 @@
 from __future__ import annotations
 
-from typing import Any, TypedDict
+import logging
+from contextvars import copy_context
+from threading import Event, Lock, Thread
+from typing import Any, Callable, TypedDict
 
+from flask import current_app, has_app_context
 from langgraph.graph import END, START, StateGraph
 from pydantic import BaseModel, Field
 
@@ -13,6 +17,16 @@ from .source_intent import (
     has_private_knowledge_intent,
 )
 
+logger = logging.getLogger(__name__)
+
+_LOOKUP_TIMEOUTS = {
+    "kg_lookup": ("AGENT_SEARCH_KG_TIMEOUT_SECONDS", "kg_result", "knowledge graph lookup"),
+    "rag_lookup": ("AGENT_SEARCH_RAG_TIMEOUT_SECONDS", "rag_result", "rag lookup"),
+    "web_lookup": ("AGENT_SEARCH_WEB_TIMEOUT_SECONDS", "web_result", "web lookup"),
+}
+_inflight_lookups_lock = Lock()
+_inflight_lookups = 0
+
 _KNOWLEDGE_HINTS = (
     "根据",
     "文档",
@@ -60,6 +74,7 @@ class SearchState(TypedDict):
     graph_data: dict[str, Any]
     graph_meta: dict[str, Any]
     rag_chunks: list[dict[str, Any]]
+    rag_segments: dict[str, str]
     rag_debug: dict[str, Any]
     sufficient: bool
     status: str
@@ -262,6 +277,7 @@ def _search_plan_node(state: SearchState):
         "graph_data": {},
         "graph_meta": {},
         "rag_chunks": [],
+        "rag_segments": {},
         "rag_debug": {},
         "sufficient": False,
         "status": "pending",
@@ -270,28 +286,92 @@ def _search_plan_node(state: SearchState):
     }
 
 
-def _route_after_plan(state: SearchState) -> str:
-    if state.get("use_kg", False):
-        return "kg_lookup"
-    if state.get("use_rag", False):
-        return "rag_lookup"
-    if state.get("use_web", False):
-        return "web_lookup"
-    return "merge_results"
-
-
-def _route_after_kg(state: SearchState) -> str:
-    if state.get("use_rag", False):
-        return "rag_lookup"
-    if state.get("use_web", False):
-        return "web_lookup"
-    return "merge_results"
-
+def _route_after_plan(state: SearchState) -> list[str] | str:
+    lookups = [
+        name
+        for name, enabled in (
+            ("kg_lookup", state.get("use_kg", False)),
+            ("rag_lookup", state.get("use_rag", False)),
+            ("web_lookup", state.get("use_web", False)),
+        )
+        if enabled
+    ]
+    return lookups or "merge_results"
+
+
+def _track_inflight_lookup(delta: int) -> int:
+    global _inflight_lookups
+    with _inflight_lookups_lock:
+        _inflight_lookups += delta
+        return _inflight_lookups
+
+
+def _run_lookup_with_timeout(
+    node_name: str,
+    lookup: Callable[[SearchState], dict[str, Any]],
+    state: SearchState,
+    timeout_seconds: float,
+) -> dict[str, Any] | None:
+    # Each lookup gets its own thread instead of a slot in a shared pool: a lookup that
+    # hangs past its timeout is abandoned but cannot queue up later turns' lookups, and
+    # the timeout only starts once the lookup is actually running.
+    started = Event()
+    finished = Event()
+    outcome: dict[str, Any] = {}
+    context = copy_context()
+
+    def _target() -> None:
+        started.set()
+        try:
+            outcome["result"] = context.run(lookup, state)
+        except BaseException as exc:
+            outcome["error"] = exc
+        finally:
+            _track_inflight_lookup(-1)
+            finished.set()
+
+    inflight = _track_inflight_lookup(1)
+    saturation_threshold = int(current_app.config.get("AGENT_SEARCH_LOOKUP_SATURATION_THRESHOLD", 8))
+    if inflight > saturation_threshold:
+        logger.warning(
+            "Search lookups are piling up; earlier lookups may be hung",
+            extra={
+                "event": "agent.search.lookup_saturated",
+                "lookup": node_name,
+                "inflight_lookups": inflight,
+                "threshold": saturation_threshold,
+            },
+        )
+    try:
+        Thread(target=_target, name=f"agent-search-{node_name}", daemon=True).start()
+    except BaseException:
+        _track_inflight_lookup(-1)
+        raise
+    started.wait()
+    if not finished.wait(timeout_seconds):
+        return None
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome["result"]
+
+
+def _with_lookup_timeout(node_name: str, lookup: Callable[[SearchState], dict[str, Any]]):
+    config_key, result_key, label = _LOOKUP_TIMEOUTS[node_name]
+
+    def _node(state: SearchState):
+        timeout_seconds = float(current_app.config.get(config_key, 0) or 0) if has_app_context() else 0.0
+        if timeout_seconds <= 0:
+            return lookup(state)
+        result = _run_lookup_with_timeout(node_name, lookup, state, timeout_seconds)
+        if result is None:
+            logger.warning(
+                "Search lookup timed out",
+                extra={"event": "agent.search.lookup_timeout", "lookup": node_name, "timeout_seconds": timeout_seconds},
+            )
+            return {result_key: {"ok": False, "error": f"{label} timed out after {timeout_seconds:g}s"}}
+        return result
 
-def _route_after_rag(state: SearchState) -> str:
-    if state.get("use_web", False):
-        return "web_lookup"
-    return "merge_results"
+    return _node
 
 
 def _kg_lookup_node(state: SearchState):
@@ -343,6 +423,9 @@ def _rag_lookup_node(state: SearchState):
         chunks = result.get("chunks", [])
         if isinstance(chunks, list):
             payload["rag_chunks"] = [item for item in chunks if isinstance(item, dict)]
+        segments = result.get("segments", {})
+        if isinstance(segments, dict):
+            payload["rag_segments"] = segments
         debug_payload = result.get("debug", {})
         if isinstance(debug_payload, dict):
             payload["rag_debug"] = debug_payload
@@ -474,39 +557,19 @@ def _merge_results_node(state: SearchState):
 def build_search_graph():
     builder = StateGraph(SearchState)
     builder.add_node("search_plan", _search_plan_node)
-    builder.add_node("kg_lookup", _kg_lookup_node)
-    builder.add_node("rag_lookup", _rag_lookup_node)
-    builder.add_node("web_lookup", _web_lookup_node)
+    builder.add_node("kg_lookup", _with_lookup_timeout("kg_lookup", _kg_lookup_node))
+    builder.add_node("rag_lookup", _with_lookup_timeout("rag_lookup", _rag_lookup_node))
+    builder.add_node("web_lookup", _with_lookup_timeout("web_lookup", _web_lookup_node))
     builder.add_node("merge_results", _merge_results_node)
 
     builder.add_edge(START, "search_plan")
     builder.add_conditional_edges(
         "search_plan",
         _route_after_plan,
-        {
-            "kg_lookup": "kg_lookup",
-            "rag_lookup": "rag_lookup",
-            "web_lookup": "web_lookup",
-            "merge_results": "merge_results",
-        },
-    )
-    builder.add_conditional_edges(
-        "kg_lookup",
-        _route_after_kg,
-        {
-            "rag_lookup": "rag_lookup",
-            "web_lookup": "web_lookup",
-            "merge_results": "merge_results",
-        },
-    )
-    builder.add_conditional_edges(
-        "rag_lookup",
-        _route_after_rag,
-        {
-            "web_lookup": "web_lookup",
-            "merge_results": "merge_results",
-        },
+        ["kg_lookup", "rag_lookup", "web_lookup", "merge_results"],
     )
+    builder.add_edge("kg_lookup", "merge_results")
+    builder.add_edge("rag_lookup", "merge_results")
     builder.add_edge("web_lookup", "merge_results")
     builder.add_edge("merge_results", END)
     return builder.compile()
@@ -35,6 +35,7 @@ class AgentState(TypedDict):
     mcp_enabled: bool
     rag_debug_enabled: bool
     rag_chunks: list[dict]
+    rag_segments: dict[str, str]
     rag_citations: list[dict]
     rag_no_evidence: bool
     rag_debug: dict[str, Any]
@@ -42,3 +43,4 @@ class AgentState(TypedDict):
     graph_meta: dict[str, Any]
     debug: dict[str, Any]
     reply: str
+    stream_callback: Any
@@ -264,20 +264,28 @@ def run_agent_chat_job(app: Flask, job_id: int) -> None:
                     role=job.role,
                     conversation_id=job.conversation_id,
                 )
-                result = generate_reply_payload(
-                    role=job.role,
-                    system_prompt=preset["systemPrompt"],
-                    user_message=job.message,
-                    user_id=job.user_id,
-                    workspace_id=job.workspace_id,
-                    conversation_history=conversation_history,
-                    conversation_context=conversation_context,
-                    rag_debug_enabled=debug_enabled,
-                    entity=str(job.entity or ""),
-                    intent=str(job.intent or ""),
-                    agent_trace_enabled=trace_enabled,
-                    agent_trace_debug_details_enabled=trace_details_enabled,
-                )
+
+            result = generate_reply_payload(
+                role=job.role,
+                system_prompt=preset["systemPrompt"],
+                user_message=job.message,
+                user_id=job.user_id,
+                workspace_id=job.workspace_id,
+                conversation_history=conversation_history,
+                conversation_context=conversation_context,
+                rag_debug_enabled=debug_enabled,
+                entity=str(job.entity or ""),
+                intent=str(job.intent or ""),
+                agent_trace_enabled=trace_enabled,
+                agent_trace_debug_details_enabled=trace_details_enabled,
+            )
+
+            with session_scope() as db:
+                job = db.execute(
+                    select(AgentChatJob).where(AgentChatJob.id == job_id).with_for_update()
+                ).scalar_one_or_none()
+                if job is None or job.status in TERMINAL_JOB_STATUSES:
+                    return
                 save_conversation_turn(
                     db,
                     thread=thread,
@@ -173,6 +173,8 @@ def save_conversation_turn(
     assistant_content = str(assistant_result.get("reply", "")).strip()
     if not user_content and not assistant_content:
         return
+    if thread not in db:
+        thread = db.get(AgentConversationThread, thread.id, with_for_update=True) or db.merge(thread)
 
     now = datetime.utcnow()
     if user_content:
@@ -3,7 +3,7 @@ from __future__ import annotations
 import logging
 from pathlib import Path
 from threading import Lock
-from typing import Any
+from typing import Any, Callable
 from urllib.parse import urlsplit, urlunsplit
 
 from flask import current_app
@@ -668,6 +668,7 @@ def generate_reply_payload(
     intent: str = "",
     agent_trace_enabled: bool = False,
     agent_trace_debug_details_enabled: bool = False,
+    on_token: Callable[[str], None] | None = None,
 ) -> dict[str, Any]:
     entity_text = str(entity or "").strip()
     graph_intent_text = str(intent or "").strip()
@@ -729,6 +730,7 @@ def generate_reply_payload(
             "rag_debug_enabled": bool(rag_debug_enabled),
             "rag_decision": "skip",
             "rag_chunks": [],
+            "rag_segments": {},
             "rag_citations": [],
             "rag_no_evidence": False,
             "rag_debug": {},
@@ -736,6 +738,7 @@ def generate_reply_payload(
             "graph_meta": {},
             "debug": {},
             "reply": "",
+            "stream_callback": on_token,
         }
         output = runtime["graph"].invoke(state)
         reply = str(output.get("reply", "")).strip()
@@ -3,23 +3,23 @@ from __future__ import annotations
 from flask import current_app
 
 from ...rag.errors import RAGAuthorizationError, RAGValidationError
-from ...rag.service import rag_search
+from ...rag.pipeline.chunking import parse_sentence_offsets
+from ...rag.service import load_hit_segment_texts, rag_search
 from .base import AgentToolSpec
 from .context import AgentToolContext
 
 
-def _semantic_segment_payload(metadata: dict) -> dict | None:
+def _semantic_segment_payload(metadata: dict, segment_texts: dict[str, str]) -> dict | None:
     if not isinstance(metadata, dict):
         return None
     segment_id = metadata.get("semantic_segment_id")
-    segment_text = metadata.get("semantic_segment_text")
+    segment_text = metadata.get("semantic_segment_text") or segment_texts.get(str(segment_id))
     if not isinstance(segment_id, str) or not segment_id.strip():
         return None
     if not isinstance(segment_text, str) or not segment_text.strip():
         return None
     return {
         "id": segment_id,
-        "text": segment_text,
         "index": metadata.get("semantic_segment_index"),
         "sentenceIndex": metadata.get("semantic_sentence_index"),
         "sentenceCount": metadata.get("semantic_segment_sentence_count"),
@@ -28,6 +28,7 @@ def _semantic_segment_payload(metadata: dict) -> dict | None:
         "topic": metadata.get("semantic_segment_topic"),
         "summary": metadata.get("semantic_segment_summary"),
         "source": metadata.get("semantic_segment_source"),
+        "sentenceOffsets": parse_sentence_offsets(metadata),
     }
 
 
@@ -53,9 +54,18 @@ def create_rag_search_tool(context: AgentToolContext) -> AgentToolSpec:
                 debug_payload = {}
         except (RAGValidationError, RAGAuthorizationError) as exc:
             return {"ok": False, "error": str(exc)}
-        return {
-            "ok": True,
-            "chunks": [
+        segment_texts = load_hit_segment_texts(user_id=context.user_id, workspace_id=context.workspace_id, hits=hits)
+        chunks: list[dict] = []
+        segments: dict[str, str] = {}
+        for hit in hits:
+            semantic_segment = _semantic_segment_payload(hit.metadata, segment_texts)
+            if semantic_segment is not None:
+                segment_id = semantic_segment["id"]
+                segments.setdefault(
+                    segment_id,
+                    hit.metadata.get("semantic_segment_text") or segment_texts[segment_id],
+                )
+            chunks.append(
                 {
                     "chunk_id": hit.chunk_id,
                     "score": hit.score,
@@ -64,10 +74,13 @@ def create_rag_search_tool(context: AgentToolContext) -> AgentToolSpec:
                     "section": hit.section,
                     "content": hit.content,
                     "metadata": hit.metadata,
-                    "semantic_segment": _semantic_segment_payload(hit.metadata),
+                    "semantic_segment": semantic_segment,
                 }
-                for hit in hits
-            ],
+            )
+        return {
+            "ok": True,
+            "chunks": chunks,
+            "segments": segments,
             "debug": debug_payload if isinstance(debug_payload, dict) else {},
         }
 
@@ -52,8 +52,8 @@ def create_csv_asset(*, user_id: int, workspace_id: str, original_name: str) ->
     return _workspace_dir(uploads_root(), user_id=user_id, workspace_id=workspace_id) / filename
 
 
-def create_record_plot_asset(*, user_id: int, workspace_id: str, record_id: int) -> Path:
-    filename = f"record-{int(record_id)}-{secrets.token_hex(8)}.png"
+def record_plot_cache_asset(*, user_id: int, workspace_id: str, record_id: int, cache_key: str) -> Path:
+    filename = f"record-{int(record_id)}-{cache_key}.png"
     return _workspace_dir(plots_root(), user_id=user_id, workspace_id=workspace_id) / filename
 
 
@@ -71,14 +71,13 @@ def build_plot_token(*, user_id: int, workspace_id: str, filename: str) -> str:
     return hmac.new(_plot_secret(), message, sha256).hexdigest()
 
 
-def create_plot_asset(*, user_id: int, workspace_id: str) -> tuple[Path, str]:
+def cached_plot_asset(*, user_id: int, workspace_id: str, cache_key: str) -> tuple[Path, str]:
     target_dir = _workspace_dir(plots_root(), user_id=user_id, workspace_id=workspace_id)
-    filename = f"{secrets.token_hex(16)}.png"
-    plot_path = target_dir / filename
+    filename = f"sample-{cache_key}.png"
     token = build_plot_token(user_id=user_id, workspace_id=workspace_id, filename=filename)
     workspace_encoded = quote(str(workspace_id), safe="")
     plot_url = f"/api/bankruptcy/plots/{filename}?workspaceId={workspace_encoded}&token={token}"
-    return plot_path, plot_url
+    return target_dir / filename, plot_url
 
 
 def resolve_plot_asset(*, user_id: int, workspace_id: str, filename: str, token: str) -> Path:
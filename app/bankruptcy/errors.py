@@ -19,3 +19,11 @@ class BankruptcyAuthorizationError(BankruptcyError):
 
 class BankruptcyNotFoundError(BankruptcyError):
     pass
+
+
+class BankruptcyPlotPendingError(BankruptcyError):
+    pass
+
+
+class BankruptcyPlotFailedError(BankruptcyError):
+    pass
@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import time
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+from threading import Lock
+from typing import Any
+
+from flask import current_app
+
+logger = logging.getLogger(__name__)
+
+PLOT_READY = "ready"
+PLOT_PENDING = "pending"
+PLOT_FAILED = "failed"
+PLOT_MISSING = "missing"
+
+CJK_FONT_CANDIDATES = (
+    "Microsoft YaHei",
+    "SimHei",
+    "SimSun",
+    "Noto Sans CJK SC",
+    "Source Han Sans SC",
+    "Arial Unicode MS",
+    "PingFang SC",
+    "Heiti SC",
+)
+
+_plot_lock = Lock()
+_plot_executor: ProcessPoolExecutor | None = None
+_plot_executor_workers = 0
+_plot_futures: dict[str, Future] = {}
+
+
+def configure_matplotlib_fonts(matplotlib: Any) -> None:
+    from matplotlib import font_manager
+
+    available = {font.name for font in font_manager.fontManager.ttflist}
+    cjk_fonts = [name for name in CJK_FONT_CANDIDATES if name in available]
+    if cjk_fonts:
+        matplotlib.rcParams["font.family"] = "sans-serif"
+        matplotlib.rcParams["font.sans-serif"] = [*cjk_fonts, *matplotlib.rcParams.get("font.sans-serif", [])]
+    matplotlib.rcParams["axes.unicode_minus"] = False
+
+
+def plot_cache_key(*, model_version: str, company_name: str, top_features: list[dict[str, Any]]) -> str:
+    payload = json.dumps(
+        {
+            "companyName": company_name,
+            "features": [[item["name"], round(float(item["shapValue"]), 10)] for item in top_features],
+        },
+        ensure_ascii=False,
+        sort_keys=True,
+    )
+    feature_hash = hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+    return f"{model_version}-{feature_hash}"
+
+
+def render_plot_file(plot_path: str, top_features: list[dict[str, Any]], company_name: str) -> str:
+    import matplotlib
+
+    matplotlib.use("Agg")
+    configure_matplotlib_fonts(matplotlib)
+    import matplotlib.pyplot as plt
+
+    labels = [item["name"] for item in reversed(top_features)]
+    values = [item["shapValue"] for item in reversed(top_features)]
+    colors = ["#d62728" if value > 0 else "#1f77b4" for value in values]
+
+    target = Path(plot_path)
+    tmp_path = target.with_name(f".{target.stem}.{os.getpid()}.tmp.png")
+    plt.figure(figsize=(8, 5))
+    try:
+        plt.barh(labels, values, color=colors)
+        plt.axvline(0, color="black", linewidth=1)
+        plt.xlabel("SHAP value (impact on bankruptcy risk)")
+        plt.title(f"SHAP Contributions - {company_name}")
+        plt.tight_layout()
+        plt.savefig(tmp_path, dpi=300, bbox_inches="tight", format="png")
+    finally:
+        plt.close()
+    os.replace(tmp_path, target)
+    return str(target)
+
+
+def plot_inputs_path(plot_path: Path) -> Path:
+    return plot_path.with_suffix(".json")
+
+
+def save_plot_inputs(plot_path: Path, *, top_features: list[dict[str, Any]], company_name: str) -> None:
+    target = plot_inputs_path(plot_path)
+    if target.exists():
+        return
+    tmp_path = target.with_name(f".{target.stem}.{uuid.uuid4().hex}.tmp.json")
+    tmp_path.write_text(
+        json.dumps({"companyName": company_name, "topFeatures": top_features}, ensure_ascii=False),
+        encoding="utf-8",
+    )
+    os.replace(tmp_path, target)
+
+
+def load_plot_inputs(plot_path: Path) -> dict[str, Any] | None:
+    try:
+        payload = json.loads(plot_inputs_path(plot_path).read_text(encoding="utf-8"))
+    except (FileNotFoundError, ValueError):
+        return None
+    if not isinstance(payload, dict) or not isinstance(payload.get("topFeatures"), list):
+        return None
+    return payload
+
+
+def _ensure_plot_executor(max_workers: int) -> ProcessPoolExecutor:
+    global _plot_executor, _plot_executor_workers
+    if _plot_executor is None or _plot_executor_workers != max_workers:
+        if _plot_executor is not None:
+            _plot_executor.shutdown(wait=False, cancel_futures=False)
+        _plot_executor = ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+        _plot_executor_workers = max_workers
+    return _plot_executor
+
+
+def schedule_plot(*, plot_path: Path, top_features: list[dict[str, Any]], company_name: str) -> str:
+    key = str(plot_path)
+    if plot_path.exists():
+        return PLOT_READY
+    if not bool(current_app.config.get("BANKRUPTCY_PLOT_ASYNC_ENABLED", True)):
+        render_plot_file(key, top_features, company_name)
+        return PLOT_READY
+
+    max_workers = max(1, int(current_app.config.get("BANKRUPTCY_PLOT_WORKERS", 2)))
+    with _plot_lock:
+        future = _plot_futures.get(key)
+        if future is not None and not future.done():
+            return PLOT_PENDING
+        submitted_at = time.perf_counter()
+        future = _ensure_plot_executor(max_workers).submit(render_plot_file, key, top_features, company_name)
+        _plot_futures[key] = future
+
+    def _log_completion(done: Future) -> None:
+        error = done.exception()
+        if error is not None:
+            logger.error(
+                "Bankruptcy plot rendering failed",
+                exc_info=(type(error), error, error.__traceback__),
+                extra={"event": "bankruptcy.plot.failed", "plot_path": key},
+            )
+            return
+        logger.info(
+            "Bankruptcy plot rendered",
+            extra={
+                "event": "bankruptcy.plot.rendered",
+                "plot_path": key,
+                "latency_ms": int((time.perf_counter() - submitted_at) * 1000),
+            },
+        )
+
+    future.add_done_callback(_log_completion)
+    return PLOT_PENDING
+
+
+def plot_status(plot_path: Path, *, wait_seconds: float = 0.0) -> str:
+    key = str(plot_path)
+    with _plot_lock:
+        future = _plot_futures.get(key)
+    if future is not None and wait_seconds > 0:
+        try:
+            future.result(timeout=wait_seconds)
+        except Exception:
+            pass
+    if future is not None and future.done():
+        with _plot_lock:
+            if _plot_futures.get(key) is future:
+                del _plot_futures[key]
+        if future.exception() is not None:
+            return PLOT_FAILED
+    if plot_path.exists():
+        return PLOT_READY
+    if future is not None and not future.done():
+        return PLOT_PENDING
+    return PLOT_MISSING
+
+
+def reset_plot_renderer_for_tests() -> None:
+    global _plot_executor, _plot_executor_workers
+    with _plot_lock:
+        executor = _plot_executor
+        _plot_executor = None
+        _plot_executor_workers = 0
+        _plot_futures.clear()
+    if executor is not None:
+        executor.shutdown(wait=True, cancel_futures=True)
@@ -1,18 +1,22 @@
 from __future__ import annotations
 
+import json
 import logging
 
-from flask import Blueprint, current_app, request, send_file, session
+from flask import Blueprint, Response, current_app, request, send_file, session, stream_with_context
 
 from ..logging_utils import bind_log_context, log_audit_event
 from .errors import (
     BankruptcyAuthorizationError,
     BankruptcyConfigurationError,
     BankruptcyNotFoundError,
+    BankruptcyPlotFailedError,
+    BankruptcyPlotPendingError,
     BankruptcyValidationError,
 )
 from .service import (
     analyze_bankruptcy_csv,
+    analyze_bankruptcy_csv_batch,
     analyze_bankruptcy_record,
     delete_bankruptcy_record,
     get_bankruptcy_record_detail,
@@ -37,6 +41,14 @@ def _current_user_id() -> int | None:
     return None
 
 
+def _stream_event(payload: dict) -> str:
+    return json.dumps(payload, ensure_ascii=False) + "\n"
+
+
+def _plot_pending_response():
+    return {"ok": True, "data": {"status": "pending"}}, 202, {"Retry-After": "1"}
+
+
 def _ensure_enabled():
     if not bool(current_app.config.get("BANKRUPTCY_ANALYSIS_ENABLED", False)):
         return _json_error("bankruptcy analysis is disabled", 404)
@@ -94,6 +106,84 @@ def predict():
     return {"ok": True, "data": data}
 
 
+@bankruptcy_bp.post("/predict/batch")
+def predict_batch():
+    disabled = _ensure_enabled()
+    if disabled:
+        return disabled
+    user_id = _current_user_id()
+    if user_id is None:
+        return _json_error("authentication required", 401)
+
+    workspace_id = str(request.form.get("workspaceId", "default")).strip() or "default"
+    bind_log_context(user_id=user_id, workspace_id=workspace_id)
+    plot_rows = str(request.form.get("plotRows", "")).strip()
+    file_storage = request.files.get("file")
+
+    try:
+        summary, rows = analyze_bankruptcy_csv_batch(
+            user_id=user_id,
+            workspace_id=workspace_id,
+            file_storage=file_storage,
+            plot_rows=plot_rows,
+        )
+    except BankruptcyValidationError as exc:
+        return _json_error(str(exc), 400)
+    except BankruptcyConfigurationError as exc:
+        log_audit_event(
+            "bankruptcy.predict_batch.failed",
+            operation_status="failed",
+            resource_type="workspace",
+            resource_id=workspace_id,
+        )
+        logger.exception("Bankruptcy runtime is unavailable")
+        return _json_error(str(exc), 503)
+    except Exception:
+        log_audit_event(
+            "bankruptcy.predict_batch.failed",
+            operation_status="failed",
+            resource_type="workspace",
+            resource_id=workspace_id,
+        )
+        logger.exception("Bankruptcy batch analysis failed")
+        return _json_error("bankruptcy analysis failed", 500)
+
+    @stream_with_context
+    def generate():
+        yield _stream_event({"type": "started", **summary})
+        scored = 0
+        failed = 0
+        try:
+            for row in rows:
+                if row.get("ok"):
+                    scored += 1
+                else:
+                    failed += 1
+                yield _stream_event({"type": "row", **row})
+        except Exception:
+            log_audit_event(
+                "bankruptcy.predict_batch.failed",
+                operation_status="failed",
+                resource_type="workspace",
+                resource_id=workspace_id,
+            )
+            logger.exception("Bankruptcy batch streaming failed")
+            yield _stream_event({"type": "error", "error": "bankruptcy analysis failed"})
+            return
+        log_audit_event(
+            "bankruptcy.predict_batch.completed",
+            operation_status="succeeded",
+            resource_type="workspace",
+            resource_id=workspace_id,
+            row_count=summary["rowCount"],
+        )
+        yield _stream_event({"type": "done", "scoredRows": scored, "failedRows": failed})
+
+    response = Response(generate(), mimetype="application/x-ndjson")
+    response.headers["Cache-Control"] = "no-store"
+    return response
+
+
 @bankruptcy_bp.route("/records", methods=["GET", "POST"])
 def records():
     disabled = _ensure_enabled()
@@ -267,6 +357,10 @@ def read_record_plot(record_id: int):
         return _json_error(str(exc), 404)
     except BankruptcyValidationError as exc:
         return _json_error(str(exc), 400)
+    except BankruptcyPlotPendingError:
+        return _plot_pending_response()
+    except BankruptcyPlotFailedError as exc:
+        return _json_error(str(exc), 500)
     except Exception:
         logger.exception("Failed to read bankruptcy record plot")
         return _json_error("failed to read plot", 500)
@@ -297,6 +391,12 @@ def read_plot(filename: str):
         return _json_error(str(exc), 400)
     except BankruptcyAuthorizationError as exc:
         return _json_error(str(exc), 403)
+    except BankruptcyNotFoundError as exc:
+        return _json_error(str(exc), 404)
+    except BankruptcyPlotPendingError:
+        return _plot_pending_response()
+    except BankruptcyPlotFailedError as exc:
+        return _json_error(str(exc), 500)
     except Exception:
         logger.exception("Failed to read bankruptcy plot")
         return _json_error("failed to read plot", 500)
@@ -1,46 +1,52 @@
 from __future__ import annotations
 
+import hashlib
 import io
+import logging
+import time
 from pathlib import Path
 from threading import Lock
-from typing import Any
+from typing import Any, Iterator
 
-from flask import current_app
+from flask import Flask, current_app
 from werkzeug.datastructures import FileStorage
 
 from ..db import session_scope
 from .assets import (
     build_record_plot_url,
+    cached_plot_asset,
     cleanup_artifact,
     create_csv_asset,
-    create_plot_asset,
-    create_record_plot_asset,
     plots_root,
+    record_plot_cache_asset,
     resolve_plot_asset,
     uploads_root,
 )
 from .errors import (
-    BankruptcyAuthorizationError,
     BankruptcyConfigurationError,
     BankruptcyNotFoundError,
+    BankruptcyPlotFailedError,
+    BankruptcyPlotPendingError,
     BankruptcyValidationError,
 )
+from .plots import (
+    PLOT_FAILED,
+    PLOT_PENDING,
+    PLOT_READY,
+    configure_matplotlib_fonts,
+    load_plot_inputs,
+    plot_cache_key,
+    plot_status,
+    save_plot_inputs,
+    schedule_plot,
+)
 from .repository import create_record, get_record_for_scope, list_records_for_scope, set_record_status
 
+logger = logging.getLogger(__name__)
+
 _runtime_lock = Lock()
 _runtime: dict[str, Any] | None = None
 
-_CJK_FONT_CANDIDATES = (
-    "Microsoft YaHei",
-    "SimHei",
-    "SimSun",
-    "Noto Sans CJK SC",
-    "Source Han Sans SC",
-    "Arial Unicode MS",
-    "PingFang SC",
-    "Heiti SC",
-)
-
 
 def _project_root() -> Path:
     from pathlib import Path as _Path
@@ -61,17 +67,6 @@ def reset_runtime_for_tests() -> None:
         _runtime = None
 
 
-def _configure_matplotlib_fonts(matplotlib: Any) -> None:
-    from matplotlib import font_manager
-
-    available = {font.name for font in font_manager.fontManager.ttflist}
-    cjk_fonts = [name for name in _CJK_FONT_CANDIDATES if name in available]
-    if cjk_fonts:
-        matplotlib.rcParams["font.family"] = "sans-serif"
-        matplotlib.rcParams["font.sans-serif"] = [*cjk_fonts, *matplotlib.rcParams.get("font.sans-serif", [])]
-    matplotlib.rcParams["axes.unicode_minus"] = False
-
-
 def _load_dependencies() -> dict[str, Any]:
     try:
         import joblib
@@ -82,14 +77,12 @@ def _load_dependencies() -> dict[str, Any]:
     except ImportError as exc:
         raise BankruptcyConfigurationError(f"required package is missing: {exc}") from exc
     matplotlib.use("Agg")
-    _configure_matplotlib_fonts(matplotlib)
-    import matplotlib.pyplot as plt
+    configure_matplotlib_fonts(matplotlib)
 
     return {
         "joblib": joblib,
         "np": np,
         "pd": pd,
-        "plt": plt,
         "shap": shap,
     }
 
@@ -113,6 +106,9 @@ def _build_runtime() -> dict[str, Any]:
         **deps,
         "model": model,
         "scaler": scaler,
+        "explainer": deps["shap"].TreeExplainer(model),
+        "explainer_lock": Lock(),
+        "model_version": hashlib.sha256(model_path.read_bytes()).hexdigest()[:12],
         "feature_names": feature_names,
     }
 
@@ -127,6 +123,27 @@ def _get_runtime() -> dict[str, Any]:
     return _runtime
 
 
+def warm_bankruptcy_runtime(app: Flask) -> None:
+    with app.app_context():
+        started_at = time.perf_counter()
+        try:
+            runtime = _get_runtime()
+            feature_names = list(runtime["feature_names"])
+            sample = runtime["pd"].DataFrame([[0.0] * len(feature_names)], columns=feature_names)
+            with runtime["explainer_lock"]:
+                runtime["explainer"].shap_values(sample)
+        except Exception:
+            logger.exception("Bankruptcy runtime warm-up failed", extra={"event": "bankruptcy.runtime.warmup_failed"})
+            return
+        logger.info(
+            "Bankruptcy runtime warmed",
+            extra={
+                "event": "bankruptcy.runtime.warmed",
+                "latency_ms": int((time.perf_counter() - started_at) * 1000),
+            },
+        )
+
+
 def _describe_empty_csv(raw_bytes: bytes, *, feature_names: list[str]) -> str:
     text = raw_bytes.decode("utf-8-sig", errors="ignore")
     lines = [line.strip() for line in text.splitlines() if line.strip()]
@@ -167,18 +184,30 @@ def _read_stored_bytes(path_str: str) -> bytes:
     return raw_bytes
 
 
-def _load_frame_from_bytes(raw_bytes: bytes, *, pd: Any, feature_names: list[str]):
+def _parse_csv_frame(raw_bytes: bytes, *, pd: Any, feature_names: list[str]):
     try:
         frame = pd.read_csv(io.BytesIO(raw_bytes))
     except Exception as exc:
         raise BankruptcyValidationError(f"failed to parse csv file: {exc}") from exc
     if frame.empty:
         raise BankruptcyValidationError(_describe_empty_csv(raw_bytes, feature_names=feature_names))
+    return frame
+
+
+def _load_frame_from_bytes(raw_bytes: bytes, *, pd: Any, feature_names: list[str]):
+    frame = _parse_csv_frame(raw_bytes, pd=pd, feature_names=feature_names)
     if len(frame.index) != 1:
         raise BankruptcyValidationError("only single-sample csv files are supported")
     return frame
 
 
+def _load_batch_frame_from_bytes(raw_bytes: bytes, *, pd: Any, feature_names: list[str], max_rows: int):
+    frame = _parse_csv_frame(raw_bytes, pd=pd, feature_names=feature_names)
+    if len(frame.index) > max(1, int(max_rows)):
+        raise BankruptcyValidationError(f"batch csv files support at most {int(max_rows)} rows")
+    return frame.reset_index(drop=True)
+
+
 def _normalize_display_name(raw_name: str, *, fallback_name: str = "") -> str:
     value = str(raw_name or "").strip()
     if value:
@@ -198,12 +227,16 @@ def _apply_enterprise_metadata(frame: Any, enterprise_name: str, *, fallback_nam
     return _normalize_display_name(display_name, fallback_name=fallback_name), frame
 
 
-def _prepare_feature_frame(frame: Any, *, feature_names: list[str], pd: Any):
-    features = frame.drop(columns=["Bankrupt?", "enterprise_name"], errors="ignore").copy()
+def _select_feature_columns(frame: Any, *, feature_names: list[str]):
+    features = frame.drop(columns=["Bankrupt?", "enterprise_name", "render_plot"], errors="ignore").copy()
     missing = [column for column in feature_names if column not in features.columns]
     if missing:
         raise BankruptcyValidationError(f"missing required feature columns: {', '.join(missing)}")
-    features = features.loc[:, feature_names]
+    return features.loc[:, feature_names]
+
+
+def _prepare_feature_frame(frame: Any, *, feature_names: list[str], pd: Any):
+    features = _select_feature_columns(frame, feature_names=feature_names)
     for column in feature_names:
         try:
             features[column] = pd.to_numeric(features[column], errors="raise")
@@ -212,7 +245,26 @@ def _prepare_feature_frame(frame: Any, *, feature_names: list[str], pd: Any):
     return features.iloc[[0]]
 
 
-def _extract_top_features(*, shap_values: Any, feature_names: list[str], np: Any, top_count: int) -> list[dict[str, Any]]:
+def _prepare_batch_features(frame: Any, *, feature_names: list[str], pd: Any) -> tuple[Any, dict[int, str]]:
+    features = _select_feature_columns(frame, feature_names=feature_names)
+    row_errors: dict[int, str] = {}
+    for column in feature_names:
+        raw_values = features[column]
+        numeric = pd.to_numeric(raw_values, errors="coerce")
+        for position in (numeric.isna() & raw_values.notna()).to_numpy().nonzero()[0]:
+            row_errors.setdefault(int(position), f"feature '{column}' must be numeric")
+        features[column] = numeric
+    return features, row_errors
+
+
+def _extract_top_features(
+    *,
+    shap_values: Any,
+    feature_names: list[str],
+    np: Any,
+    top_count: int,
+    row_index: int = 0,
+) -> list[dict[str, Any]]:
     values = shap_values
     if isinstance(values, list):
         values = values[-1]
@@ -220,7 +272,7 @@ def _extract_top_features(*, shap_values: Any, feature_names: list[str], np: Any
     if matrix.ndim == 1:
         sample_values = matrix
     elif matrix.ndim >= 2:
-        sample_values = matrix[0]
+        sample_values = matrix[row_index]
     else:
         raise BankruptcyConfigurationError("unexpected shap output shape")
 
@@ -237,52 +289,31 @@ def _extract_top_features(*, shap_values: Any, feature_names: list[str], np: Any
     return ranked[: max(1, int(top_count))]
 
 
-def _render_plot(
-    *,
-    plot_path: Path,
-    top_features: list[dict[str, Any]],
-    company_name: str,
-    plt: Any,
-) -> None:
-    labels = [item["name"] for item in reversed(top_features)]
-    values = [item["shapValue"] for item in reversed(top_features)]
-    colors = ["#d62728" if value > 0 else "#1f77b4" for value in values]
-
-    plt.figure(figsize=(8, 5))
-    plt.barh(labels, values, color=colors)
-    plt.axvline(0, color="black", linewidth=1)
-    plt.xlabel("SHAP value (impact on bankruptcy risk)")
-    plt.title(f"SHAP Contributions - {company_name}")
-    plt.tight_layout()
-    plt.savefig(plot_path, dpi=300, bbox_inches="tight")
-    plt.close()
-
-
 def _analyze_frame(
     *,
     frame: Any,
     company_name: str,
     feature_names: list[str],
     runtime: dict[str, Any],
-    plot_path: Path,
 ) -> dict[str, Any]:
     pd = runtime["pd"]
     np = runtime["np"]
-    plt = runtime["plt"]
-    shap = runtime["shap"]
 
+    started_at = time.perf_counter()
     features = _prepare_feature_frame(frame, feature_names=feature_names, pd=pd)
     scaler = runtime["scaler"]
     model = runtime["model"]
     scaled = scaler.transform(features)
     scaled_frame = pd.DataFrame(scaled, columns=feature_names)
+    scaled_at = time.perf_counter()
 
     probability = float(model.predict_proba(scaled_frame)[0, 1])
     threshold = float(current_app.config.get("BANKRUPTCY_THRESHOLD", 0.63))
     risk_level = "high" if probability > threshold else "low"
+    predicted_at = time.perf_counter()
 
-    explainer = shap.TreeExplainer(model)
-    shap_values = explainer.shap_values(scaled_frame)
+    with runtime["explainer_lock"]:
+        shap_values = runtime["explainer"].shap_values(scaled_frame)
     top_count = int(current_app.config.get("BANKRUPTCY_TOP_FEATURE_COUNT", 10))
     top_features = _extract_top_features(
         shap_values=shap_values,
@@ -290,7 +321,17 @@ def _analyze_frame(
         np=np,
         top_count=top_count,
     )
-    _render_plot(plot_path=plot_path, top_features=top_features, company_name=company_name, plt=plt)
+    explained_at = time.perf_counter()
+    logger.info(
+        "Bankruptcy analysis completed",
+        extra={
+            "event": "bankruptcy.analysis.timing",
+            "scale_ms": round((scaled_at - started_at) * 1000, 2),
+            "predict_ms": round((predicted_at - scaled_at) * 1000, 2),
+            "explain_ms": round((explained_at - predicted_at) * 1000, 2),
+            "latency_ms": int((explained_at - started_at) * 1000),
+        },
+    )
 
     return {
         "companyName": company_name,
@@ -305,6 +346,38 @@ def _analyze_frame(
     }
 
 
+def _schedule_result_plot(*, plot_path: Path, result: dict[str, Any], persist_inputs: bool = False) -> str:
+    started_at = time.perf_counter()
+    if persist_inputs:
+        save_plot_inputs(
+            plot_path,
+            top_features=result.get("topFeatures") or [],
+            company_name=str(result.get("companyName") or ""),
+        )
+    status = schedule_plot(
+        plot_path=plot_path,
+        top_features=result.get("topFeatures") or [],
+        company_name=str(result.get("companyName") or ""),
+    )
+    logger.info(
+        "Bankruptcy plot scheduled",
+        extra={
+            "event": "bankruptcy.plot.scheduled",
+            "plot_status": status,
+            "plot_ms": round((time.perf_counter() - started_at) * 1000, 2),
+        },
+    )
+    return status
+
+
+def _result_plot_key(runtime: dict[str, Any], result: dict[str, Any]) -> str:
+    return plot_cache_key(
+        model_version=str(runtime["model_version"]),
+        company_name=str(result.get("companyName") or ""),
+        top_features=result.get("topFeatures") or [],
+    )
+
+
 def _summarize_result(record, *, plot_url: str = "") -> dict[str, Any]:
     result_json = record.result_json if isinstance(record.result_json, dict) else {}
     top_features = result_json.get("topFeatures", []) if isinstance(result_json.get("topFeatures"), list) else []
@@ -429,14 +502,19 @@ def analyze_bankruptcy_record(*, user_id: int, workspace_id: str, record_id: int
                 str(record.enterprise_name or record.source_name or "").strip(),
                 fallback_name=Path(record.file_name).stem,
             )
-            plot_path = create_record_plot_asset(user_id=user_id, workspace_id=workspace_id, record_id=record.id)
             result = _analyze_frame(
                 frame=normalized_frame,
                 company_name=company_name,
                 feature_names=feature_names,
                 runtime=runtime,
-                plot_path=plot_path,
             )
+            plot_path = record_plot_cache_asset(
+                user_id=user_id,
+                workspace_id=workspace_id,
+                record_id=record.id,
+                cache_key=_result_plot_key(runtime, result),
+            )
+            plot_state = _schedule_result_plot(plot_path=plot_path, result=result)
             new_plot_path = str(plot_path)
             set_record_status(
                 record=record,
@@ -459,6 +537,7 @@ def analyze_bankruptcy_record(*, user_id: int, workspace_id: str, record_id: int
                 cleanup_artifact(old_plot_path, expected_root=plots_root())
             raise
         detail = _record_detail_payload(record)
+        detail["plotStatus"] = plot_state
 
     if old_plot_path and new_plot_path and old_plot_path != new_plot_path:
         cleanup_artifact(old_plot_path, expected_root=plots_root())
@@ -486,9 +565,17 @@ def read_bankruptcy_record_plot(*, user_id: int, workspace_id: str, record_id: i
         if record.status != "analyzed" or not record.plot_path:
             raise BankruptcyNotFoundError("bankruptcy plot not found")
         plot_path = Path(record.plot_path)
-        if not plot_path.exists():
-            raise BankruptcyNotFoundError("bankruptcy plot not found")
+        result_json = record.result_json if isinstance(record.result_json, dict) else {}
+
+    wait_seconds = float(current_app.config.get("BANKRUPTCY_PLOT_WAIT_SECONDS", 5))
+    status = plot_status(plot_path, wait_seconds=wait_seconds)
+    if status == PLOT_READY:
+        return plot_path
+    if status == PLOT_FAILED:
+        raise BankruptcyPlotFailedError("bankruptcy plot rendering failed")
+    if status != PLOT_PENDING and _schedule_result_plot(plot_path=plot_path, result=result_json) == PLOT_READY:
         return plot_path
+    raise BankruptcyPlotPendingError("bankruptcy plot is still rendering")
 
 
 def analyze_bankruptcy_csv(
@@ -509,18 +596,150 @@ def analyze_bankruptcy_csv(
         str(enterprise_name or "").strip(),
         fallback_name=Path(original_name).stem,
     )
-    plot_path, plot_url = create_plot_asset(user_id=user_id, workspace_id=workspace_id)
     result = _analyze_frame(
         frame=normalized_frame,
         company_name=company_name,
         feature_names=feature_names,
         runtime=runtime,
-        plot_path=plot_path,
     )
+    plot_path, plot_url = cached_plot_asset(
+        user_id=user_id,
+        workspace_id=workspace_id,
+        cache_key=_result_plot_key(runtime, result),
+    )
+    result["plotStatus"] = _schedule_result_plot(plot_path=plot_path, result=result, persist_inputs=True)
     result["plotUrl"] = plot_url
     return result
 
 
+def _truthy_cell(value: Any) -> bool:
+    return str(value).strip().lower() in {"1", "true", "yes", "y"}
+
+
+def _parse_plot_rows(raw_value: str, *, row_count: int) -> set[int]:
+    text = str(raw_value or "").strip().lower()
+    if not text:
+        return set()
+    if text == "all":
+        return set(range(row_count))
+    rows: set[int] = set()
+    for part in text.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        try:
+            index = int(part)
+        except ValueError as exc:
+            raise BankruptcyValidationError("plotRows must be 'all' or a comma-separated list of row indexes") from exc
+        if index < 0 or index >= row_count:
+            raise BankruptcyValidationError(f"plotRows index {index} is out of range")
+        rows.add(index)
+    return rows
+
+
+def _row_company_name(frame: Any, position: int, *, fallback_name: str) -> str:
+    if "enterprise_name" in frame.columns:
+        value = frame.iloc[position].get("enterprise_name", "")
+        if value is not None and str(value).strip() and str(value).strip().lower() != "nan":
+            return str(value).strip()
+    return f"{fallback_name} #{position + 1}"
+
+
+def analyze_bankruptcy_csv_batch(
+    *,
+    user_id: int,
+    workspace_id: str,
+    file_storage: FileStorage,
+    plot_rows: str = "",
+) -> tuple[dict[str, Any], Iterator[dict[str, Any]]]:
+    runtime = _get_runtime()
+    feature_names = list(runtime["feature_names"])
+    pd = runtime["pd"]
+    np = runtime["np"]
+
+    raw_bytes, original_name, _mime_type = _read_upload_bytes(file_storage)
+    max_rows = int(current_app.config.get("BANKRUPTCY_BATCH_MAX_ROWS", 10000))
+    frame = _load_batch_frame_from_bytes(raw_bytes, pd=pd, feature_names=feature_names, max_rows=max_rows)
+    row_count = int(len(frame.index))
+    requested_plots = _parse_plot_rows(plot_rows, row_count=row_count)
+    if "render_plot" in frame.columns:
+        requested_plots.update(int(position) for position, value in enumerate(frame["render_plot"]) if _truthy_cell(value))
+
+    started_at = time.perf_counter()
+    features, row_errors = _prepare_batch_features(frame, feature_names=feature_names, pd=pd)
+    valid_positions = [position for position in range(row_count) if position not in row_errors]
+    probabilities: Any = np.empty(0)
+    shap_values: Any = None
+    scaled_at = predicted_at = explained_at = started_at
+    if valid_positions:
+        scaled = runtime["scaler"].transform(features.iloc[valid_positions])
+        scaled_frame = pd.DataFrame(scaled, columns=feature_names)
+        scaled_at = time.perf_counter()
+        probabilities = runtime["model"].predict_proba(scaled_frame)[:, 1]
+        predicted_at = time.perf_counter()
+        with runtime["explainer_lock"]:
+            shap_values = runtime["explainer"].shap_values(scaled_frame)
+        explained_at = time.perf_counter()
+    logger.info(
+        "Bankruptcy batch scored",
+        extra={
+            "event": "bankruptcy.batch.timing",
+            "row_count": row_count,
+            "scored_rows": len(valid_positions),
+            "scale_ms": round((scaled_at - started_at) * 1000, 2),
+            "predict_ms": round((predicted_at - scaled_at) * 1000, 2),
+            "explain_ms": round((explained_at - predicted_at) * 1000, 2),
+        },
+    )
+
+    threshold = float(current_app.config.get("BANKRUPTCY_THRESHOLD", 0.63))
+    top_count = int(current_app.config.get("BANKRUPTCY_TOP_FEATURE_COUNT", 10))
+    fallback_name = Path(original_name).stem or "Unknown company"
+    summary = {
+        "fileName": original_name,
+        "rowCount": row_count,
+        "featureCount": int(len(feature_names)),
+        "threshold": threshold,
+        "plotRows": sorted(requested_plots),
+    }
+
+    def _iter_rows() -> Iterator[dict[str, Any]]:
+        scored_index = {position: index for index, position in enumerate(valid_positions)}
+        for position in range(row_count):
+            company_name = _row_company_name(frame, position, fallback_name=fallback_name)
+            if position in row_errors:
+                yield {"row": position, "ok": False, "companyName": company_name, "error": row_errors[position]}
+                continue
+            index = scored_index[position]
+            probability = float(probabilities[index])
+            top_features = _extract_top_features(
+                shap_values=shap_values,
+                feature_names=feature_names,
+                np=np,
+                top_count=top_count,
+                row_index=index,
+            )
+            item = {
+                "row": position,
+                "ok": True,
+                "companyName": company_name,
+                "probability": probability,
+                "riskLevel": "high" if probability > threshold else "low",
+                "topFeatures": top_features,
+            }
+            if position in requested_plots:
+                plot_path, plot_url = cached_plot_asset(
+                    user_id=user_id,
+                    workspace_id=workspace_id,
+                    cache_key=_result_plot_key(runtime, item),
+                )
+                item["plotStatus"] = _schedule_result_plot(plot_path=plot_path, result=item, persist_inputs=True)
+                item["plotUrl"] = plot_url
+            yield item
+
+    return summary, _iter_rows()
+
+
 def read_plot_asset(*, user_id: int, workspace_id: str, filename: str, token: str) -> Path:
     path = resolve_plot_asset(
         user_id=user_id,
@@ -528,6 +747,19 @@ def read_plot_asset(*, user_id: int, workspace_id: str, filename: str, token: st
         filename=filename,
         token=token,
     )
-    if not path.exists():
-        raise BankruptcyAuthorizationError("plot not found")
-    return path
+    if path.exists():
+        return path
+    wait_seconds = float(current_app.config.get("BANKRUPTCY_PLOT_WAIT_SECONDS", 5))
+    status = plot_status(path, wait_seconds=wait_seconds)
+    if status == PLOT_READY:
+        return path
+    if status == PLOT_PENDING:
+        raise BankruptcyPlotPendingError("plot is still rendering")
+    if status == PLOT_FAILED:
+        raise BankruptcyPlotFailedError("plot rendering failed")
+    inputs = load_plot_inputs(path)
+    if inputs is None:
+        raise BankruptcyNotFoundError("plot not found")
+    if _schedule_result_plot(plot_path=path, result=inputs) == PLOT_READY:
+        return path
+    raise BankruptcyPlotPendingError("plot is still rendering")
@@ -112,6 +112,10 @@ class Config:
     AGENT_SEARCH_AI_API_KEY = os.getenv("AGENT_SEARCH_AI_API_KEY", "").strip()
     AGENT_SEARCH_AI_BASE_URL = os.getenv("AGENT_SEARCH_AI_BASE_URL", "").strip()
     AGENT_SEARCH_AI_TIMEOUT_SECONDS = int(os.getenv("AGENT_SEARCH_AI_TIMEOUT_SECONDS", str(AI_TIMEOUT_SECONDS)))
+    AGENT_SEARCH_KG_TIMEOUT_SECONDS = _float_env("AGENT_SEARCH_KG_TIMEOUT_SECONDS", 30.0)
+    AGENT_SEARCH_RAG_TIMEOUT_SECONDS = _float_env("AGENT_SEARCH_RAG_TIMEOUT_SECONDS", 30.0)
+    AGENT_SEARCH_WEB_TIMEOUT_SECONDS = _float_env("AGENT_SEARCH_WEB_TIMEOUT_SECONDS", 30.0)
+    AGENT_SEARCH_LOOKUP_SATURATION_THRESHOLD = int(os.getenv("AGENT_SEARCH_LOOKUP_SATURATION_THRESHOLD", "8"))
     AGENT_MCP_AI_PROVIDER = os.getenv("AGENT_MCP_AI_PROVIDER", "").strip().lower()
     AGENT_MCP_AI_MODEL = os.getenv("AGENT_MCP_AI_MODEL", "").strip()
     AGENT_MCP_AI_API_KEY = os.getenv("AGENT_MCP_AI_API_KEY", "").strip()
@@ -146,6 +150,11 @@ class Config:
     )
     BANKRUPTCY_THRESHOLD = _float_env("BANKRUPTCY_THRESHOLD", 0.63)
     BANKRUPTCY_TOP_FEATURE_COUNT = int(os.getenv("BANKRUPTCY_TOP_FEATURE_COUNT", "10"))
+    BANKRUPTCY_BATCH_MAX_ROWS = int(os.getenv("BANKRUPTCY_BATCH_MAX_ROWS", "10000"))
+    BANKRUPTCY_PLOT_ASYNC_ENABLED = _bool_env("BANKRUPTCY_PLOT_ASYNC_ENABLED", True)
+    BANKRUPTCY_PLOT_WORKERS = int(os.getenv("BANKRUPTCY_PLOT_WORKERS", "2"))
+    BANKRUPTCY_PLOT_WAIT_SECONDS = _float_env("BANKRUPTCY_PLOT_WAIT_SECONDS", 5.0)
+    BANKRUPTCY_WARM_RUNTIME_ON_STARTUP = _bool_env("BANKRUPTCY_WARM_RUNTIME_ON_STARTUP", False)
     BANKRUPTCY_UPLOAD_DIR = os.getenv("BANKRUPTCY_UPLOAD_DIR", "uploads/bankruptcy/csv")
     BANKRUPTCY_PLOT_DIR = os.getenv("BANKRUPTCY_PLOT_DIR", "uploads/bankruptcy")
 
@@ -160,12 +169,29 @@ class Config:
     RAG_EMBEDDING_API_KEY = os.getenv("RAG_EMBEDDING_API_KEY", "").strip()
     RAG_EMBEDDING_BASE_URL = os.getenv("RAG_EMBEDDING_BASE_URL", "").strip()
     RAG_EMBEDDING_TIMEOUT_SECONDS = int(os.getenv("RAG_EMBEDDING_TIMEOUT_SECONDS", "20"))
+    RAG_EMBEDDING_BATCH_MAX_ITEMS = int(os.getenv("RAG_EMBEDDING_BATCH_MAX_ITEMS", "0"))
+    RAG_EMBEDDING_BATCH_MAX_TOKENS = int(os.getenv("RAG_EMBEDDING_BATCH_MAX_TOKENS", "0"))
+    RAG_EMBEDDING_MAX_IN_FLIGHT = int(os.getenv("RAG_EMBEDDING_MAX_IN_FLIGHT", "4"))
+    RAG_EMBEDDING_MAX_RETRIES = int(os.getenv("RAG_EMBEDDING_MAX_RETRIES", "4"))
+    RAG_EMBEDDING_RETRY_BASE_SECONDS = _float_env("RAG_EMBEDDING_RETRY_BASE_SECONDS", 0.5)
+    RAG_EMBEDDING_RETRY_MAX_SECONDS = _float_env("RAG_EMBEDDING_RETRY_MAX_SECONDS", 30.0)
+    RAG_EMBEDDING_CACHE_ENABLED = _bool_env("RAG_EMBEDDING_CACHE_ENABLED", True)
+    RAG_EMBEDDING_CACHE_DIR = os.getenv("RAG_EMBEDDING_CACHE_DIR", "uploads/embedding_cache")
+    RAG_EMBEDDING_CACHE_MAX_BYTES = int(os.getenv("RAG_EMBEDDING_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
     RAG_RERANKER_MODEL = os.getenv("RAG_RERANKER_MODEL", "").strip()
     RAG_RERANKER_API_KEY = os.getenv("RAG_RERANKER_API_KEY", "").strip()
     RAG_RERANKER_BASE_URL = os.getenv("RAG_RERANKER_BASE_URL", "").strip()
     RAG_RERANKER_TIMEOUT_SECONDS = int(os.getenv("RAG_RERANKER_TIMEOUT_SECONDS", "20"))
     RAG_RETRIEVAL_TOP_K = int(os.getenv("RAG_RETRIEVAL_TOP_K", "5"))
+    RAG_QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("RAG_QUERY_EMBEDDING_CACHE_SIZE", "1024"))
+    RAG_QUERY_EMBEDDING_CACHE_TTL_SECONDS = _float_env("RAG_QUERY_EMBEDDING_CACHE_TTL_SECONDS", 600.0)
     RAG_RETRIEVAL_SCORE_THRESHOLD = _float_env("RAG_RETRIEVAL_SCORE_THRESHOLD", 0.0)
+    RAG_QUERY_LOG_ASYNC = _bool_env("RAG_QUERY_LOG_ASYNC", True)
+    RAG_QUERY_LOG_QUEUE_SIZE = int(os.getenv("RAG_QUERY_LOG_QUEUE_SIZE", "10000"))
+    RAG_QUERY_LOG_BATCH_SIZE = int(os.getenv("RAG_QUERY_LOG_BATCH_SIZE", "200"))
+    RAG_QUERY_LOG_FLUSH_INTERVAL_SECONDS = _float_env("RAG_QUERY_LOG_FLUSH_INTERVAL_SECONDS", 1.0)
+    RAG_RETRIEVABLE_CACHE_MAX_WORKSPACES = int(os.getenv("RAG_RETRIEVABLE_CACHE_MAX_WORKSPACES", "64"))
+    RAG_RETRIEVAL_MODE = os.getenv("RAG_RETRIEVAL_MODE", "vector").strip().lower()
     RAG_ALLOWED_FILE_TYPES = _csv_env("RAG_ALLOWED_FILE_TYPES", "pdf,docx,md,txt")
     RAG_UPLOAD_DIR = os.getenv("RAG_UPLOAD_DIR", "uploads/rag")
     RAG_FILELOADER_VERSION = os.getenv("RAG_FILELOADER_VERSION", "v1").strip()
@@ -179,6 +205,7 @@ class Config:
     )
     RAG_CHUNK_FALLBACK_STRATEGY = os.getenv("RAG_CHUNK_FALLBACK_STRATEGY", "paragraph").strip().lower()
     RAG_CHUNK_VERSION = os.getenv("RAG_CHUNK_VERSION", "v1").strip()
+    RAG_CHUNK_EMBEDDING_UNIT = os.getenv("RAG_CHUNK_EMBEDDING_UNIT", "sentence").strip().lower()
     RAG_CHUNK_SEMANTIC_TARGET_TOKENS = int(os.getenv("RAG_CHUNK_SEMANTIC_TARGET_TOKENS", "450"))
     RAG_CHUNK_SEMANTIC_MAX_TOKENS = int(os.getenv("RAG_CHUNK_SEMANTIC_MAX_TOKENS", "700"))
     RAG_CHUNK_SEMANTIC_OVERLAP_TOKENS = int(os.getenv("RAG_CHUNK_SEMANTIC_OVERLAP_TOKENS", "50"))
@@ -188,13 +215,31 @@ class Config:
     RAG_CHUNK_AI_API_KEY = os.getenv("RAG_CHUNK_AI_API_KEY", "").strip()
     RAG_CHUNK_AI_BASE_URL = os.getenv("RAG_CHUNK_AI_BASE_URL", "").strip()
     RAG_CHUNK_AI_TIMEOUT_SECONDS = int(os.getenv("RAG_CHUNK_AI_TIMEOUT_SECONDS", "20"))
+    RAG_CHUNK_AI_WINDOW_MAX_CHARS = int(os.getenv("RAG_CHUNK_AI_WINDOW_MAX_CHARS", "12000"))
+    RAG_CHUNK_AI_WINDOW_OVERLAP_BLOCKS = int(os.getenv("RAG_CHUNK_AI_WINDOW_OVERLAP_BLOCKS", "1"))
+    RAG_CHUNK_AI_MAX_WORKERS = int(os.getenv("RAG_CHUNK_AI_MAX_WORKERS", "4"))
+    RAG_CHUNK_AI_CACHE_SIZE = int(os.getenv("RAG_CHUNK_AI_CACHE_SIZE", "256"))
+    RAG_CHUNK_AI_BREAKPOINT_PERCENTILE = float(os.getenv("RAG_CHUNK_AI_BREAKPOINT_PERCENTILE", "90"))
+    RAG_CHUNK_AI_EMBEDDING_BATCH_SIZE = int(os.getenv("RAG_CHUNK_AI_EMBEDDING_BATCH_SIZE", "64"))
     RAG_OCR_PROVIDER = os.getenv("RAG_OCR_PROVIDER", "openai-compatible").strip().lower()
     RAG_OCR_MODEL = os.getenv("RAG_OCR_MODEL", "").strip()
     RAG_OCR_API_KEY = os.getenv("RAG_OCR_API_KEY", "").strip()
     RAG_OCR_BASE_URL = os.getenv("RAG_OCR_BASE_URL", "").strip()
     RAG_OCR_TIMEOUT_SECONDS = int(os.getenv("RAG_OCR_TIMEOUT_SECONDS", "20"))
+    RAG_OCR_MAX_WORKERS = int(os.getenv("RAG_OCR_MAX_WORKERS", "4"))
+    RAG_OCR_RENDER_MAX_DPI = int(os.getenv("RAG_OCR_RENDER_MAX_DPI", "180"))
+    RAG_OCR_RENDER_MAX_SIDE_PX = int(os.getenv("RAG_OCR_RENDER_MAX_SIDE_PX", "2048"))
     RAG_INDEX_MAX_WORKERS = int(os.getenv("RAG_INDEX_MAX_WORKERS", "2"))
+    RAG_INDEX_QUEUE_MODE = os.getenv("RAG_INDEX_QUEUE_MODE", "embedded").strip().lower()
+    RAG_INDEX_LEASE_SECONDS = _float_env("RAG_INDEX_LEASE_SECONDS", 120.0)
+    RAG_INDEX_HEARTBEAT_SECONDS = _float_env("RAG_INDEX_HEARTBEAT_SECONDS", 30.0)
+    RAG_INDEX_POLL_INTERVAL_SECONDS = _float_env("RAG_INDEX_POLL_INTERVAL_SECONDS", 2.0)
+    RAG_INDEX_MAX_ATTEMPTS = int(os.getenv("RAG_INDEX_MAX_ATTEMPTS", "3"))
+    RAG_INDEX_WINDOW_MAX_CHUNKS = int(os.getenv("RAG_INDEX_WINDOW_MAX_CHUNKS", "256"))
+    RAG_INDEX_MEMORY_BUDGET_MB = int(os.getenv("RAG_INDEX_MEMORY_BUDGET_MB", "64"))
     RAG_CHROMADB_PERSIST_DIR = os.getenv("RAG_CHROMADB_PERSIST_DIR", "uploads/chromadb")
     RAG_CHROMADB_COLLECTION_PREFIX = os.getenv("RAG_CHROMADB_COLLECTION_PREFIX", "rag")
+    RAG_FALLBACK_SEGMENT_MAX_BYTES = int(os.getenv("RAG_FALLBACK_SEGMENT_MAX_BYTES", str(8 * 1024 * 1024)))
+    RAG_FALLBACK_COMPACTION_MIN_BYTES = int(os.getenv("RAG_FALLBACK_COMPACTION_MIN_BYTES", str(16 * 1024 * 1024)))
 
     AUTO_CREATE_DB = os.getenv("AUTO_CREATE_DB", "true").lower() == "true"
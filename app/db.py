@@ -202,6 +202,16 @@ def _ensure_rag_columns(engine) -> None:
         if "rag_index_jobs" in table_names:
             columns = {col["name"] for col in inspector.get_columns("rag_index_jobs")}
             alter_sql = []
+            if "chunks_added" not in columns:
+                alter_sql.append("ADD COLUMN chunks_added INT NOT NULL DEFAULT 0 AFTER chunks_count")
+            if "chunks_unchanged" not in columns:
+                alter_sql.append("ADD COLUMN chunks_unchanged INT NOT NULL DEFAULT 0 AFTER chunks_added")
+            if "chunks_removed" not in columns:
+                alter_sql.append("ADD COLUMN chunks_removed INT NOT NULL DEFAULT 0 AFTER chunks_unchanged")
+            if "pages_total" not in columns:
+                alter_sql.append("ADD COLUMN pages_total INT NOT NULL DEFAULT 0 AFTER chunks_removed")
+            if "pages_done" not in columns:
+                alter_sql.append("ADD COLUMN pages_done INT NOT NULL DEFAULT 0 AFTER pages_total")
             if "requested_chunk_strategy" not in columns:
                 alter_sql.append("ADD COLUMN requested_chunk_strategy VARCHAR(32) NULL AFTER chunks_count")
             if "applied_chunk_strategy" not in columns:
@@ -216,8 +226,23 @@ def _ensure_rag_columns(engine) -> None:
                 alter_sql.append("ADD COLUMN chunk_fallback_used INT NOT NULL DEFAULT 0 AFTER chunk_version")
             if "chunk_fallback_reason" not in columns:
                 alter_sql.append("ADD COLUMN chunk_fallback_reason VARCHAR(1024) NULL AFTER chunk_fallback_used")
+            if "chunking_json" not in columns:
+                alter_sql.append("ADD COLUMN chunking_json JSON NULL AFTER chunk_fallback_reason")
+            if "attempts" not in columns:
+                alter_sql.append("ADD COLUMN attempts INT NOT NULL DEFAULT 0 AFTER chunking_json")
+            if "lease_owner" not in columns:
+                alter_sql.append("ADD COLUMN lease_owner VARCHAR(128) NULL AFTER attempts")
+            if "lease_expires_at" not in columns:
+                alter_sql.append("ADD COLUMN lease_expires_at DATETIME NULL AFTER lease_owner")
+            if "heartbeat_at" not in columns:
+                alter_sql.append("ADD COLUMN heartbeat_at DATETIME NULL AFTER lease_expires_at")
             if alter_sql:
                 conn.execute(text(f"ALTER TABLE rag_index_jobs {', '.join(alter_sql)}"))
+            indexes = {item["name"] for item in inspect(engine).get_indexes("rag_index_jobs")}
+            if "idx_rag_index_jobs_queue" not in indexes:
+                conn.execute(
+                    text("ALTER TABLE rag_index_jobs ADD INDEX idx_rag_index_jobs_queue (status, lease_expires_at, id)")
+                )
 
         if "rag_query_logs" in table_names:
             columns = {col["name"] for col in inspector.get_columns("rag_query_logs")}
@@ -170,6 +170,10 @@ class RagDocument(Base):
         back_populates="document",
         cascade="all, delete-orphan",
     )
+    semantic_segments: Mapped[list["RagSemanticSegment"]] = relationship(
+        back_populates="document",
+        cascade="all, delete-orphan",
+    )
 
 
 class BankruptcyAnalysisRecord(Base):
@@ -229,8 +233,24 @@ class RagChunk(Base):
     document: Mapped["RagDocument"] = relationship(back_populates="chunks")
 
 
+class RagSemanticSegment(Base):
+    __tablename__ = "rag_semantic_segments"
+    __table_args__ = (UniqueConstraint("document_id", "segment_id", name="uq_rag_semantic_segments_document_segment"),)
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    document_id: Mapped[int] = mapped_column(Integer, ForeignKey("rag_documents.id"), nullable=False, index=True)
+    user_id: Mapped[int] = mapped_column(Integer, nullable=False, index=True)
+    workspace_id: Mapped[str] = mapped_column(String(128), nullable=False, index=True)
+    segment_id: Mapped[str] = mapped_column(String(64), nullable=False, index=True)
+    text: Mapped[str] = mapped_column(Text, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+
+    document: Mapped["RagDocument"] = relationship(back_populates="semantic_segments")
+
+
 class RagIndexJob(Base):
     __tablename__ = "rag_index_jobs"
+    __table_args__ = (Index("idx_rag_index_jobs_queue", "status", "lease_expires_at", "id"),)
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     document_id: Mapped[int] = mapped_column(Integer, ForeignKey("rag_documents.id"), nullable=False, index=True)
@@ -240,6 +260,11 @@ class RagIndexJob(Base):
     error_stage: Mapped[str | None] = mapped_column(String(64), nullable=True)
     error_message: Mapped[str | None] = mapped_column(String(2048), nullable=True)
     chunks_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    chunks_added: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    chunks_unchanged: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    chunks_removed: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    pages_total: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    pages_done: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
     requested_chunk_strategy: Mapped[str | None] = mapped_column(String(32), nullable=True)
     applied_chunk_strategy: Mapped[str | None] = mapped_column(String(32), nullable=True)
     chunk_provider: Mapped[str | None] = mapped_column(String(64), nullable=True)
@@ -247,6 +272,11 @@ class RagIndexJob(Base):
     chunk_version: Mapped[str | None] = mapped_column(String(32), nullable=True)
     chunk_fallback_used: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
     chunk_fallback_reason: Mapped[str | None] = mapped_column(String(1024), nullable=True)
+    chunking_json: Mapped[dict | None] = mapped_column(JSON, nullable=True)
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    lease_owner: Mapped[str | None] = mapped_column(String(128), nullable=True)
+    lease_expires_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    heartbeat_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
     started_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
     finished_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
     duration_ms: Mapped[int | None] = mapped_column(Integer, nullable=True)
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import hashlib
 import re
 import secrets
 from pathlib import Path
@@ -26,6 +27,15 @@ def sanitize_workspace_id(workspace_id: str) -> str:
     return normalized.strip("._-") or "default"
 
 
+def workspace_storage_key(workspace_id: str) -> str:
+    digest = hashlib.sha1(str(workspace_id).encode("utf-8")).hexdigest()[:12]
+    return f"{sanitize_workspace_id(workspace_id)}-{digest}"
+
+
+def lexical_index_key(*, user_id: int, workspace_id: str) -> str:
+    return f"user-{int(user_id)}/{workspace_storage_key(workspace_id)}"
+
+
 def uploads_root() -> Path:
     return _resolve_directory(str(current_app.config.get("RAG_UPLOAD_DIR", "uploads/rag")))
 
@@ -42,6 +52,18 @@ def derived_root() -> Path:
     return directory
 
 
+def lexical_root() -> Path:
+    directory = uploads_root() / "lexical"
+    directory.mkdir(parents=True, exist_ok=True)
+    return directory
+
+
+def retrievable_root() -> Path:
+    directory = uploads_root() / "retrievable"
+    directory.mkdir(parents=True, exist_ok=True)
+    return directory
+
+
 def _workspace_dir(root: Path, *, user_id: int, workspace_id: str) -> Path:
     directory = root / f"user-{int(user_id)}" / f"workspace-{sanitize_workspace_id(workspace_id)}"
     directory.mkdir(parents=True, exist_ok=True)
@@ -59,6 +81,11 @@ def create_derived_asset(*, user_id: int, workspace_id: str, document_id: int) -
     return _workspace_dir(derived_root(), user_id=user_id, workspace_id=workspace_id) / filename
 
 
+def page_checkpoint_asset(*, user_id: int, workspace_id: str, document_id: int) -> Path:
+    filename = f"document-{int(document_id)}-ocr-pages.jsonl"
+    return _workspace_dir(derived_root(), user_id=user_id, workspace_id=workspace_id) / filename
+
+
 def cleanup_artifact(path_str: str | None, *, expected_root: Path | None = None) -> None:
     if not path_str:
         return
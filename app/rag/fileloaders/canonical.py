@@ -1,6 +1,8 @@
 from __future__ import annotations
 
 import json
+from collections.abc import Iterable, Iterator
+from pathlib import Path
 
 from ..errors import RAGValidationError
 from ..schemas import TextBlock
@@ -22,9 +24,7 @@ def serialize_canonical_blocks(blocks: list[TextBlock]) -> str:
     return "\n".join(parts).strip()
 
 
-def parse_canonical_text(raw: str) -> list[TextBlock]:
-    lines = str(raw or "").splitlines()
-    blocks: list[TextBlock] = []
+def iter_canonical_blocks(lines: Iterable[str]) -> Iterator[TextBlock]:
     current_metadata: dict | None = None
     current_lines: list[str] = []
     for line in lines:
@@ -47,7 +47,7 @@ def parse_canonical_text(raw: str) -> list[TextBlock]:
                 raise RAGValidationError("canonical text asset is malformed")
             text = "\n".join(current_lines).strip()
             if text:
-                blocks.append(TextBlock(text=text, metadata=dict(current_metadata)))
+                yield TextBlock(text=text, metadata=dict(current_metadata))
             current_metadata = None
             current_lines = []
             continue
@@ -55,4 +55,12 @@ def parse_canonical_text(raw: str) -> list[TextBlock]:
             current_lines.append(line)
     if current_metadata is not None:
         raise RAGValidationError("canonical text asset is incomplete")
-    return blocks
+
+
+def parse_canonical_text(raw: str) -> list[TextBlock]:
+    return list(iter_canonical_blocks(str(raw or "").splitlines()))
+
+
+def iter_canonical_file(path: Path) -> Iterator[TextBlock]:
+    with path.open("r", encoding="utf-8") as handle:
+        yield from iter_canonical_blocks(line for raw in handle for line in raw.splitlines())
@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from threading import Lock
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, slots=True)
+class PageResult:
+    page: int
+    page_hash: str
+    text: str
+    extraction_method: str
+    ocr_provider: str | None = None
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as handle:
+        for chunk in iter(lambda: handle.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def page_hash(*, source_digest: str, page: int) -> str:
+    return hashlib.sha256(f"{source_digest}:{int(page)}".encode("ascii")).hexdigest()
+
+
+class PageCheckpoint:
+    def __init__(self, path: Path, *, on_progress: Callable[[int, int], None] | None = None) -> None:
+        self.path = path
+        self._on_progress = on_progress
+        self._lock = Lock()
+        self._results: dict[int, PageResult] = {}
+        self._total = 0
+        self._done = 0
+        self._load()
+
+    def _load(self) -> None:
+        if not self.path.exists():
+            return
+        valid_bytes = 0
+        with self.path.open("rb") as handle:
+            for raw in handle:
+                if not raw.endswith(b"\n"):
+                    break
+                try:
+                    result = PageResult(**json.loads(raw.decode("utf-8")))
+                except Exception:
+                    break
+                self._results[int(result.page)] = result
+                valid_bytes += len(raw)
+        if valid_bytes < self.path.stat().st_size:
+            logger.warning(
+                "Truncating torn OCR page checkpoint",
+                extra={"event": "rag.ocr.checkpoint_truncated", "path": str(self.path)},
+            )
+            with self.path.open("r+b") as handle:
+                handle.truncate(valid_bytes)
+
+    def completed(self, *, page: int, page_hash: str) -> PageResult | None:
+        result = self._results.get(int(page))
+        if result is None or result.page_hash != page_hash:
+            return None
+        return result
+
+    def start(self, *, total_pages: int, done_pages: int) -> None:
+        with self._lock:
+            self._total = int(total_pages)
+            self._done = int(done_pages)
+            progress = (self._done, self._total)
+        self._report(*progress)
+
+    def record(self, result: PageResult) -> None:
+        line = json.dumps(asdict(result), ensure_ascii=False) + "\n"
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self.path.open("a", encoding="utf-8") as handle:
+                handle.write(line)
+                handle.flush()
+                os.fsync(handle.fileno())
+            self._results[int(result.page)] = result
+            self._done += 1
+            progress = (self._done, self._total)
+        self._report(*progress)
+
+    def _report(self, done: int, total: int) -> None:
+        if self._on_progress is None:
+            return
+        try:
+            self._on_progress(done, total)
+        except Exception:
+            logger.exception("OCR progress callback failed", extra={"event": "rag.ocr.progress_failed"})
+
+    def discard(self) -> None:
+        self.path.unlink(missing_ok=True)
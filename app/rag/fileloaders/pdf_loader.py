@@ -1,14 +1,21 @@
 from __future__ import annotations
 
 import re
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from threading import Lock
 from typing import Callable
 
 from ..errors import RAGValidationError
 from ..schemas import LoadedDocument, TextBlock
 from .canonical import serialize_canonical_blocks
+from .checkpoint import PageCheckpoint, PageResult, file_sha256, page_hash
 from .normalizers import normalize_plain_text
 
+_OCR_MIN_DPI = 96
+_OCR_COLOUR_TOLERANCE = 24
+_OCR_COLOUR_PIXEL_RATIO = 0.01
+
 
 def _useful_character_ratio(text: str) -> float:
     if not text:
@@ -31,27 +38,150 @@ def _is_usable_pdf_text(text: str) -> bool:
     return True
 
 
-def _render_pdf_page_png(path: Path, page_index: int) -> bytes:
-    try:
+class _SharedPdfDocument:
+    def __init__(self, path: Path) -> None:
+        self._path = path
+        self._document = None
+        self.lock = Lock()
+
+    def open(self):
+        if self._document is None:
+            try:
+                import fitz
+            except ImportError as exc:
+                raise RAGValidationError("pdf OCR fallback requires pymupdf dependency") from exc
+            self._document = fitz.open(str(self._path))
+        return self._document
+
+    def close(self) -> None:
+        if self._document is not None:
+            self._document.close()
+            self._document = None
+
+
+def _page_is_grayscale(page) -> bool:
+    import fitz
+
+    thumbnail = page.get_pixmap(dpi=24, colorspace=fitz.csRGB, alpha=False)
+    samples = thumbnail.samples
+    pixel_count = max(1, thumbnail.width * thumbnail.height)
+    coloured = 0
+    for red, green, blue in zip(samples[0::3], samples[1::3], samples[2::3]):
+        if max(red, green, blue) - min(red, green, blue) > _OCR_COLOUR_TOLERANCE:
+            coloured += 1
+    return coloured / pixel_count < _OCR_COLOUR_PIXEL_RATIO
+
+
+def _select_page_dpi(page, *, max_dpi: int, max_side_px: int) -> int:
+    longest_side_pt = max(float(page.rect.width), float(page.rect.height), 1.0)
+    fitted_dpi = int(max_side_px * 72 / longest_side_pt)
+    return max(_OCR_MIN_DPI, min(int(max_dpi), fitted_dpi))
+
+
+def _render_pdf_page_png(
+    source: _SharedPdfDocument,
+    page_index: int,
+    *,
+    max_dpi: int = 180,
+    max_side_px: int = 2048,
+) -> bytes:
+    with source.lock:
+        page = source.open().load_page(int(page_index))
         import fitz
-    except ImportError as exc:
-        raise RAGValidationError("pdf OCR fallback requires pymupdf dependency") from exc
 
-    document = fitz.open(str(path))
-    try:
-        page = document.load_page(int(page_index))
-        pixmap = page.get_pixmap(dpi=180)
+        dpi = _select_page_dpi(page, max_dpi=max_dpi, max_side_px=max_side_px)
+        colorspace = fitz.csGRAY if _page_is_grayscale(page) else fitz.csRGB
+        pixmap = page.get_pixmap(dpi=dpi, colorspace=colorspace, alpha=False)
         return pixmap.tobytes("png")
-    finally:
-        document.close()
 
 
 class PdfFileLoader:
     loader_type = "pdf"
 
-    def __init__(self, *, loader_version: str, ocr_provider_factory: Callable[[], object | None]) -> None:
+    def __init__(
+        self,
+        *,
+        loader_version: str,
+        ocr_provider_factory: Callable[[], object | None],
+        ocr_max_workers: int = 4,
+        ocr_max_dpi: int = 180,
+        ocr_max_side_px: int = 2048,
+        checkpoint: PageCheckpoint | None = None,
+    ) -> None:
         self.loader_version = loader_version
+        self._checkpoint = checkpoint
         self._ocr_provider_factory = ocr_provider_factory
+        self._ocr_max_workers = max(1, int(ocr_max_workers))
+        self._ocr_max_dpi = max(_OCR_MIN_DPI, int(ocr_max_dpi))
+        self._ocr_max_side_px = max(256, int(ocr_max_side_px))
+
+    def _ocr_page(
+        self,
+        *,
+        source: _SharedPdfDocument,
+        ocr_provider,
+        source_name: str,
+        page_number: int,
+        page_hash: str | None,
+    ) -> str:
+        image_bytes = _render_pdf_page_png(
+            source,
+            page_number - 1,
+            max_dpi=self._ocr_max_dpi,
+            max_side_px=self._ocr_max_side_px,
+        )
+        ocr_text = normalize_plain_text(
+            ocr_provider.recognize_page(
+                image_bytes=image_bytes,
+                mime_type="image/png",
+                source_name=source_name,
+                page_number=page_number,
+            )
+        )
+        if not ocr_text:
+            raise RAGValidationError("ocr returned empty text for pdf page")
+        if self._checkpoint is not None and page_hash is not None:
+            self._checkpoint.record(
+                PageResult(
+                    page=page_number,
+                    page_hash=page_hash,
+                    text=ocr_text,
+                    extraction_method="ocr",
+                    ocr_provider=str(getattr(ocr_provider, "provider_name", "unknown")),
+                )
+            )
+        return ocr_text
+
+    def _ocr_pages(
+        self,
+        *,
+        path: Path,
+        ocr_provider,
+        source_name: str,
+        page_numbers: list[int],
+        page_hashes: dict[int, str],
+    ) -> list[str]:
+        source = _SharedPdfDocument(path)
+        executor = ThreadPoolExecutor(
+            max_workers=min(self._ocr_max_workers, len(page_numbers)),
+            thread_name_prefix="rag-pdf-ocr",
+        )
+        try:
+            futures = [
+                executor.submit(
+                    self._ocr_page,
+                    source=source,
+                    ocr_provider=ocr_provider,
+                    source_name=source_name,
+                    page_number=page_number,
+                    page_hash=page_hashes.get(page_number),
+                )
+                for page_number in page_numbers
+            ]
+            return [future.result() for future in futures]
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+            source.close()
 
     def load(self, *, path: Path, source_name: str) -> LoadedDocument:
         try:
@@ -60,13 +190,53 @@ class PdfFileLoader:
             raise RAGValidationError("pdf parsing requires pypdf dependency") from exc
 
         reader = PdfReader(str(path))
-        blocks: list[TextBlock] = []
+        page_texts: list[str | None] = []
         methods_used: set[str] = set()
-        ocr_provider = None
-        for idx, page in enumerate(reader.pages, start=1):
+        for page in reader.pages:
             native_text = normalize_plain_text(page.extract_text() or "")
             if _is_usable_pdf_text(native_text):
                 methods_used.add("native")
+                page_texts.append(native_text)
+            else:
+                page_texts.append(None)
+
+        page_hashes: dict[int, str] = {}
+        ocr_texts: dict[int, tuple[str, str]] = {}
+        ocr_page_numbers = [idx for idx, text in enumerate(page_texts, start=1) if text is None]
+        if self._checkpoint is not None:
+            source_digest = file_sha256(path)
+            for idx in ocr_page_numbers:
+                page_hashes[idx] = page_hash(source_digest=source_digest, page=idx)
+                resumed = self._checkpoint.completed(page=idx, page_hash=page_hashes[idx])
+                if resumed is not None:
+                    ocr_texts[idx] = (resumed.text, str(resumed.ocr_provider or "unknown"))
+            self._checkpoint.start(
+                total_pages=len(page_texts),
+                done_pages=len(page_texts) - len(ocr_page_numbers) + len(ocr_texts),
+            )
+
+        ocr_provider = None
+        pending_page_numbers = [idx for idx in ocr_page_numbers if idx not in ocr_texts]
+        if pending_page_numbers:
+            ocr_provider = self._ocr_provider_factory()
+            if ocr_provider is None:
+                raise RAGValidationError("ocr required for pdf page but OCR provider is unavailable")
+            recognized = self._ocr_pages(
+                path=path,
+                ocr_provider=ocr_provider,
+                source_name=source_name,
+                page_numbers=pending_page_numbers,
+                page_hashes=page_hashes,
+            )
+            provider_name = str(getattr(ocr_provider, "provider_name", "unknown"))
+            for idx, text in zip(pending_page_numbers, recognized, strict=True):
+                ocr_texts[idx] = (text, provider_name)
+        if ocr_texts:
+            methods_used.add("ocr")
+
+        blocks: list[TextBlock] = []
+        for idx, native_text in enumerate(page_texts, start=1):
+            if native_text is not None:
                 blocks.append(
                     TextBlock(
                         text=native_text,
@@ -74,24 +244,7 @@ class PdfFileLoader:
                     )
                 )
                 continue
-
-            if ocr_provider is None:
-                ocr_provider = self._ocr_provider_factory()
-            if ocr_provider is None:
-                raise RAGValidationError("ocr required for pdf page but OCR provider is unavailable")
-
-            image_bytes = _render_pdf_page_png(path, idx - 1)
-            ocr_text = normalize_plain_text(
-                ocr_provider.recognize_page(
-                    image_bytes=image_bytes,
-                    mime_type="image/png",
-                    source_name=source_name,
-                    page_number=idx,
-                )
-            )
-            if not ocr_text:
-                raise RAGValidationError("ocr returned empty text for pdf page")
-            methods_used.add("ocr")
+            ocr_text, provider_name = ocr_texts[idx]
             blocks.append(
                 TextBlock(
                     text=ocr_text,
@@ -99,7 +252,7 @@ class PdfFileLoader:
                         "source": source_name,
                         "page": idx,
                         "extraction_method": "ocr",
-                        "ocr_provider": str(getattr(ocr_provider, "provider_name", "unknown")),
+                        "ocr_provider": provider_name,
                     },
                 )
             )
@@ -119,5 +272,5 @@ class PdfFileLoader:
             blocks=blocks,
             derived_text=serialize_canonical_blocks(blocks),
             ocr_used="ocr" in methods_used,
-            ocr_provider=(str(getattr(ocr_provider, "provider_name", "")) or None) if ocr_provider else None,
+            ocr_provider=next((provider for _, provider in ocr_texts.values()), None),
         )
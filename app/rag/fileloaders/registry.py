@@ -6,6 +6,7 @@ from flask import current_app
 
 from ..errors import RAGValidationError
 from ..schemas import LoadedDocument
+from .checkpoint import PageCheckpoint
 from .docx_loader import DocxFileLoader
 from .interfaces import FileLoader
 from .markdown_loader import MarkdownFileLoader
@@ -14,7 +15,7 @@ from .pdf_loader import PdfFileLoader
 from .txt_loader import TxtFileLoader
 
 
-def get_fileloader(extension: str) -> FileLoader:
+def get_fileloader(extension: str, *, checkpoint: PageCheckpoint | None = None) -> FileLoader:
     ext = str(extension or "").strip().lower().lstrip(".")
     version = str(current_app.config.get("RAG_FILELOADER_VERSION", "v1"))
     if ext == "txt":
@@ -24,10 +25,23 @@ def get_fileloader(extension: str) -> FileLoader:
     if ext == "md":
         return MarkdownFileLoader(loader_version=version)
     if ext == "pdf":
-        return PdfFileLoader(loader_version=version, ocr_provider_factory=get_ocr_provider)
+        return PdfFileLoader(
+            loader_version=version,
+            ocr_provider_factory=get_ocr_provider,
+            ocr_max_workers=int(current_app.config.get("RAG_OCR_MAX_WORKERS", 4)),
+            ocr_max_dpi=int(current_app.config.get("RAG_OCR_RENDER_MAX_DPI", 180)),
+            ocr_max_side_px=int(current_app.config.get("RAG_OCR_RENDER_MAX_SIDE_PX", 2048)),
+            checkpoint=checkpoint,
+        )
     raise RAGValidationError("unsupported document format")
 
 
-def load_source_document(*, path: Path, extension: str, source_name: str) -> LoadedDocument:
-    loader = get_fileloader(extension)
+def load_source_document(
+    *,
+    path: Path,
+    extension: str,
+    source_name: str,
+    checkpoint: PageCheckpoint | None = None,
+) -> LoadedDocument:
+    loader = get_fileloader(extension, checkpoint=checkpoint)
     return loader.load(path=path, source_name=source_name)
@@ -0,0 +1,177 @@
+from __future__ import annotations
+
+import logging
+import os
+import socket
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from threading import Event, Thread
+
+from flask import Flask
+from sqlalchemy import and_, or_, select, update
+
+from ..db import session_scope
+from ..models import RagDocument, RagIndexJob
+from .repository import set_document_status, set_index_job_status
+
+logger = logging.getLogger(__name__)
+
+_work_available = Event()
+
+
+@dataclass(frozen=True, slots=True)
+class ClaimedIndexJob:
+    job_id: int
+    document_id: int
+    user_id: int
+    workspace_id: str
+    chunking: dict | None
+    attempts: int
+
+
+def notify_index_workers() -> None:
+    _work_available.set()
+
+
+def wait_for_index_work(timeout: float) -> None:
+    if _work_available.wait(timeout):
+        _work_available.clear()
+
+
+def new_worker_id(prefix: str = "rag-index") -> str:
+    return f"{prefix}:{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def _fail_exhausted_job(db, job: RagIndexJob) -> None:
+    message = f"index job lease expired after {int(job.attempts)} attempts"
+    set_index_job_status(job=job, status="failed", error_stage="lease", error_message=message)
+    document = db.get(RagDocument, job.document_id)
+    if document is not None and document.status == "indexing":
+        set_document_status(document=document, status="failed", error_message=message)
+    logger.warning(
+        "RAG indexing job abandoned after repeated lease expiry",
+        extra={"event": "rag.index.lease_exhausted", "job_id": int(job.id), "attempts": int(job.attempts)},
+    )
+
+
+def claim_index_job(
+    *,
+    worker_id: str,
+    lease_seconds: float,
+    max_attempts: int,
+    job_id: int | None = None,
+) -> ClaimedIndexJob | None:
+    while True:
+        now = datetime.utcnow()
+        with session_scope() as db:
+            stmt = (
+                select(RagIndexJob)
+                .where(
+                    or_(
+                        RagIndexJob.status == "pending",
+                        and_(
+                            RagIndexJob.status == "running",
+                            or_(RagIndexJob.lease_expires_at.is_(None), RagIndexJob.lease_expires_at < now),
+                        ),
+                    )
+                )
+                .order_by(RagIndexJob.id)
+                .limit(1)
+                .with_for_update(skip_locked=True)
+            )
+            if job_id is not None:
+                stmt = stmt.where(RagIndexJob.id == job_id)
+            job = db.execute(stmt).scalar_one_or_none()
+            if job is None:
+                return None
+            if job.status == "running" and int(job.attempts or 0) >= max(1, int(max_attempts)):
+                _fail_exhausted_job(db, job)
+                continue
+            reclaimed = job.status == "running"
+            job.status = "running"
+            job.attempts = int(job.attempts or 0) + 1
+            job.lease_owner = worker_id
+            job.lease_expires_at = now + timedelta(seconds=float(lease_seconds))
+            job.heartbeat_at = now
+            if job.started_at is None:
+                job.started_at = now
+            claimed = ClaimedIndexJob(
+                job_id=int(job.id),
+                document_id=int(job.document_id),
+                user_id=int(job.user_id),
+                workspace_id=job.workspace_id,
+                chunking=job.chunking_json if isinstance(job.chunking_json, dict) else None,
+                attempts=int(job.attempts),
+            )
+        logger.info(
+            "RAG indexing job claimed",
+            extra={
+                "event": "rag.index.claimed",
+                "job_id": claimed.job_id,
+                "worker_id": worker_id,
+                "attempt": claimed.attempts,
+                "reclaimed": reclaimed,
+            },
+        )
+        return claimed
+
+
+def renew_index_job_lease(*, job_id: int, worker_id: str, lease_seconds: float) -> bool:
+    now = datetime.utcnow()
+    with session_scope() as db:
+        result = db.execute(
+            update(RagIndexJob)
+            .where(
+                RagIndexJob.id == job_id,
+                RagIndexJob.status == "running",
+                RagIndexJob.lease_owner == worker_id,
+            )
+            .values(heartbeat_at=now, lease_expires_at=now + timedelta(seconds=float(lease_seconds)))
+        )
+        return int(result.rowcount or 0) > 0
+
+
+def owns_index_job(job: RagIndexJob, worker_id: str | None) -> bool:
+    return worker_id is None or job.lease_owner == worker_id
+
+
+class IndexJobHeartbeat:
+    def __init__(self, app: Flask, *, job_id: int, worker_id: str, lease_seconds: float, interval_seconds: float) -> None:
+        self._app = app
+        self.job_id = job_id
+        self.worker_id = worker_id
+        self.lease_seconds = lease_seconds
+        self.interval_seconds = max(0.05, float(interval_seconds))
+        self._stop = Event()
+        self._thread = Thread(target=self._run, name=f"rag-index-heartbeat-{job_id}", daemon=True)
+
+    def _run(self) -> None:
+        with self._app.app_context():
+            while not self._stop.wait(self.interval_seconds):
+                try:
+                    renewed = renew_index_job_lease(
+                        job_id=self.job_id,
+                        worker_id=self.worker_id,
+                        lease_seconds=self.lease_seconds,
+                    )
+                except Exception:
+                    logger.exception(
+                        "RAG indexing heartbeat failed",
+                        extra={"event": "rag.index.heartbeat_failed", "job_id": self.job_id},
+                    )
+                    continue
+                if not renewed:
+                    logger.warning(
+                        "RAG indexing job lease lost",
+                        extra={"event": "rag.index.lease_lost", "job_id": self.job_id, "worker_id": self.worker_id},
+                    )
+                    return
+
+    def __enter__(self) -> IndexJobHeartbeat:
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._stop.set()
+        self._thread.join(timeout=self.interval_seconds + 5)
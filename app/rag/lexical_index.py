@@ -0,0 +1,233 @@
+from __future__ import annotations
+
+import heapq
+import json
+import math
+import os
+import re
+import uuid
+from collections import Counter
+from dataclasses import replace
+from pathlib import Path
+from threading import Lock
+
+from .schemas import RetrievalHit
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+RRF_K = 60
+
+_VERSION_FILE = "VERSION"
+_BUILT_MARKER = "BUILT"
+_DOCUMENT_PATTERN = re.compile(r"^document-(\d+)\.jsonl$")
+_CJK_CHARS = r"\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff"
+_TOKEN_RE = re.compile(rf"[0-9A-Za-z]+(?:[./_-][0-9A-Za-z]+)*|[{_CJK_CHARS}]+")
+_CJK_RE = re.compile(rf"[{_CJK_CHARS}]")
+
+_indexes_lock = Lock()
+_indexes: dict[str, LexicalIndex] = {}
+
+
+def tokenize(text: str) -> list[str]:
+    tokens: list[str] = []
+    for match in _TOKEN_RE.finditer(str(text or "")):
+        run = match.group(0)
+        if _CJK_RE.match(run):
+            if len(run) == 1:
+                tokens.append(run)
+            else:
+                tokens.extend(run[index : index + 2] for index in range(len(run) - 1))
+            continue
+        lowered = run.lower()
+        tokens.append(lowered)
+        parts = re.split(r"[./_-]", lowered)
+        if len(parts) > 1:
+            tokens.extend(part for part in parts if part)
+    return tokens
+
+
+def fuse_ranked_hits(rankings: list[list[RetrievalHit]], *, k: int = RRF_K) -> list[RetrievalHit]:
+    fused: dict[str, float] = {}
+    first_seen: dict[str, RetrievalHit] = {}
+    for ranking in rankings:
+        for rank, hit in enumerate(ranking, start=1):
+            fused[hit.chunk_id] = fused.get(hit.chunk_id, 0.0) + 1.0 / (k + rank)
+            first_seen.setdefault(hit.chunk_id, hit)
+    ordered = sorted(fused.items(), key=lambda item: -item[1])
+    return [replace(first_seen[chunk_id], score=score) for chunk_id, score in ordered]
+
+
+def _write_version(directory: Path) -> None:
+    tmp_path = directory / f".{_VERSION_FILE}.{uuid.uuid4().hex}"
+    tmp_path.write_text(uuid.uuid4().hex, encoding="utf-8")
+    os.replace(tmp_path, directory / _VERSION_FILE)
+
+
+class LexicalDocumentWriter:
+    def __init__(self, directory: Path, document_id: int) -> None:
+        self._directory = directory
+        self._target = directory / f"document-{int(document_id)}.jsonl"
+        self._tmp_path = directory / f".document-{int(document_id)}.{uuid.uuid4().hex}.tmp"
+        self._directory.mkdir(parents=True, exist_ok=True)
+        self._handle = self._tmp_path.open("w", encoding="utf-8")
+        self.chunk_count = 0
+
+    def add(self, chunk_id: str, text: str) -> None:
+        terms = Counter(tokenize(text))
+        record = [str(chunk_id), sum(terms.values()), dict(terms)]
+        self._handle.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+        self.chunk_count += 1
+
+    def commit(self) -> None:
+        if self._handle.closed:
+            return
+        self._handle.flush()
+        os.fsync(self._handle.fileno())
+        self._handle.close()
+        os.replace(self._tmp_path, self._target)
+        _write_version(self._directory)
+
+    def abort(self) -> None:
+        if self._handle.closed:
+            return
+        self._handle.close()
+        self._tmp_path.unlink(missing_ok=True)
+
+
+class _WorkspaceTerms:
+    def __init__(self, directory: Path) -> None:
+        self.directory = directory
+        self.lock = Lock()
+        self.version: str | None = None
+        self.documents: dict[int, tuple[tuple[int, int, int], list[str], set[str]]] = {}
+        self.postings: dict[str, dict[str, int]] = {}
+        self.lengths: dict[str, int] = {}
+        self.total_length = 0
+
+    def _unload(self, document_id: int) -> None:
+        _, chunk_ids, document_terms = self.documents.pop(document_id, ((0, 0, 0), [], set()))
+        for chunk_id in chunk_ids:
+            self.total_length -= self.lengths.pop(chunk_id, 0)
+        for term in document_terms:
+            postings = self.postings.get(term)
+            if postings is None:
+                continue
+            for chunk_id in chunk_ids:
+                postings.pop(chunk_id, None)
+            if not postings:
+                del self.postings[term]
+
+    def _load(self, document_id: int, path: Path, signature: tuple[int, int, int]) -> None:
+        chunk_ids: list[str] = []
+        document_terms: set[str] = set()
+        with path.open("r", encoding="utf-8") as handle:
+            for line in handle:
+                chunk_id, length, terms = json.loads(line)
+                chunk_ids.append(chunk_id)
+                self.lengths[chunk_id] = int(length)
+                self.total_length += int(length)
+                for term, count in terms.items():
+                    self.postings.setdefault(term, {})[chunk_id] = int(count)
+                document_terms.update(terms)
+        self.documents[document_id] = (signature, chunk_ids, document_terms)
+
+    def refresh(self) -> None:
+        version_path = self.directory / _VERSION_FILE
+        try:
+            version = version_path.read_text(encoding="utf-8")
+        except FileNotFoundError:
+            version = ""
+        if version == self.version:
+            return
+        on_disk: dict[int, tuple[Path, tuple[int, int, int]]] = {}
+        if self.directory.exists():
+            for entry in os.scandir(self.directory):
+                match = _DOCUMENT_PATTERN.match(entry.name)
+                if match is not None:
+                    stat = entry.stat()
+                    on_disk[int(match.group(1))] = (Path(entry.path), (stat.st_ino, stat.st_mtime_ns, stat.st_size))
+        for document_id in list(self.documents):
+            current = on_disk.get(document_id)
+            if current is None or current[1] != self.documents[document_id][0]:
+                self._unload(document_id)
+        for document_id, (path, signature) in on_disk.items():
+            if document_id not in self.documents:
+                try:
+                    self._load(document_id, path, signature)
+                except FileNotFoundError:
+                    continue
+        self.version = version
+
+    def search(self, terms: list[str], limit: int) -> list[tuple[str, float]]:
+        chunk_count = len(self.lengths)
+        if not chunk_count or not terms:
+            return []
+        average_length = max(self.total_length / chunk_count, 1.0)
+        scores: dict[str, float] = {}
+        for term in set(terms):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1.0 + (chunk_count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for chunk_id, frequency in postings.items():
+                norm = BM25_K1 * (1.0 - BM25_B + BM25_B * self.lengths.get(chunk_id, 0) / average_length)
+                scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * frequency * (BM25_K1 + 1.0) / (frequency + norm)
+        return heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+
+
+class LexicalIndex:
+    def __init__(self, root: Path) -> None:
+        self.root = root
+        self._workspaces: dict[str, _WorkspaceTerms] = {}
+        self._lock = Lock()
+
+    def _directory(self, workspace_key: str) -> Path:
+        return self.root / workspace_key
+
+    def _workspace(self, workspace_key: str) -> _WorkspaceTerms:
+        with self._lock:
+            terms = self._workspaces.get(workspace_key)
+            if terms is None:
+                terms = _WorkspaceTerms(self._directory(workspace_key))
+                self._workspaces[workspace_key] = terms
+            return terms
+
+    def is_built(self, workspace_key: str) -> bool:
+        return (self._directory(workspace_key) / _BUILT_MARKER).exists()
+
+    def mark_built(self, workspace_key: str) -> None:
+        directory = self._directory(workspace_key)
+        directory.mkdir(parents=True, exist_ok=True)
+        (directory / _BUILT_MARKER).touch()
+        _write_version(directory)
+
+    def document_writer(self, workspace_key: str, document_id: int) -> LexicalDocumentWriter:
+        return LexicalDocumentWriter(self._directory(workspace_key), document_id)
+
+    def remove_document(self, workspace_key: str, document_id: int) -> None:
+        directory = self._directory(workspace_key)
+        path = directory / f"document-{int(document_id)}.jsonl"
+        if path.exists():
+            path.unlink(missing_ok=True)
+            _write_version(directory)
+
+    def search(self, workspace_key: str, query: str, *, limit: int) -> list[tuple[str, float]]:
+        terms = self._workspace(workspace_key)
+        with terms.lock:
+            terms.refresh()
+            return terms.search(tokenize(query), max(0, int(limit)))
+
+
+def get_lexical_index(root: Path) -> LexicalIndex:
+    key = str(Path(root).resolve(strict=False))
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = LexicalIndex(Path(key))
+            _indexes[key] = index
+        return index
+
+
+def reset_lexical_indexes_for_tests() -> None:
+    with _indexes_lock:
+        _indexes.clear()
@@ -1,7 +1,9 @@
 from __future__ import annotations
 
 import hashlib
+import json
 import re
+from collections.abc import Iterable, Iterator
 from dataclasses import dataclass
 
 from ..errors import RAGChunkingError, RAGValidationError
@@ -9,6 +11,7 @@ from ..schemas import ChunkPayload, ChunkingApplied, ChunkingBounds, ChunkingReq
 
 
 ALLOWED_CHUNK_STRATEGIES = {"paragraph", "semantic_llm"}
+EMBEDDING_UNITS = {"sentence", "segment"}
 _SENTENCE_SPLIT_RE = re.compile(r"(?<=[。！？!?；;])|(?<=\.)\s+|[\r\n]+")
 
 
@@ -28,6 +31,7 @@ def resolve_chunking_plan(*, payload: dict | None, config) -> ChunkingPlan:
     max_tokens = None
     overlap_tokens = None
     min_tokens = None
+    embedding_unit = ""
     if isinstance(chunking, dict):
         strategy_raw = chunking.get("strategy")
         if isinstance(strategy_raw, str):
@@ -35,6 +39,12 @@ def resolve_chunking_plan(*, payload: dict | None, config) -> ChunkingPlan:
         version_raw = chunking.get("version")
         if isinstance(version_raw, str) and version_raw.strip():
             version = version_raw.strip()
+        unit_raw = chunking.get("embeddingUnit")
+        if unit_raw is None:
+            unit_raw = chunking.get("embedding_unit")
+        if unit_raw is not None and not isinstance(unit_raw, str):
+            raise RAGValidationError("chunking.embeddingUnit must be a string")
+        embedding_unit = str(unit_raw or "").strip().lower()
         for key in ("targetTokens", "maxTokens", "overlapTokens", "minTokens"):
             raw = chunking.get(key)
             if raw is not None and not isinstance(raw, int):
@@ -67,6 +77,10 @@ def resolve_chunking_plan(*, payload: dict | None, config) -> ChunkingPlan:
     if fallback not in allowed:
         raise RAGValidationError("RAG_CHUNK_FALLBACK_STRATEGY must be present in RAG_CHUNK_STRATEGY_ALLOWED")
 
+    embedding_unit = embedding_unit or str(config.get("RAG_CHUNK_EMBEDDING_UNIT", "sentence")).strip().lower()
+    if embedding_unit not in EMBEDDING_UNITS:
+        raise RAGValidationError(f"chunking embedding unit is invalid; allowed: {', '.join(sorted(EMBEDDING_UNITS))}")
+
     bounds = ChunkingBounds(
         target_tokens=max(32, int(target_tokens or config.get("RAG_CHUNK_SEMANTIC_TARGET_TOKENS", 450))),
         max_tokens=max(32, int(max_tokens or config.get("RAG_CHUNK_SEMANTIC_MAX_TOKENS", 700))),
@@ -88,6 +102,7 @@ def resolve_chunking_plan(*, payload: dict | None, config) -> ChunkingPlan:
             max_tokens=bounds.max_tokens,
             overlap_tokens=bounds.overlap_tokens,
             min_tokens=bounds.min_tokens,
+            embedding_unit=embedding_unit,
         ),
         bounds=bounds,
         allowed=allowed,
@@ -123,49 +138,45 @@ def _split_text_by_max_tokens(text: str, max_tokens: int) -> list[tuple[str, int
     return parts
 
 
-def _merge_short_segments(segments: list[SemanticSegment], min_tokens: int) -> list[SemanticSegment]:
-    merged: list[SemanticSegment] = []
+def _iter_merged_short_segments(segments: Iterable[SemanticSegment], min_tokens: int) -> Iterator[SemanticSegment]:
+    pending: SemanticSegment | None = None
     for segment in segments:
-        if merged and estimate_tokens(segment.text) < min_tokens:
-            prev = merged[-1]
-            prev.text = f"{prev.text}\n{segment.text}".strip()
-            if not prev.summary and segment.summary:
-                prev.summary = segment.summary
-            if not prev.topic and segment.topic:
-                prev.topic = segment.topic
+        if pending is not None and estimate_tokens(segment.text) < min_tokens:
+            pending.text = f"{pending.text}\n{segment.text}".strip()
+            if not pending.summary and segment.summary:
+                pending.summary = segment.summary
+            if not pending.topic and segment.topic:
+                pending.topic = segment.topic
             continue
-        merged.append(
-            SemanticSegment(
-                text=segment.text,
-                metadata=dict(segment.metadata),
-                topic=segment.topic,
-                summary=segment.summary,
-            )
+        if pending is not None:
+            yield pending
+        pending = SemanticSegment(
+            text=segment.text,
+            metadata=dict(segment.metadata),
+            topic=segment.topic,
+            summary=segment.summary,
         )
-    return merged
+    if pending is not None:
+        yield pending
 
 
-def enforce_semantic_bounds(*, segments: list[SemanticSegment], bounds: ChunkingBounds) -> list[SemanticSegment]:
-    staged = _merge_short_segments(segments, bounds.min_tokens)
-    bounded: list[SemanticSegment] = []
-    for segment in staged:
-        pieces = _split_text_by_max_tokens(segment.text, bounds.max_tokens)
-        if not pieces:
-            continue
-        for text, start, end in pieces:
+def iter_semantic_bounds(*, segments: Iterable[SemanticSegment], bounds: ChunkingBounds) -> Iterator[SemanticSegment]:
+    for segment in _iter_merged_short_segments(segments, bounds.min_tokens):
+        for text, start, end in _split_text_by_max_tokens(segment.text, bounds.max_tokens):
             metadata = dict(segment.metadata)
             base_start = int(metadata.get("offset_start", 0))
             metadata["offset_start"] = base_start + start
             metadata["offset_end"] = base_start + end
-            bounded.append(
-                SemanticSegment(
-                    text=text,
-                    metadata=metadata,
-                    topic=segment.topic,
-                    summary=segment.summary,
-                )
+            yield SemanticSegment(
+                text=text,
+                metadata=metadata,
+                topic=segment.topic,
+                summary=segment.summary,
             )
-    return bounded
+
+
+def enforce_semantic_bounds(*, segments: list[SemanticSegment], bounds: ChunkingBounds) -> list[SemanticSegment]:
+    return list(iter_semantic_bounds(segments=segments, bounds=bounds))
 
 
 def _split_segment_sentences(text: str) -> list[str]:
@@ -205,13 +216,12 @@ def _sentence_spans(segment_text: str, sentences: list[str]) -> list[tuple[str,
     return spans
 
 
-def paragraph_blocks_to_semantic_segments(
+def iter_paragraph_segments(
     *,
-    blocks: list[dict],
+    blocks: Iterable[dict],
     source_name: str,
     source_tag: str = "paragraph",
-) -> list[SemanticSegment]:
-    segments: list[SemanticSegment] = []
+) -> Iterator[SemanticSegment]:
     for block_index, block in enumerate(blocks):
         text = str(block.get("text", "")).strip()
         if not text:
@@ -222,20 +232,28 @@ def paragraph_blocks_to_semantic_segments(
         metadata["offset_start"] = 0
         metadata["offset_end"] = len(text)
         metadata["semantic_segment_source"] = source_tag
-        segments.append(SemanticSegment(text=text, metadata=metadata, topic=None, summary=None))
-    return segments
+        yield SemanticSegment(text=text, metadata=metadata, topic=None, summary=None)
 
 
-def semantic_segments_to_payloads(
+def paragraph_blocks_to_semantic_segments(
     *,
-    segments: list[SemanticSegment],
+    blocks: list[dict],
+    source_name: str,
+    source_tag: str = "paragraph",
+) -> list[SemanticSegment]:
+    return list(iter_paragraph_segments(blocks=blocks, source_name=source_name, source_tag=source_tag))
+
+
+def iter_segment_payloads(
+    *,
+    segments: Iterable[SemanticSegment],
     document_id: int,
     source_name: str,
     strategy: str,
     version: str,
     segmentation_source: str | None = None,
-) -> list[ChunkPayload]:
-    payloads: list[ChunkPayload] = []
+    embedding_unit: str = "sentence",
+) -> Iterator[ChunkPayload]:
     for segment_index, segment in enumerate(segments):
         segment_text = str(segment.text).strip()
         if not segment_text:
@@ -260,6 +278,38 @@ def semantic_segments_to_payloads(
             sentence_items = [(segment_text, 0, len(segment_text))]
         sentence_count = len(sentence_items)
 
+        if embedding_unit == "segment":
+            metadata = dict(base_metadata)
+            metadata["source"] = source_name
+            metadata["document_id"] = document_id
+            metadata["chunk_strategy"] = strategy
+            metadata["chunk_version"] = version
+            metadata["token_count"] = estimate_tokens(segment_text)
+            metadata["offset_start"] = segment_offset_start
+            metadata["offset_end"] = segment_offset_end
+            metadata["embedding_unit"] = "segment"
+            metadata["semantic_segment_id"] = semantic_segment_id
+            metadata["semantic_segment_index"] = segment_index
+            metadata["semantic_segment_sentence_count"] = sentence_count
+            metadata["semantic_segment_text"] = segment_text
+            metadata["semantic_segment_offset_start"] = segment_offset_start
+            metadata["semantic_segment_offset_end"] = segment_offset_end
+            metadata["semantic_segment_source"] = segmentation_source or strategy
+            metadata["semantic_sentence_offsets"] = json.dumps(
+                [[local_start, local_end] for _, local_start, local_end in sentence_items]
+            )
+            if segment.topic:
+                metadata["topic"] = segment.topic
+                metadata["semantic_segment_topic"] = segment.topic
+            if segment.summary:
+                metadata["summary"] = segment.summary
+                metadata["semantic_segment_summary"] = segment.summary
+            chunk_id = hashlib.sha1(
+                f"{document_id}:{strategy}:{version}:{semantic_segment_id}:segment:{segment_text}".encode("utf-8")
+            ).hexdigest()
+            yield ChunkPayload(chunk_id=chunk_id, text=segment_text, metadata=metadata)
+            continue
+
         for sentence_index, (sentence_text, local_start, local_end) in enumerate(sentence_items):
             metadata = dict(base_metadata)
             metadata["source"] = source_name
@@ -288,8 +338,47 @@ def semantic_segments_to_payloads(
                     "utf-8"
                 )
             ).hexdigest()
-            payloads.append(ChunkPayload(chunk_id=chunk_id, text=sentence_text, metadata=metadata))
-    return payloads
+            yield ChunkPayload(chunk_id=chunk_id, text=sentence_text, metadata=metadata)
+
+
+def parse_sentence_offsets(metadata: dict) -> list[list[int]] | None:
+    raw = metadata.get("semantic_sentence_offsets") if isinstance(metadata, dict) else None
+    if not isinstance(raw, str):
+        return None
+    try:
+        offsets = json.loads(raw)
+    except ValueError:
+        return None
+    if not isinstance(offsets, list):
+        return None
+    return [
+        [int(item[0]), int(item[1])]
+        for item in offsets
+        if isinstance(item, list) and len(item) == 2 and all(isinstance(value, int) for value in item)
+    ]
+
+
+def semantic_segments_to_payloads(
+    *,
+    segments: list[SemanticSegment],
+    document_id: int,
+    source_name: str,
+    strategy: str,
+    version: str,
+    segmentation_source: str | None = None,
+    embedding_unit: str = "sentence",
+) -> list[ChunkPayload]:
+    return list(
+        iter_segment_payloads(
+            segments=segments,
+            document_id=document_id,
+            source_name=source_name,
+            strategy=strategy,
+            version=version,
+            segmentation_source=segmentation_source,
+            embedding_unit=embedding_unit,
+        )
+    )
 
 
 def ensure_semantic_output(segments: list[SemanticSegment], strategy: str) -> None:
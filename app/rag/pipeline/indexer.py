@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+from collections.abc import Iterable, Iterator
 from pathlib import Path
 
 from flask import current_app
@@ -9,16 +10,15 @@ from ..fileloaders import load_source_document
 from ..schemas import ChunkPayload, ChunkingApplied, ChunkingRequest, TextBlock
 from .chunking import (
     build_chunking_applied,
-    enforce_semantic_bounds,
     ensure_semantic_output,
-    paragraph_blocks_to_semantic_segments,
+    iter_paragraph_segments,
+    iter_segment_payloads,
+    iter_semantic_bounds,
     resolve_chunking_plan,
-    semantic_segments_to_payloads,
 )
 
 
-def normalize_blocks(blocks: list[TextBlock]) -> list[dict]:
-    normalized: list[dict] = []
+def iter_normalized_blocks(blocks: Iterable[TextBlock]) -> Iterator[dict]:
     for block in blocks:
         text = block.text.strip()
         if not text:
@@ -26,13 +26,25 @@ def normalize_blocks(blocks: list[TextBlock]) -> list[dict]:
         metadata = dict(block.metadata)
         if not metadata.get("source"):
             raise RAGValidationError("normalized text block missing source metadata")
-        normalized.append({"text": text, "metadata": metadata})
-    return normalized
+        yield {"text": text, "metadata": metadata}
 
 
-def chunk_document_blocks(
+def normalize_blocks(blocks: list[TextBlock]) -> list[dict]:
+    return list(iter_normalized_blocks(blocks))
+
+
+def _require_payloads(payloads: Iterable[ChunkPayload], message: str) -> Iterator[ChunkPayload]:
+    produced = False
+    for payload in payloads:
+        produced = True
+        yield payload
+    if not produced:
+        raise RAGChunkingError(message)
+
+
+def iter_document_chunks(
     *,
-    blocks: list[TextBlock],
+    blocks: Iterable[TextBlock],
     document_id: int,
     source_name: str,
     chunker,
@@ -40,8 +52,7 @@ def chunk_document_blocks(
     chunking_request: ChunkingRequest | None,
     chunk_size: int,
     overlap: int,
-) -> tuple[list[ChunkPayload], ChunkingApplied]:
-    normalized = normalize_blocks(blocks)
+) -> tuple[Iterator[ChunkPayload], ChunkingApplied]:
     chunking_payload = None
     if chunking_request is not None:
         chunking_payload = {
@@ -51,28 +62,27 @@ def chunk_document_blocks(
             "max_tokens": chunking_request.max_tokens,
             "overlap_tokens": chunking_request.overlap_tokens,
             "min_tokens": chunking_request.min_tokens,
+            "embedding_unit": chunking_request.embedding_unit,
         }
     plan = resolve_chunking_plan(payload={"chunking": chunking_payload} if chunking_payload else None, config=current_app.config)
     requested_strategy = plan.request.strategy
     version = plan.request.version or str(current_app.config.get("RAG_CHUNK_VERSION", "v1"))
 
     if requested_strategy == "paragraph":
-        paragraph_segments = paragraph_blocks_to_semantic_segments(
-            blocks=normalized,
+        paragraph_segments = iter_paragraph_segments(
+            blocks=iter_normalized_blocks(blocks),
             source_name=source_name,
             source_tag="paragraph",
         )
-        bounded = enforce_semantic_bounds(segments=paragraph_segments, bounds=plan.bounds)
-        payloads = semantic_segments_to_payloads(
-            segments=bounded,
+        payloads = iter_segment_payloads(
+            segments=iter_semantic_bounds(segments=paragraph_segments, bounds=plan.bounds),
             document_id=document_id,
             source_name=source_name,
             strategy="paragraph",
             version=version,
             segmentation_source="paragraph",
+            embedding_unit=plan.request.embedding_unit,
         )
-        if not payloads:
-            raise RAGChunkingError("paragraph strategy generated no chunk payloads")
         applied = build_chunking_applied(
             requested_strategy=requested_strategy,
             strategy="paragraph",
@@ -82,58 +92,34 @@ def chunk_document_blocks(
             fallback_used=False,
             fallback_reason=None,
         )
-        return payloads, applied
+        return _require_payloads(payloads, "paragraph strategy generated no chunk payloads"), applied
 
-    fallback_reason = None
+    normalized = normalize_blocks(blocks)
     try:
         segments = semantic_provider.segment(
             strategy=requested_strategy,
             source_name=source_name,
             blocks=normalized,
+            bounds=plan.bounds,
         )
         ensure_semantic_output(segments, requested_strategy)
-        bounded = enforce_semantic_bounds(segments=segments, bounds=plan.bounds)
-        payloads = semantic_segments_to_payloads(
-            segments=bounded,
-            document_id=document_id,
-            source_name=source_name,
-            strategy=requested_strategy,
-            version=version,
-            segmentation_source="semantic_llm",
-        )
-        if not payloads:
-            raise RAGChunkingError(f"{requested_strategy} generated no chunk payloads")
-        applied = build_chunking_applied(
-            requested_strategy=requested_strategy,
-            strategy=requested_strategy,
-            provider=semantic_provider.provider_name,
-            model=semantic_provider.model_name,
-            version=version,
-            fallback_used=False,
-            fallback_reason=None,
-        )
-        return payloads, applied
     except RAGChunkingError as exc:
-        fallback = plan.fallback_strategy
-        if fallback != "paragraph":
+        if plan.fallback_strategy != "paragraph":
             raise
-        fallback_reason = str(exc)
-        paragraph_segments = paragraph_blocks_to_semantic_segments(
+        paragraph_segments = iter_paragraph_segments(
             blocks=normalized,
             source_name=source_name,
             source_tag="paragraph",
         )
-        bounded = enforce_semantic_bounds(segments=paragraph_segments, bounds=plan.bounds)
-        payloads = semantic_segments_to_payloads(
-            segments=bounded,
+        payloads = iter_segment_payloads(
+            segments=iter_semantic_bounds(segments=paragraph_segments, bounds=plan.bounds),
             document_id=document_id,
             source_name=source_name,
             strategy=requested_strategy,
             version=version,
             segmentation_source="paragraph",
+            embedding_unit=plan.request.embedding_unit,
         )
-        if not payloads:
-            raise RAGChunkingError("paragraph fallback generated no chunk payloads")
         applied = build_chunking_applied(
             requested_strategy=requested_strategy,
             strategy=requested_strategy,
@@ -141,9 +127,79 @@ def chunk_document_blocks(
             model=chunker.provider_name,
             version=version,
             fallback_used=True,
-            fallback_reason=fallback_reason,
+            fallback_reason=str(exc),
         )
-        return payloads, applied
+        return _require_payloads(payloads, "paragraph fallback generated no chunk payloads"), applied
+
+    payloads = iter_segment_payloads(
+        segments=iter_semantic_bounds(segments=segments, bounds=plan.bounds),
+        document_id=document_id,
+        source_name=source_name,
+        strategy=requested_strategy,
+        version=version,
+        segmentation_source="semantic_llm",
+        embedding_unit=plan.request.embedding_unit,
+    )
+    applied = build_chunking_applied(
+        requested_strategy=requested_strategy,
+        strategy=requested_strategy,
+        provider=semantic_provider.provider_name,
+        model=semantic_provider.model_name,
+        version=version,
+        fallback_used=False,
+        fallback_reason=None,
+    )
+    return _require_payloads(payloads, f"{requested_strategy} generated no chunk payloads"), applied
+
+
+def chunk_document_blocks(
+    *,
+    blocks: list[TextBlock],
+    document_id: int,
+    source_name: str,
+    chunker,
+    semantic_provider,
+    chunking_request: ChunkingRequest | None,
+    chunk_size: int,
+    overlap: int,
+) -> tuple[list[ChunkPayload], ChunkingApplied]:
+    payloads, applied = iter_document_chunks(
+        blocks=blocks,
+        document_id=document_id,
+        source_name=source_name,
+        chunker=chunker,
+        semantic_provider=semantic_provider,
+        chunking_request=chunking_request,
+        chunk_size=chunk_size,
+        overlap=overlap,
+    )
+    return list(payloads), applied
+
+
+def estimate_payload_bytes(payload: ChunkPayload, *, vector_dimension: int) -> int:
+    metadata_chars = sum(len(str(value)) for value in payload.metadata.values())
+    return 32 * max(0, vector_dimension) + 2 * (len(payload.text) + metadata_chars) + 512
+
+
+def iter_payload_windows(
+    payloads: Iterable[ChunkPayload],
+    *,
+    max_chunks: int,
+    max_bytes: int,
+    vector_dimension: int,
+) -> Iterator[list[ChunkPayload]]:
+    window: list[ChunkPayload] = []
+    window_bytes = 0
+    for payload in payloads:
+        size = estimate_payload_bytes(payload, vector_dimension=vector_dimension)
+        if window and (len(window) >= max_chunks or window_bytes + size > max_bytes):
+            yield window
+            window = []
+            window_bytes = 0
+        window.append(payload)
+        window_bytes += size
+    if window:
+        yield window
 
 
 def parse_and_chunk_document(
@@ -1,16 +1,55 @@
 from __future__ import annotations
 
-import json
 import math
 from pathlib import Path
 from threading import Lock
 from typing import Any
 
+import numpy as np
+
 from ..errors import RAGValidationError
 from ..schemas import ChunkPayload, RetrievalHit
+from .fallback_wal import FallbackCollectionLog, apply_record
 
 _fallback_lock = Lock()
 _fallback_data: dict[str, dict[str, dict[str, Any]]] = {}
+_fallback_indexes: dict[str, "_FallbackMatrixIndex"] = {}
+_fallback_logs: dict[str, FallbackCollectionLog] = {}
+_client_lock = Lock()
+_clients: dict[str, Any] = {}
+
+
+def _get_chroma_client(persist_dir: Path) -> Any:
+    key = str(persist_dir.resolve())
+    with _client_lock:
+        if key in _clients:
+            return _clients[key]
+        try:
+            import chromadb
+
+            client = chromadb.PersistentClient(path=key)
+        except Exception:
+            client = None
+        _clients[key] = client
+        return client
+
+
+def _stale_collection_errors() -> tuple[type[BaseException], ...]:
+    try:
+        from chromadb import errors as chroma_errors
+    except Exception:
+        return ()
+    names = ("NotFoundError", "InvalidCollectionException")
+    return tuple(getattr(chroma_errors, name) for name in names if hasattr(chroma_errors, name))
+
+
+def reset_chroma_clients_for_tests() -> None:
+    with _client_lock:
+        _clients.clear()
+    with _fallback_lock:
+        _fallback_data.clear()
+        _fallback_indexes.clear()
+        _fallback_logs.clear()
 
 
 def _cosine_similarity(left: list[float], right: list[float]) -> float:
@@ -24,42 +63,166 @@ def _cosine_similarity(left: list[float], right: list[float]) -> float:
     return numerator / (left_norm * right_norm)
 
 
+class _FallbackMatrixIndex:
+    def __init__(self, collection: dict[str, Any]) -> None:
+        self.ids = list(collection["vectors"].keys())
+        self.metadatas = [collection["metadatas"].get(chunk_id) or {} for chunk_id in self.ids]
+        vectors = [collection["vectors"][chunk_id] for chunk_id in self.ids]
+        dimensions = {len(vector) for vector in vectors if isinstance(vector, list)}
+        self.uniform = len(dimensions) <= 1 and all(isinstance(vector, list) for vector in vectors)
+        self.dimension = next(iter(dimensions)) if len(dimensions) == 1 else 0
+        if self.uniform and vectors:
+            self.matrix = np.asarray(vectors, dtype=np.float32).reshape(len(vectors), self.dimension)
+        else:
+            self.matrix = np.zeros((0, 0), dtype=np.float32)
+        self.norms = np.linalg.norm(self.matrix, axis=1) if self.matrix.size else np.zeros(len(self.ids), dtype=np.float32)
+        self._masks: dict[tuple[str, str, Any], np.ndarray] = {}
+
+    def filter_mask(self, filters: dict[str, str | int]) -> np.ndarray:
+        mask = np.ones(len(self.ids), dtype=bool)
+        for key, value in filters.items():
+            cache_key = (key, type(value).__name__, value)
+            column_mask = self._masks.get(cache_key)
+            if column_mask is None:
+                column_mask = np.fromiter(
+                    (metadata.get(key) == value for metadata in self.metadatas),
+                    dtype=bool,
+                    count=len(self.ids),
+                )
+                self._masks[cache_key] = column_mask
+            mask &= column_mask
+        return mask
+
+    def candidate_positions(self, query_vector: list[float], mask: np.ndarray, limit: int) -> np.ndarray:
+        positions = np.flatnonzero(mask)
+        if not self.uniform or len(query_vector) != self.dimension or positions.size <= limit:
+            return positions
+        query = np.asarray(query_vector, dtype=np.float32)
+        query_norm = float(np.linalg.norm(query))
+        if query_norm == 0:
+            return positions
+        norms = self.norms[positions]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            scores = (self.matrix[positions] @ query) / (norms * query_norm)
+        scores = np.where(norms > 0, scores, -1.0)
+        selected = np.argpartition(-scores, limit - 1)[:limit]
+        return positions[np.sort(selected)]
+
+
 class ChromaVectorStore:
     provider_name = "chromadb"
 
-    def __init__(self, *, persist_dir: str, collection_prefix: str) -> None:
+    def __init__(
+        self,
+        *,
+        persist_dir: str,
+        collection_prefix: str,
+        fallback_segment_max_bytes: int = 8 * 1024 * 1024,
+        fallback_compaction_min_bytes: int = 16 * 1024 * 1024,
+    ) -> None:
         self._persist_dir = Path(persist_dir)
         self._persist_dir.mkdir(parents=True, exist_ok=True)
         self._collection_prefix = collection_prefix
-        self._chroma_client = None
-        try:
-            import chromadb
-
-            self._chroma_client = chromadb.PersistentClient(path=str(self._persist_dir))
-        except Exception:
-            self._chroma_client = None
+        self._fallback_segment_max_bytes = fallback_segment_max_bytes
+        self._fallback_compaction_min_bytes = fallback_compaction_min_bytes
+        self._chroma_client = _get_chroma_client(self._persist_dir)
+        self._collections_lock = Lock()
+        self._collections: dict[str, Any] = {}
 
     def _collection_key(self, workspace_id: str, collection_name: str) -> str:
         return f"{self._collection_prefix}_{workspace_id}_{collection_name}".replace(" ", "_")
 
-    def _fallback_path(self, key: str) -> Path:
+    def _get_collection(self, key: str) -> Any:
+        with self._collections_lock:
+            collection = self._collections.get(key)
+            if collection is None:
+                collection = self._chroma_client.get_or_create_collection(name=key)
+                self._collections[key] = collection
+            return collection
+
+    def _run_on_collection(self, key: str, operation: Any) -> Any:
+        try:
+            return operation(self._get_collection(key))
+        except _stale_collection_errors():
+            if not self._drop_cached_collection(key):
+                raise
+        return operation(self._get_collection(key))
+
+    def _drop_cached_collection(self, key: str) -> bool:
+        with self._collections_lock:
+            return self._collections.pop(key, None) is not None
+
+    def invalidate_collection(self, *, workspace_id: str, collection_name: str) -> None:
+        self._drop_cached_collection(self._collection_key(workspace_id, collection_name))
+
+    def delete_collection(self, *, workspace_id: str, collection_name: str) -> None:
+        key = self._collection_key(workspace_id, collection_name)
+        with self._collections_lock:
+            self._collections.pop(key, None)
+            if self._chroma_client is not None:
+                try:
+                    self._chroma_client.delete_collection(name=key)
+                except Exception:
+                    pass
+        storage_key = self._fallback_storage_key(key)
+        with _fallback_lock:
+            _fallback_data.pop(storage_key, None)
+            _fallback_indexes.pop(storage_key, None)
+            log = _fallback_logs.pop(storage_key, None)
+            if log is None:
+                log = self._build_fallback_log(key)
+            log.destroy()
+            self._fallback_legacy_path(key).unlink(missing_ok=True)
+
+    def _fallback_storage_key(self, key: str) -> str:
+        return str(self._persist_dir.resolve() / key)
+
+    def _fallback_legacy_path(self, key: str) -> Path:
         return self._persist_dir / f"{key}.json"
 
+    def _build_fallback_log(self, key: str) -> FallbackCollectionLog:
+        return FallbackCollectionLog(
+            directory=self._persist_dir / f"{key}.fallback",
+            legacy_path=self._fallback_legacy_path(key),
+            segment_max_bytes=self._fallback_segment_max_bytes,
+            compaction_min_bytes=self._fallback_compaction_min_bytes,
+        )
+
     def _load_fallback_collection(self, key: str) -> dict[str, Any]:
+        storage_key = self._fallback_storage_key(key)
         with _fallback_lock:
-            if key in _fallback_data:
-                return _fallback_data[key]
-            path = self._fallback_path(key)
-            if path.exists():
-                _fallback_data[key] = json.loads(path.read_text(encoding="utf-8"))
-            else:
-                _fallback_data[key] = {"vectors": {}, "documents": {}, "metadatas": {}}
-            return _fallback_data[key]
-
-    def _persist_fallback_collection(self, key: str) -> None:
+            data = _fallback_data.get(storage_key)
+            if data is not None:
+                if _fallback_logs[storage_key].refresh(data):
+                    _fallback_indexes.pop(storage_key, None)
+                return data
+            log = self._build_fallback_log(key)
+            _fallback_data[storage_key] = log.load()
+            _fallback_logs[storage_key] = log
+            return _fallback_data[storage_key]
+
+    def _get_fallback_index(self, key: str) -> _FallbackMatrixIndex:
+        collection = self._load_fallback_collection(key)
+        storage_key = self._fallback_storage_key(key)
         with _fallback_lock:
-            path = self._fallback_path(key)
-            path.write_text(json.dumps(_fallback_data[key], ensure_ascii=False), encoding="utf-8")
+            index = _fallback_indexes.get(storage_key)
+            if index is None:
+                index = _FallbackMatrixIndex(collection)
+                _fallback_indexes[storage_key] = index
+            return index
+
+    def _write_fallback_record(self, key: str, record: dict[str, Any]) -> None:
+        collection = self._load_fallback_collection(key)
+        storage_key = self._fallback_storage_key(key)
+        with _fallback_lock:
+            log = _fallback_logs[storage_key]
+            should_compact = log.append(record, collection)
+            apply_record(collection, record)
+            if should_compact:
+                log.schedule_compaction(
+                    collection, lambda: {name: dict(values) for name, values in collection.items()}
+                )
+            _fallback_indexes.pop(storage_key, None)
 
     def upsert_chunks(
         self,
@@ -76,20 +239,25 @@ class ChromaVectorStore:
 
         key = self._collection_key(workspace_id, collection_name)
         if self._chroma_client is not None:
-            collection = self._chroma_client.get_or_create_collection(name=key)
             ids = [payload.chunk_id for payload in chunk_payloads]
             documents = [payload.text for payload in chunk_payloads]
             metadatas = [dict(payload.metadata) for payload in chunk_payloads]
-            collection.upsert(ids=ids, embeddings=vectors, documents=documents, metadatas=metadatas)
+            self._run_on_collection(
+                key,
+                lambda collection: collection.upsert(
+                    ids=ids,
+                    embeddings=vectors,
+                    documents=documents,
+                    metadatas=metadatas,
+                ),
+            )
             return
 
-        collection = self._load_fallback_collection(key)
-        for payload, vector in zip(chunk_payloads, vectors, strict=False):
-            metadata = dict(payload.metadata)
-            collection["vectors"][payload.chunk_id] = vector
-            collection["documents"][payload.chunk_id] = payload.text
-            collection["metadatas"][payload.chunk_id] = metadata
-        self._persist_fallback_collection(key)
+        items = [
+            [payload.chunk_id, [float(value) for value in vector], payload.text, dict(payload.metadata)]
+            for payload, vector in zip(chunk_payloads, vectors, strict=False)
+        ]
+        self._write_fallback_record(key, {"op": "upsert", "items": items})
 
     def query(
         self,
@@ -102,14 +270,20 @@ class ChromaVectorStore:
     ) -> list[RetrievalHit]:
         key = self._collection_key(workspace_id, collection_name)
         if self._chroma_client is not None:
-            collection = self._chroma_client.get_or_create_collection(name=key)
             where = None
             if filters:
                 if len(filters) == 1:
                     where = dict(filters)
                 else:
                     where = {"$and": [{k: v} for k, v in filters.items()]}
-            result = collection.query(query_embeddings=[query_vector], n_results=top_k, where=where or None)
+            result = self._run_on_collection(
+                key,
+                lambda collection: collection.query(
+                    query_embeddings=[query_vector],
+                    n_results=top_k,
+                    where=where or None,
+                ),
+            )
             ids = (result.get("ids") or [[]])[0]
             docs = (result.get("documents") or [[]])[0]
             metadatas = (result.get("metadatas") or [[]])[0]
@@ -135,24 +309,20 @@ class ChromaVectorStore:
             return hits
 
         collection = self._load_fallback_collection(key)
+        index = self._get_fallback_index(key)
+        candidate_limit = max(int(top_k), 0) * 2 + 16
+        positions = index.candidate_positions(query_vector, index.filter_mask(filters), candidate_limit)
+
+        ranked: list[tuple[float, int, str, dict[str, Any]]] = []
+        for position in positions.tolist():
+            chunk_id = index.ids[position]
+            vector = collection["vectors"].get(chunk_id)
+            score = _cosine_similarity(query_vector, vector if isinstance(vector, list) else [])
+            ranked.append((score, position, chunk_id, index.metadatas[position]))
 
-        def _matches(metadata: dict[str, Any]) -> bool:
-            for k, v in filters.items():
-                if metadata.get(k) != v:
-                    return False
-            return True
-
-        ranked: list[tuple[float, str, dict[str, Any]]] = []
-        for chunk_id, vector in collection["vectors"].items():
-            metadata = collection["metadatas"].get(chunk_id) or {}
-            if not _matches(metadata):
-                continue
-            score = _cosine_similarity(query_vector, vector)
-            ranked.append((score, chunk_id, metadata))
-
-        ranked.sort(key=lambda item: item[0], reverse=True)
+        ranked.sort(key=lambda item: (-item[0], item[1]))
         hits: list[RetrievalHit] = []
-        for score, chunk_id, metadata in ranked[:top_k]:
+        for score, _, chunk_id, metadata in ranked[:top_k]:
             source = str(metadata.get("source", "")).strip()
             if not source:
                 source = "unknown"
@@ -180,8 +350,10 @@ class ChromaVectorStore:
     ) -> None:
         key = self._collection_key(workspace_id, collection_name)
         if self._chroma_client is not None:
-            collection = self._chroma_client.get_or_create_collection(name=key)
-            collection.delete(where={"document_id": int(document_id)})
+            self._run_on_collection(
+                key,
+                lambda collection: collection.delete(where={"document_id": int(document_id)}),
+            )
             return
 
         collection = self._load_fallback_collection(key)
@@ -192,11 +364,28 @@ class ChromaVectorStore:
         ]
         if not target_ids:
             return
-        for chunk_id in target_ids:
-            collection["vectors"].pop(chunk_id, None)
-            collection["documents"].pop(chunk_id, None)
-            collection["metadatas"].pop(chunk_id, None)
-        self._persist_fallback_collection(key)
+        self._write_fallback_record(key, {"op": "delete", "ids": target_ids})
+
+    def delete_chunks(
+        self,
+        *,
+        workspace_id: str,
+        collection_name: str,
+        chunk_ids: list[str],
+    ) -> None:
+        ids = [str(chunk_id) for chunk_id in chunk_ids if str(chunk_id).strip()]
+        if not ids:
+            return
+        key = self._collection_key(workspace_id, collection_name)
+        if self._chroma_client is not None:
+            self._run_on_collection(key, lambda collection: collection.delete(ids=ids))
+            return
+
+        collection = self._load_fallback_collection(key)
+        target_ids = [chunk_id for chunk_id in ids if chunk_id in collection["metadatas"]]
+        if not target_ids:
+            return
+        self._write_fallback_record(key, {"op": "delete", "ids": target_ids})
 
     def get_chunk_vector(
         self,
@@ -210,8 +399,10 @@ class ChromaVectorStore:
         if not target:
             return None
         if self._chroma_client is not None:
-            collection = self._chroma_client.get_or_create_collection(name=key)
-            result = collection.get(ids=[target], include=["embeddings"])
+            result = self._run_on_collection(
+                key,
+                lambda collection: collection.get(ids=[target], include=["embeddings"]),
+            )
             raw_embeddings = result.get("embeddings")
             embeddings = list(raw_embeddings) if raw_embeddings is not None else []
             if len(embeddings) == 0:
@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import logging
+import math
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable
+from urllib import error as urllib_error
+
+from ..errors import RAGValidationError
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS_CODES = frozenset({408, 409, 425, 429, 500, 502, 503, 504})
+# Transport failures worth retrying; anything else without a retryable status (auth
+# errors surfaced as ValueError by langchain, malformed payloads) fails immediately.
+RETRYABLE_EXCEPTION_TYPES: tuple[type[BaseException], ...] = (
+    urllib_error.URLError,
+    TimeoutError,
+    ConnectionError,
+    OSError,
+)
+
+
+class EmbeddingRequestError(RAGValidationError):
+    def __init__(self, message: str, *, status_code: int | None = None, retry_after: float | None = None) -> None:
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+    @property
+    def retryable(self) -> bool:
+        if self.status_code is not None:
+            return self.status_code in RETRYABLE_STATUS_CODES
+        return isinstance(self.__cause__, RETRYABLE_EXCEPTION_TYPES)
+
+
+@dataclass(frozen=True, slots=True)
+class EmbeddingBatchPolicy:
+    max_items: int
+    max_tokens: int
+    max_in_flight: int = 4
+    max_retries: int = 4
+    backoff_base_seconds: float = 0.5
+    backoff_max_seconds: float = 30.0
+
+
+def estimate_embedding_tokens(text: str) -> int:
+    ascii_chars = sum(1 for char in text if ord(char) < 128)
+    return max(1, math.ceil(ascii_chars / 4) + (len(text) - ascii_chars))
+
+
+def plan_embedding_batches(texts: list[str], *, max_items: int, max_tokens: int) -> list[tuple[int, int]]:
+    item_limit = max(1, int(max_items))
+    token_limit = max(1, int(max_tokens))
+    batches: list[tuple[int, int]] = []
+    start = 0
+    tokens = 0
+    for index, text in enumerate(texts):
+        cost = estimate_embedding_tokens(text)
+        if index > start and (index - start >= item_limit or tokens + cost > token_limit):
+            batches.append((start, index))
+            start = index
+            tokens = 0
+        tokens += cost
+    if start < len(texts):
+        batches.append((start, len(texts)))
+    return batches
+
+
+def parse_retry_after(value: Any) -> float | None:
+    if value is None:
+        return None
+    raw = str(value).strip()
+    if not raw:
+        return None
+    try:
+        return max(0.0, float(raw))
+    except ValueError:
+        pass
+    try:
+        moment = parsedate_to_datetime(raw)
+    except (TypeError, ValueError):
+        return None
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return max(0.0, (moment - datetime.now(timezone.utc)).total_seconds())
+
+
+def describe_request_failure(exc: BaseException) -> tuple[int | None, float | None]:
+    if isinstance(exc, EmbeddingRequestError):
+        return exc.status_code, exc.retry_after
+    response = getattr(exc, "response", None)
+    status = getattr(exc, "code", None) or getattr(exc, "status_code", None) or getattr(response, "status_code", None)
+    headers = getattr(exc, "headers", None) or getattr(response, "headers", None)
+    retry_after = parse_retry_after(headers.get("Retry-After")) if headers is not None else None
+    try:
+        return (int(status) if status is not None else None), retry_after
+    except (TypeError, ValueError):
+        return None, retry_after
+
+
+def _is_retryable(exc: BaseException) -> bool:
+    if isinstance(exc, EmbeddingRequestError):
+        return exc.retryable
+    if isinstance(exc, RAGValidationError):
+        return False
+    status, _ = describe_request_failure(exc)
+    if status is not None:
+        return status in RETRYABLE_STATUS_CODES
+    return isinstance(exc, RETRYABLE_EXCEPTION_TYPES)
+
+
+def call_with_retry(
+    func: Callable[[], list[list[float]]],
+    *,
+    policy: EmbeddingBatchPolicy,
+    sleep: Callable[[float], None] | None = None,
+) -> list[list[float]]:
+    wait = sleep or time.sleep
+    attempt = 0
+    while True:
+        try:
+            return func()
+        except Exception as exc:
+            if attempt >= policy.max_retries or not _is_retryable(exc):
+                raise
+            status, retry_after = describe_request_failure(exc)
+            backoff = min(policy.backoff_max_seconds, policy.backoff_base_seconds * (2**attempt))
+            delay = retry_after if retry_after is not None else backoff * (0.5 + random.random() / 2)
+            delay = min(max(delay, 0.0), policy.backoff_max_seconds)
+            attempt += 1
+            logger.warning(
+                "Retrying embedding batch",
+                extra={
+                    "event": "rag.embedding.retry",
+                    "attempt": attempt,
+                    "status_code": status,
+                    "delay_seconds": round(delay, 3),
+                },
+            )
+            wait(delay)
+
+
+def embed_in_batches(
+    texts: list[str],
+    *,
+    policy: EmbeddingBatchPolicy,
+    request_batch: Callable[[list[str]], list[list[float]]],
+    sleep: Callable[[float], None] | None = None,
+) -> list[list[float]]:
+    if not texts:
+        return []
+    batches = plan_embedding_batches(texts, max_items=policy.max_items, max_tokens=policy.max_tokens)
+
+    def _run(bounds: tuple[int, int]) -> list[list[float]]:
+        inputs = texts[bounds[0] : bounds[1]]
+        vectors = call_with_retry(lambda: request_batch(inputs), policy=policy, sleep=sleep)
+        if len(vectors) != len(inputs):
+            raise RAGValidationError("embedding vector count does not match input count")
+        return vectors
+
+    workers = max(1, min(int(policy.max_in_flight), len(batches)))
+    if workers == 1:
+        results = [_run(bounds) for bounds in batches]
+    else:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="rag-embed") as executor:
+            results = list(executor.map(_run, batches))
+    return [vector for batch_vectors in results for vector in batch_vectors]
@@ -0,0 +1,194 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import re
+import sqlite3
+import time
+import unicodedata
+from array import array
+from pathlib import Path
+from threading import Lock
+
+from .interfaces import Embedder
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+def normalize_embedding_text(text: str) -> str:
+    return _WHITESPACE_PATTERN.sub(" ", unicodedata.normalize("NFC", text)).strip()
+
+
+def embedding_text_digest(text: str) -> str:
+    return hashlib.sha256(normalize_embedding_text(text).encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    def __init__(self, *, path: Path, max_bytes: int) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.max_bytes = max(int(max_bytes), 0)
+        self._lock = Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "provider TEXT NOT NULL, model TEXT NOT NULL, dimension INTEGER NOT NULL, digest TEXT NOT NULL, "
+            "vector BLOB NOT NULL, size INTEGER NOT NULL, last_access REAL NOT NULL, "
+            "PRIMARY KEY (provider, model, dimension, digest))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_embeddings_last_access ON embeddings (last_access)")
+        row = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM embeddings").fetchone()
+        self._total_bytes = int(row[0])
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_many(self, *, provider: str, model: str, dimension: int, digests: list[str]) -> dict[str, list[float]]:
+        unique = list(dict.fromkeys(digests))
+        found: dict[str, list[float]] = {}
+        with self._lock:
+            for start in range(0, len(unique), 500):
+                part = unique[start : start + 500]
+                placeholders = ",".join("?" for _ in part)
+                rows = self._conn.execute(
+                    f"SELECT digest, vector FROM embeddings WHERE provider = ? AND model = ? AND dimension = ? "
+                    f"AND digest IN ({placeholders})",
+                    (provider, model, dimension, *part),
+                ).fetchall()
+                for digest, blob in rows:
+                    found[digest] = array("d", blob).tolist()
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_access = ? WHERE provider = ? AND model = ? AND dimension = ? AND digest = ?",
+                    [(now, provider, model, dimension, digest) for digest in found],
+                )
+            hit_count = sum(1 for digest in digests if digest in found)
+            self.hits += hit_count
+            self.misses += len(digests) - hit_count
+        return found
+
+    def put_many(self, *, provider: str, model: str, dimension: int, items: dict[str, list[float]]) -> None:
+        if not items or self.max_bytes == 0:
+            return
+        now = time.time()
+        rows = []
+        for digest, vector in items.items():
+            blob = array("d", vector).tobytes()
+            rows.append((provider, model, dimension, digest, blob, len(blob) + len(digest), now))
+        digests = list(items.keys())
+        with self._lock:
+            replaced_bytes = 0
+            for start in range(0, len(digests), 500):
+                part = digests[start : start + 500]
+                placeholders = ",".join("?" for _ in part)
+                row = self._conn.execute(
+                    f"SELECT COALESCE(SUM(size), 0) FROM embeddings WHERE provider = ? AND model = ? AND dimension = ? "
+                    f"AND digest IN ({placeholders})",
+                    (provider, model, dimension, *part),
+                ).fetchone()
+                replaced_bytes += int(row[0])
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (provider, model, dimension, digest, vector, size, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._total_bytes += sum(row[5] for row in rows) - replaced_bytes
+            if self._total_bytes > self.max_bytes:
+                self._evict_locked()
+
+    def _evict_locked(self) -> None:
+        target = int(self.max_bytes * 0.9)
+        while self._total_bytes > target:
+            rows = self._conn.execute(
+                "SELECT rowid, size FROM embeddings ORDER BY last_access ASC LIMIT 256"
+            ).fetchall()
+            if not rows:
+                self._total_bytes = 0
+                return
+            freed = []
+            for rowid, size in rows:
+                if self._total_bytes <= target:
+                    break
+                freed.append((rowid,))
+                self._total_bytes -= int(size)
+            self._conn.executemany("DELETE FROM embeddings WHERE rowid = ?", freed)
+            self.evictions += len(freed)
+
+    def stats(self) -> dict[str, int | float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hitRate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "bytes": self._total_bytes,
+                "maxBytes": self.max_bytes,
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class CachedEmbedder:
+    def __init__(self, *, embedder: Embedder, cache: EmbeddingCache) -> None:
+        self._embedder = embedder
+        self._cache = cache
+        self.provider_name = embedder.provider_name
+        self.model_name = embedder.model_name
+        self.model_version = embedder.model_version
+        self.dimension = embedder.dimension
+
+    @property
+    def cache(self) -> EmbeddingCache:
+        return self._cache
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        if not texts:
+            return []
+        digests = [embedding_text_digest(text) for text in texts]
+        scope = {"provider": self.provider_name, "model": self.model_name, "dimension": int(self.dimension)}
+        try:
+            cached = self._cache.get_many(digests=digests, **scope)
+        except Exception:
+            logger.warning(
+                "Embedding cache read failed; embedding without cache",
+                exc_info=True,
+                extra={"event": "rag.embedding.cache_read_failed", "path": str(self._cache.path)},
+            )
+            cached = {}
+        missing: dict[str, str] = {}
+        for digest, text in zip(digests, texts, strict=False):
+            if digest not in cached and digest not in missing:
+                missing[digest] = text
+        if missing:
+            vectors = self._embedder.embed_documents(list(missing.values()))
+            fresh = dict(zip(missing.keys(), vectors, strict=False))
+            try:
+                self._cache.put_many(items=fresh, **scope)
+            except Exception:
+                logger.warning(
+                    "Embedding cache write failed; vectors were not cached",
+                    exc_info=True,
+                    extra={"event": "rag.embedding.cache_write_failed", "path": str(self._cache.path)},
+                )
+            cached.update(fresh)
+        logger.info(
+            "Embedding cache lookup completed",
+            extra={
+                "event": "rag.embedding.cache",
+                "requested": len(texts),
+                "embedded": len(missing),
+                **self._cache.stats(),
+            },
+        )
+        return [cached[digest] for digest in digests]
+
+    def embed_query(self, text: str) -> list[float]:
+        return self._embedder.embed_query(text)
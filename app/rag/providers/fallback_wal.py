@@ -0,0 +1,315 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import re
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from threading import Lock
+from typing import Any, Callable, Iterator
+
+try:
+    import fcntl
+except ImportError:  # non-POSIX platforms only get in-process locking
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "manifest.json"
+LOCK_NAME = "LOCK"
+_FILE_PATTERN = re.compile(r"^(snapshot|segment)-(\d{8})\.(json|log)$")
+
+_compaction_lock = Lock()
+_compaction_executor: ThreadPoolExecutor | None = None
+
+
+def empty_collection() -> dict[str, dict[str, Any]]:
+    return {"vectors": {}, "documents": {}, "metadatas": {}}
+
+
+def apply_record(data: dict[str, dict[str, Any]], record: dict[str, Any]) -> None:
+    op = record.get("op")
+    if op == "upsert":
+        for chunk_id, vector, document, metadata in record.get("items") or []:
+            data["vectors"][chunk_id] = vector
+            data["documents"][chunk_id] = document
+            data["metadatas"][chunk_id] = metadata
+    elif op == "delete":
+        for chunk_id in record.get("ids") or []:
+            data["vectors"].pop(chunk_id, None)
+            data["documents"].pop(chunk_id, None)
+            data["metadatas"].pop(chunk_id, None)
+
+
+def _ensure_compaction_executor() -> ThreadPoolExecutor:
+    global _compaction_executor
+    with _compaction_lock:
+        if _compaction_executor is None:
+            _compaction_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rag-fallback-compact")
+        return _compaction_executor
+
+
+def _write_atomic(path: Path, payload: str) -> None:
+    tmp_path = path.with_name(f"{path.name}.tmp")
+    with tmp_path.open("w", encoding="utf-8") as handle:
+        handle.write(payload)
+        handle.flush()
+        os.fsync(handle.fileno())
+    os.replace(tmp_path, path)
+
+
+class FallbackCollectionLog:
+    """Append-only log for one fallback collection directory.
+
+    Several processes (the web app and ``app.rag.worker`` processes) may open the same
+    directory, so every file change happens under an exclusive ``flock`` on ``LOCK`` and
+    starts by catching up with the on-disk manifest and any records other processes
+    appended since this process last looked.
+    """
+
+    def __init__(
+        self,
+        *,
+        directory: Path,
+        legacy_path: Path | None = None,
+        segment_max_bytes: int = 8 * 1024 * 1024,
+        compaction_min_bytes: int = 16 * 1024 * 1024,
+    ) -> None:
+        self.directory = directory
+        self._legacy_path = legacy_path
+        self._segment_max_bytes = max(int(segment_max_bytes), 1)
+        self._compaction_min_bytes = max(int(compaction_min_bytes), 1)
+        self._lock = Lock()
+        self._snapshot: str | None = None
+        self._segments: list[str] = []
+        self._applied: dict[str, int] = {}
+        self._snapshot_bytes = 0
+        self._compacting = False
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        with self._lock:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            with (self.directory / LOCK_NAME).open("a+b") as handle:
+                if fcntl is not None:
+                    fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+
+    def _next_name(self, kind: str) -> str:
+        sequence = 0
+        for path in self.directory.iterdir():
+            match = _FILE_PATTERN.match(path.name)
+            if match is not None:
+                sequence = max(sequence, int(match.group(2)))
+        extension = "json" if kind == "snapshot" else "log"
+        return f"{kind}-{sequence + 1:08d}.{extension}"
+
+    def _read_manifest(self) -> tuple[str | None, list[str]] | None:
+        try:
+            manifest = json.loads((self.directory / MANIFEST_NAME).read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return None
+        snapshot = manifest.get("snapshot")
+        return (snapshot if isinstance(snapshot, str) else None), [str(item) for item in manifest.get("segments") or []]
+
+    def _write_manifest(self) -> None:
+        payload = {"version": 1, "snapshot": self._snapshot, "segments": list(self._segments)}
+        _write_atomic(self.directory / MANIFEST_NAME, json.dumps(payload))
+
+    def _open_new_segment(self) -> None:
+        name = self._next_name("segment")
+        (self.directory / name).touch()
+        self._segments.append(name)
+        self._applied[name] = 0
+        self._write_manifest()
+
+    def _log_bytes(self) -> int:
+        return sum(self._applied.values())
+
+    def load(self) -> dict[str, dict[str, Any]]:
+        data = empty_collection()
+        with self._locked():
+            self._reload_locked(data)
+        return data
+
+    def refresh(self, data: dict[str, dict[str, Any]]) -> bool:
+        """Replay records other processes wrote since the last sync; True if ``data`` changed."""
+        with self._locked():
+            return self._sync_locked(data)
+
+    def _reload_locked(self, data: dict[str, dict[str, Any]]) -> None:
+        fresh = empty_collection()
+        manifest = self._read_manifest()
+        if manifest is not None:
+            self._snapshot, self._segments = manifest
+        elif self._legacy_path is not None and self._legacy_path.exists():
+            fresh = json.loads(self._legacy_path.read_text(encoding="utf-8"))
+            self._snapshot = self._next_name("snapshot")
+            _write_atomic(self.directory / self._snapshot, json.dumps(fresh, ensure_ascii=False))
+            self._segments = []
+        else:
+            self._snapshot = None
+            self._segments = []
+
+        # Every file is created and retired under the lock, so anything the manifest does
+        # not reference is left over from a crash and safe to remove.
+        referenced = {name for name in [self._snapshot, *self._segments] if name}
+        for path in self.directory.iterdir():
+            if path.name not in (MANIFEST_NAME, LOCK_NAME) and path.name not in referenced:
+                path.unlink(missing_ok=True)
+
+        self._snapshot_bytes = 0
+        if self._snapshot is not None and manifest is not None:
+            snapshot_path = self.directory / self._snapshot
+            fresh = json.loads(snapshot_path.read_text(encoding="utf-8"))
+            self._snapshot_bytes = snapshot_path.stat().st_size
+        self._segments = [name for name in self._segments if (self.directory / name).exists()]
+        self._applied = {name: self._replay_segment(self.directory / name, fresh, 0) for name in self._segments}
+
+        if not self._segments:
+            self._open_new_segment()
+        elif manifest is None or manifest[1] != self._segments:
+            self._write_manifest()
+        if self._legacy_path is not None:
+            self._legacy_path.unlink(missing_ok=True)
+        data.clear()
+        data.update(fresh)
+
+    def _sync_locked(self, data: dict[str, dict[str, Any]]) -> bool:
+        manifest = self._read_manifest()
+        if (
+            manifest is None
+            or manifest[0] != self._snapshot
+            or manifest[1][: len(self._segments)] != self._segments
+        ):
+            # Another process compacted or destroyed the log; its snapshot may hold
+            # records this process never replayed, so start over from disk.
+            self._reload_locked(data)
+            return True
+        self._segments = manifest[1]
+        changed = False
+        for name in self._segments:
+            path = self.directory / name
+            offset = self._applied.setdefault(name, 0)
+            if path.stat().st_size != offset:
+                self._applied[name] = self._replay_segment(path, data, offset)
+                changed = True
+        return changed
+
+    def _replay_segment(self, path: Path, data: dict[str, dict[str, Any]], offset: int) -> int:
+        valid_bytes = offset
+        with path.open("rb") as handle:
+            handle.seek(offset)
+            for raw_line in handle:
+                if not raw_line.endswith(b"\n"):
+                    break
+                try:
+                    record = json.loads(raw_line.decode("utf-8"))
+                except (UnicodeDecodeError, json.JSONDecodeError):
+                    break
+                apply_record(data, record)
+                valid_bytes += len(raw_line)
+        if valid_bytes != path.stat().st_size:
+            logger.warning(
+                "Truncating torn fallback vector log segment",
+                extra={"event": "rag.fallback.segment_truncated", "path": str(path), "valid_bytes": valid_bytes},
+            )
+            with path.open("r+b") as handle:
+                handle.truncate(valid_bytes)
+        return valid_bytes
+
+    def append(self, record: dict[str, Any], data: dict[str, dict[str, Any]]) -> bool:
+        """Append ``record`` after replaying newer records from other processes into ``data``.
+
+        The caller applies ``record`` itself; the return value says whether to compact.
+        """
+        line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+        with self._locked():
+            self._sync_locked(data)
+            active = self._segments[-1]
+            if self._applied[active] and self._applied[active] + len(line) > self._segment_max_bytes:
+                self._open_new_segment()
+                active = self._segments[-1]
+            with (self.directory / active).open("ab") as handle:
+                handle.write(line)
+                handle.flush()
+                os.fsync(handle.fileno())
+            self._applied[active] += len(line)
+            log_bytes = self._log_bytes()
+            return (
+                not self._compacting
+                and log_bytes >= self._compaction_min_bytes
+                and log_bytes >= self._snapshot_bytes
+            )
+
+    def begin_compaction(self, data: dict[str, dict[str, Any]]) -> tuple[str | None, list[str]] | None:
+        """Seal the current segments; ``data`` then holds exactly the records they contain."""
+        with self._locked():
+            if self._compacting:
+                return None
+            self._sync_locked(data)
+            self._compacting = True
+            retired = list(self._segments)
+            self._open_new_segment()
+            return self._snapshot, retired
+
+    def finish_compaction(self, sealed: tuple[str | None, list[str]], data: dict[str, dict[str, Any]]) -> None:
+        base_snapshot, retired = sealed
+        try:
+            snapshot_payload = json.dumps(data, ensure_ascii=False)
+            with self._locked():
+                manifest = self._read_manifest()
+                if manifest is None or manifest[0] != base_snapshot or manifest[1][: len(retired)] != retired:
+                    logger.info(
+                        "Skipping fallback vector log compaction superseded by another process",
+                        extra={"event": "rag.fallback.compaction_skipped", "path": str(self.directory)},
+                    )
+                    return
+                snapshot_name = self._next_name("snapshot")
+                _write_atomic(self.directory / snapshot_name, snapshot_payload)
+                self._snapshot = snapshot_name
+                self._segments = manifest[1][len(retired) :]
+                self._write_manifest()
+                for name in [base_snapshot, *retired]:
+                    if name:
+                        (self.directory / name).unlink(missing_ok=True)
+                    self._applied.pop(name, None)
+                self._snapshot_bytes = len(snapshot_payload.encode("utf-8"))
+        finally:
+            with self._lock:
+                self._compacting = False
+
+    def schedule_compaction(
+        self,
+        data: dict[str, dict[str, Any]],
+        snapshot_data: Callable[[], dict[str, dict[str, Any]]],
+    ) -> None:
+        sealed = self.begin_compaction(data)
+        if sealed is None:
+            return
+        snapshot = snapshot_data()
+
+        def _compact() -> None:
+            try:
+                self.finish_compaction(sealed, snapshot)
+            except Exception:
+                logger.exception(
+                    "Fallback vector log compaction failed",
+                    extra={"event": "rag.fallback.compaction_failed", "path": str(self.directory)},
+                )
+
+        _ensure_compaction_executor().submit(_compact)
+
+    def destroy(self) -> None:
+        with self._locked():
+            shutil.rmtree(self.directory, ignore_errors=True)
+            self._snapshot = None
+            self._segments = []
+            self._applied = {}
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from typing import Protocol
 
-from ..schemas import ChunkPayload, RetrievalHit, SemanticSegment
+from ..schemas import ChunkingBounds, ChunkPayload, RetrievalHit, SemanticSegment
 
 
 class Embedder(Protocol):
@@ -54,6 +54,18 @@ class VectorStore(Protocol):
         document_id: int,
     ) -> None: ...
 
+    def delete_chunks(
+        self,
+        *,
+        workspace_id: str,
+        collection_name: str,
+        chunk_ids: list[str],
+    ) -> None: ...
+
+    def invalidate_collection(self, *, workspace_id: str, collection_name: str) -> None: ...
+
+    def delete_collection(self, *, workspace_id: str, collection_name: str) -> None: ...
+
 
 class Reranker(Protocol):
     provider_name: str
@@ -78,4 +90,5 @@ class SemanticChunkingProvider(Protocol):
         strategy: str,
         source_name: str,
         blocks: list[dict],
+        bounds: ChunkingBounds | None = None,
     ) -> list[SemanticSegment]: ...
@@ -2,16 +2,44 @@ from __future__ import annotations
 
 import json
 import math
+from urllib import error as urllib_error
 from urllib import request as urllib_request
 
 from langchain_community.embeddings import DashScopeEmbeddings
 from langchain_community.embeddings.fake import DeterministicFakeEmbedding
 
 from ..errors import RAGConfigurationError, RAGValidationError
+from .embedding_batcher import (
+    EmbeddingBatchPolicy,
+    EmbeddingRequestError,
+    call_with_retry,
+    embed_in_batches,
+    parse_retry_after,
+)
+
+
+def _resolve_batch_policy(
+    policy: EmbeddingBatchPolicy | None,
+    *,
+    default_max_items: int,
+    default_max_tokens: int,
+) -> EmbeddingBatchPolicy:
+    if policy is None:
+        return EmbeddingBatchPolicy(max_items=default_max_items, max_tokens=default_max_tokens)
+    return EmbeddingBatchPolicy(
+        max_items=policy.max_items if policy.max_items > 0 else default_max_items,
+        max_tokens=policy.max_tokens if policy.max_tokens > 0 else default_max_tokens,
+        max_in_flight=policy.max_in_flight,
+        max_retries=policy.max_retries,
+        backoff_base_seconds=policy.backoff_base_seconds,
+        backoff_max_seconds=policy.backoff_max_seconds,
+    )
 
 
 class DashScopeEmbedder:
     provider_name = "dashscope"
+    default_batch_max_items = 10
+    default_batch_max_tokens = 8000
 
     def __init__(
         self,
@@ -20,6 +48,7 @@ class DashScopeEmbedder:
         model_version: str,
         dimension: int,
         api_key: str,
+        batch_policy: EmbeddingBatchPolicy | None = None,
     ) -> None:
         if not model_name.strip():
             raise RAGConfigurationError("RAG_EMBEDDING_MODEL must be configured")
@@ -31,6 +60,11 @@ class DashScopeEmbedder:
         self.model_version = model_version.strip() or "1"
         self.dimension = dimension
         self._embedder = DashScopeEmbeddings(model=self.model_name, dashscope_api_key=api_key.strip())
+        self._batch_policy = _resolve_batch_policy(
+            batch_policy,
+            default_max_items=self.default_batch_max_items,
+            default_max_tokens=self.default_batch_max_tokens,
+        )
 
     def _normalize_vector(self, vector: list[float]) -> list[float]:
         values = [float(item) for item in vector]
@@ -41,17 +75,22 @@ class DashScopeEmbedder:
             return [0.0] * self.dimension
         return [item / norm for item in values]
 
-    def embed_documents(self, texts: list[str]) -> list[list[float]]:
-        vectors = self._embedder.embed_documents(texts)
+    def _request_embeddings(self, inputs: list[str]) -> list[list[float]]:
+        vectors = self._embedder.embed_documents(inputs)
         return [self._normalize_vector(list(item)) for item in vectors]
 
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return embed_in_batches(texts, policy=self._batch_policy, request_batch=self._request_embeddings)
+
     def embed_query(self, text: str) -> list[float]:
-        vector = self._embedder.embed_query(text)
+        vector = call_with_retry(lambda: [self._embedder.embed_query(text)], policy=self._batch_policy)[0]
         return self._normalize_vector(list(vector))
 
 
 class OpenAICompatibleEmbedder:
     provider_name = "openai-compatible"
+    default_batch_max_items = 64
+    default_batch_max_tokens = 8000
 
     def __init__(
         self,
@@ -62,6 +101,7 @@ class OpenAICompatibleEmbedder:
         api_key: str,
         base_url: str,
         timeout_seconds: int,
+        batch_policy: EmbeddingBatchPolicy | None = None,
     ) -> None:
         if not model_name.strip():
             raise RAGConfigurationError("RAG_EMBEDDING_MODEL must be configured")
@@ -77,6 +117,11 @@ class OpenAICompatibleEmbedder:
         self._api_key = api_key.strip()
         self._base_url = base_url.rstrip("/")
         self._timeout_seconds = max(1, int(timeout_seconds))
+        self._batch_policy = _resolve_batch_policy(
+            batch_policy,
+            default_max_items=self.default_batch_max_items,
+            default_max_tokens=self.default_batch_max_tokens,
+        )
 
     def _normalize_vector(self, vector: list[float]) -> list[float]:
         values = [float(item) for item in vector]
@@ -104,8 +149,14 @@ class OpenAICompatibleEmbedder:
         try:
             with urllib_request.urlopen(req, timeout=self._timeout_seconds) as resp:
                 payload = json.loads(resp.read().decode("utf-8"))
+        except urllib_error.HTTPError as exc:
+            raise EmbeddingRequestError(
+                f"openai-compatible embedding request failed: {exc}",
+                status_code=exc.code,
+                retry_after=parse_retry_after(exc.headers.get("Retry-After") if exc.headers else None),
+            ) from exc
         except Exception as exc:
-            raise RAGValidationError(f"openai-compatible embedding request failed: {exc}") from exc
+            raise EmbeddingRequestError(f"openai-compatible embedding request failed: {exc}") from exc
         try:
             items = payload["data"]
             if not isinstance(items, list):
@@ -130,10 +181,10 @@ class OpenAICompatibleEmbedder:
     def embed_documents(self, texts: list[str]) -> list[list[float]]:
         if not texts:
             return []
-        return self._request_embeddings(texts)
+        return embed_in_batches(texts, policy=self._batch_policy, request_batch=self._request_embeddings)
 
     def embed_query(self, text: str) -> list[float]:
-        vectors = self._request_embeddings([text])
+        vectors = call_with_retry(lambda: self._request_embeddings([text]), policy=self._batch_policy)
         return vectors[0]
 
 # 这是是使用案例，对下面的clss进行模型替换，可以以在不改变接口的前提下，替换成任何其他的embedding模型，只要它们符合Embedder协议即可。
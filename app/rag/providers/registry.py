@@ -1,20 +1,69 @@
 from __future__ import annotations
 
+from pathlib import Path
+from threading import Lock
+
 from flask import current_app
 
 from ..errors import RAGConfigurationError
-from .chromadb_store import ChromaVectorStore
+from .chromadb_store import ChromaVectorStore, reset_chroma_clients_for_tests
 from .interfaces import Chunker, Embedder, Reranker, SemanticChunkingProvider, VectorStore
+from .embedding_batcher import EmbeddingBatchPolicy
+from .embedding_cache import CachedEmbedder, EmbeddingCache
 from .langchain_embedder import DashScopeEmbedder, FakeEmbedder, OpenAICompatibleEmbedder
 from .langchain_reranker import FakeReranker, OpenAICompatibleReranker
 from .semantic_chunking_provider import (
+    EmbeddingSimilaritySemanticChunkingProvider,
     NoopSemanticChunkingProvider,
     OpenAICompatibleSemanticChunkingProvider,
+    get_semantic_window_cache,
 )
 from .simple_chunker import DeterministicChunker
 
+_vector_store_lock = Lock()
+_vector_stores: dict[tuple[str, str, str], VectorStore] = {}
+_embedding_cache_lock = Lock()
+_embedding_caches: dict[str, EmbeddingCache] = {}
+
+
+def _embedding_batch_policy() -> EmbeddingBatchPolicy:
+    return EmbeddingBatchPolicy(
+        max_items=int(current_app.config.get("RAG_EMBEDDING_BATCH_MAX_ITEMS", 0)),
+        max_tokens=int(current_app.config.get("RAG_EMBEDDING_BATCH_MAX_TOKENS", 0)),
+        max_in_flight=int(current_app.config.get("RAG_EMBEDDING_MAX_IN_FLIGHT", 4)),
+        max_retries=int(current_app.config.get("RAG_EMBEDDING_MAX_RETRIES", 4)),
+        backoff_base_seconds=float(current_app.config.get("RAG_EMBEDDING_RETRY_BASE_SECONDS", 0.5)),
+        backoff_max_seconds=float(current_app.config.get("RAG_EMBEDDING_RETRY_MAX_SECONDS", 30.0)),
+    )
+
+
+def get_embedding_cache() -> EmbeddingCache | None:
+    if not bool(current_app.config.get("RAG_EMBEDDING_CACHE_ENABLED", False)):
+        return None
+    cache_dir = str(current_app.config.get("RAG_EMBEDDING_CACHE_DIR", "")).strip()
+    if not cache_dir:
+        return None
+    path = (Path(cache_dir) / "embeddings.sqlite3").resolve()
+    with _embedding_cache_lock:
+        cache = _embedding_caches.get(str(path))
+        if cache is None:
+            cache = EmbeddingCache(
+                path=path,
+                max_bytes=int(current_app.config.get("RAG_EMBEDDING_CACHE_MAX_BYTES", 512 * 1024 * 1024)),
+            )
+            _embedding_caches[str(path)] = cache
+        return cache
+
 
 def get_embedder() -> Embedder:
+    embedder = _build_embedder()
+    cache = get_embedding_cache()
+    if cache is None:
+        return embedder
+    return CachedEmbedder(embedder=embedder, cache=cache)
+
+
+def _build_embedder() -> Embedder:
     provider = str(current_app.config.get("RAG_EMBEDDER_PROVIDER", "")).strip().lower()
     if not provider:
         raise RAGConfigurationError("RAG_EMBEDDER_PROVIDER must be explicitly configured")
@@ -24,6 +73,7 @@ def get_embedder() -> Embedder:
             model_version=str(current_app.config["RAG_EMBEDDING_VERSION"]),
             dimension=int(current_app.config["RAG_EMBEDDING_DIMENSION"]),
             api_key=str(current_app.config.get("RAG_EMBEDDING_API_KEY", "")),
+            batch_policy=_embedding_batch_policy(),
         )
     if provider in {"openai", "openai-compatible"}:
         return OpenAICompatibleEmbedder(
@@ -33,6 +83,7 @@ def get_embedder() -> Embedder:
             api_key=str(current_app.config.get("RAG_EMBEDDING_API_KEY", "")),
             base_url=str(current_app.config.get("RAG_EMBEDDING_BASE_URL", "")),
             timeout_seconds=int(current_app.config.get("RAG_EMBEDDING_TIMEOUT_SECONDS", 20)),
+            batch_policy=_embedding_batch_policy(),
         )
     if provider == "fake":
         return FakeEmbedder(
@@ -46,13 +97,40 @@ def get_embedder() -> Embedder:
 def get_vector_store() -> VectorStore:
     provider = str(current_app.config.get("RAG_VECTOR_PROVIDER", "chromadb")).strip().lower()
     if provider == "chromadb":
-        return ChromaVectorStore(
-            persist_dir=str(current_app.config["RAG_CHROMADB_PERSIST_DIR"]),
-            collection_prefix=str(current_app.config["RAG_CHROMADB_COLLECTION_PREFIX"]),
-        )
+        persist_dir = str(current_app.config["RAG_CHROMADB_PERSIST_DIR"])
+        collection_prefix = str(current_app.config["RAG_CHROMADB_COLLECTION_PREFIX"])
+        cache_key = (provider, persist_dir, collection_prefix)
+        with _vector_store_lock:
+            store = _vector_stores.get(cache_key)
+            if store is None:
+                store = ChromaVectorStore(
+                    persist_dir=persist_dir,
+                    collection_prefix=collection_prefix,
+                    fallback_segment_max_bytes=int(
+                        current_app.config.get("RAG_FALLBACK_SEGMENT_MAX_BYTES", 8 * 1024 * 1024)
+                    ),
+                    fallback_compaction_min_bytes=int(
+                        current_app.config.get("RAG_FALLBACK_COMPACTION_MIN_BYTES", 16 * 1024 * 1024)
+                    ),
+                )
+                _vector_stores[cache_key] = store
+            return store
     raise RAGConfigurationError(f"unsupported vector provider: {provider}")
 
 
+def reset_vector_store_cache_for_tests() -> None:
+    with _vector_store_lock:
+        _vector_stores.clear()
+    reset_chroma_clients_for_tests()
+
+
+def reset_embedding_cache_for_tests() -> None:
+    with _embedding_cache_lock:
+        for cache in _embedding_caches.values():
+            cache.close()
+        _embedding_caches.clear()
+
+
 def get_reranker() -> Reranker:
     provider = str(current_app.config.get("RAG_RERANKER_PROVIDER", "")).strip().lower()
     if not provider:
@@ -83,5 +161,15 @@ def get_semantic_chunking_provider() -> SemanticChunkingProvider:
             api_key=str(current_app.config.get("RAG_CHUNK_AI_API_KEY", "")),
             base_url=str(current_app.config.get("RAG_CHUNK_AI_BASE_URL", "")),
             timeout_seconds=int(current_app.config.get("RAG_CHUNK_AI_TIMEOUT_SECONDS", 20)),
+            window_max_chars=int(current_app.config.get("RAG_CHUNK_AI_WINDOW_MAX_CHARS", 12000)),
+            window_overlap_blocks=int(current_app.config.get("RAG_CHUNK_AI_WINDOW_OVERLAP_BLOCKS", 1)),
+            max_workers=int(current_app.config.get("RAG_CHUNK_AI_MAX_WORKERS", 4)),
+            cache=get_semantic_window_cache(int(current_app.config.get("RAG_CHUNK_AI_CACHE_SIZE", 256))),
+        )
+    if provider in {"embedding", "embedding-similarity"}:
+        return EmbeddingSimilaritySemanticChunkingProvider(
+            embedder=get_embedder(),
+            breakpoint_percentile=float(current_app.config.get("RAG_CHUNK_AI_BREAKPOINT_PERCENTILE", 90)),
+            batch_size=int(current_app.config.get("RAG_CHUNK_AI_EMBEDDING_BATCH_SIZE", 64)),
         )
     raise RAGConfigurationError(f"unsupported chunking ai provider: {provider}")
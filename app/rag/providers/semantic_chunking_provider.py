@@ -1,19 +1,46 @@
 from __future__ import annotations
 
+import hashlib
 import json
 import re
-from dataclasses import asdict
+from bisect import bisect_left
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from threading import Lock
 from urllib import request as urllib_request
 
+import numpy as np
+
 from ..errors import RAGChunkingError
-from ..schemas import SemanticSegment
+from ..pipeline.chunking import estimate_tokens
+from ..schemas import ChunkingBounds, SemanticSegment
+from .interfaces import Embedder
+
+
+_MIN_BREAK_DISTANCE = 1e-6
+_SENTENCE_BOUNDARY_RE = re.compile(r"(?<=[。！？!?；;])|(?<=\.)\s+|[\r\n]+")
+_SENTENCE_BREAK_RE = re.compile(r"(?<=[。！？!?\.])\s+|\n+")
 
 
 def _split_sentences(text: str) -> list[str]:
-    chunks = re.split(r"(?<=[。！？!?\.])\s+|\n+", text)
+    chunks = _SENTENCE_BREAK_RE.split(text)
     return [item.strip() for item in chunks if item and item.strip()]
 
 
+def _sentence_spans(text: str) -> list[tuple[int, int]]:
+    spans: list[tuple[int, int]] = []
+    cursor = 0
+    for match in [*_SENTENCE_BOUNDARY_RE.finditer(text), None]:
+        end = match.start() if match is not None else len(text)
+        start, end = _trim_span(text, cursor, end)
+        if end > start:
+            spans.append((start, end))
+        if match is not None:
+            cursor = match.end()
+    return spans
+
+
 def _collapse_whitespace(text: str) -> str:
     return re.sub(r"\s+", " ", text).strip()
 
@@ -53,46 +80,153 @@ def _trim_span(text: str, start: int, end: int) -> tuple[int, int]:
     return trimmed_start, max(trimmed_start, trimmed_end)
 
 
-def _find_span_in_block(*, block_text: str, segment_text: str, start_pos: int) -> tuple[int, int] | None:
-    direct_idx = block_text.find(segment_text, max(0, start_pos))
-    if direct_idx >= 0:
-        return _trim_span(block_text, direct_idx, direct_idx + len(segment_text))
+class _BlockText:
+    __slots__ = ("text", "_normalized", "_mapping")
+
+    def __init__(self, text: str) -> None:
+        self.text = text
+        self._normalized: str | None = None
+        self._mapping: list[int] = []
+
+    def _ensure_normalized(self) -> str:
+        if self._normalized is None:
+            self._normalized, self._mapping = _normalize_with_mapping(self.text)
+        return self._normalized
+
+    def find(self, segment_text: str, normalized_segment: str, start_pos: int) -> tuple[int, int] | None:
+        direct_idx = self.text.find(segment_text, max(0, start_pos))
+        if direct_idx >= 0:
+            return _trim_span(self.text, direct_idx, direct_idx + len(segment_text))
+        if not normalized_segment:
+            return None
+        normalized = self._ensure_normalized()
+        if not normalized:
+            return None
+        norm_idx = normalized.find(normalized_segment, bisect_left(self._mapping, max(0, start_pos)))
+        if norm_idx < 0:
+            return None
+        norm_end = norm_idx + len(normalized_segment)
+        span_start, span_end = _trim_span(self.text, self._mapping[norm_idx], self._mapping[norm_end - 1] + 1)
+        if _collapse_whitespace(self.text[span_start:span_end]) != normalized_segment:
+            return None
+        return span_start, span_end
 
-    normalized_segment = _collapse_whitespace(segment_text)
-    if not normalized_segment:
-        return None
 
-    start_anchor = max(0, start_pos)
-    suffix = block_text[start_anchor:]
-    normalized_suffix, suffix_map = _normalize_with_mapping(suffix)
-    if normalized_suffix and suffix_map:
-        norm_idx = normalized_suffix.find(normalized_segment)
-        if norm_idx >= 0:
-            norm_end = norm_idx + len(normalized_segment)
-            if norm_end <= len(suffix_map):
-                raw_start = start_anchor + suffix_map[norm_idx]
-                raw_end = start_anchor + suffix_map[norm_end - 1] + 1
-                span_start, span_end = _trim_span(block_text, raw_start, raw_end)
-                candidate = block_text[span_start:span_end]
-                if _collapse_whitespace(candidate) == normalized_segment:
-                    return span_start, span_end
-
-    normalized_block, block_map = _normalize_with_mapping(block_text)
-    if not normalized_block or not block_map:
-        return None
-    norm_idx = normalized_block.find(normalized_segment)
-    if norm_idx < 0:
-        return None
-    norm_end = norm_idx + len(normalized_segment)
-    if norm_end > len(block_map):
+class SegmentAligner:
+    def __init__(self, blocks: list[dict]) -> None:
+        self._blocks = [_BlockText(str(block.get("text", ""))) for block in blocks]
+        self._cursors = [0 for _ in blocks]
+
+    def align(self, segment_text: str, *, hinted_block_index: int | None = None) -> tuple[int, int, int] | None:
+        normalized_segment = _collapse_whitespace(segment_text)
+        candidate_indexes = range(len(self._blocks))
+        if hinted_block_index is not None and 0 <= hinted_block_index < len(self._blocks):
+            candidate_indexes = [hinted_block_index] + [i for i in candidate_indexes if i != hinted_block_index]
+        for block_index in candidate_indexes:
+            block = self._blocks[block_index]
+            if not block.text:
+                continue
+            cursor = self._cursors[block_index]
+            span = block.find(segment_text, normalized_segment, cursor)
+            if span is None and cursor > 0:
+                span = block.find(segment_text, normalized_segment, 0)
+            if span is None:
+                continue
+            self._cursors[block_index] = max(cursor, span[1])
+            return block_index, span[0], span[1]
         return None
-    raw_start = block_map[norm_idx]
-    raw_end = block_map[norm_end - 1] + 1
-    span_start, span_end = _trim_span(block_text, raw_start, raw_end)
-    candidate = block_text[span_start:span_end]
-    if _collapse_whitespace(candidate) == normalized_segment:
-        return span_start, span_end
-    return None
+
+
+@dataclass(frozen=True, slots=True)
+class BlockWindow:
+    start: int
+    end: int
+    own_start: int
+    own_end: int
+
+
+def plan_block_windows(blocks: list[dict], *, max_chars: int, overlap_blocks: int) -> list[BlockWindow]:
+    bounds: list[tuple[int, int]] = []
+    start = 0
+    while start < len(blocks):
+        end = start
+        size = 0
+        while end < len(blocks):
+            block_size = len(str(blocks[end].get("text", "")))
+            if end > start and size + block_size > max_chars:
+                break
+            size += block_size
+            end += 1
+        bounds.append((start, end))
+        if end >= len(blocks):
+            break
+        start = max(end - max(0, overlap_blocks), start + 1)
+
+    cuts = [0]
+    for (_, previous_end), (next_start, _) in zip(bounds, bounds[1:]):
+        overlap = max(0, previous_end - next_start)
+        cuts.append(max(cuts[-1], next_start + (overlap + 1) // 2))
+    cuts.append(len(blocks))
+    return [
+        BlockWindow(start=start, end=end, own_start=cuts[index], own_end=max(cuts[index], cuts[index + 1]))
+        for index, (start, end) in enumerate(bounds)
+    ]
+
+
+class SemanticWindowCache:
+    def __init__(self, *, max_entries: int) -> None:
+        self.max_entries = max(int(max_entries), 0)
+        self._lock = Lock()
+        self._entries: OrderedDict[str, list[SemanticSegment]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key_for(*, model_name: str, strategy: str, blocks: list[dict]) -> str:
+        content = json.dumps(
+            [{"text": str(block.get("text", "")), "metadata": dict(block.get("metadata", {}))} for block in blocks],
+            ensure_ascii=False,
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(f"{model_name}\x00{strategy}\x00{content}".encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> list[SemanticSegment] | None:
+        with self._lock:
+            segments = self._entries.get(key)
+            if segments is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return segments
+
+    def put(self, key: str, segments: list[SemanticSegment]) -> None:
+        if self.max_entries == 0:
+            return
+        with self._lock:
+            self._entries[key] = segments
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+_window_cache_lock = Lock()
+_window_cache: SemanticWindowCache | None = None
+
+
+def get_semantic_window_cache(max_entries: int) -> SemanticWindowCache:
+    global _window_cache
+    with _window_cache_lock:
+        if _window_cache is None or _window_cache.max_entries != max(int(max_entries), 0):
+            _window_cache = SemanticWindowCache(max_entries=max_entries)
+        return _window_cache
+
+
+def reset_semantic_window_cache_for_tests() -> None:
+    global _window_cache
+    with _window_cache_lock:
+        _window_cache = None
 
 
 def _coerce_int(value) -> int | None:
@@ -112,6 +246,7 @@ class NoopSemanticChunkingProvider:
         strategy: str,
         source_name: str,
         blocks: list[dict],
+        bounds: ChunkingBounds | None = None,
     ) -> list[SemanticSegment]:
         segments: list[SemanticSegment] = []
         for block_index, block in enumerate(blocks):
@@ -139,12 +274,27 @@ class NoopSemanticChunkingProvider:
 class OpenAICompatibleSemanticChunkingProvider:
     provider_name = "openai-compatible"
 
-    def __init__(self, *, model_name: str, api_key: str, base_url: str, timeout_seconds: int) -> None:
+    def __init__(
+        self,
+        *,
+        model_name: str,
+        api_key: str,
+        base_url: str,
+        timeout_seconds: int,
+        window_max_chars: int = 12000,
+        window_overlap_blocks: int = 1,
+        max_workers: int = 4,
+        cache: SemanticWindowCache | None = None,
+    ) -> None:
         self.model_name = model_name
         self.model_version = "1"
         self._api_key = api_key.strip()
         self._base_url = base_url.rstrip("/")
         self._timeout_seconds = max(1, int(timeout_seconds))
+        self._window_max_chars = max(1, int(window_max_chars))
+        self._window_overlap_blocks = max(0, int(window_overlap_blocks))
+        self._max_workers = max(1, int(max_workers))
+        self._cache = cache
 
     def _build_prompt(self, *, strategy: str, source_name: str, blocks: list[dict]) -> str:
         sample = [
@@ -176,45 +326,20 @@ class OpenAICompatibleSemanticChunkingProvider:
         item: dict,
         blocks: list[dict],
         source_name: str,
-        search_offsets: list[int],
+        aligner: SegmentAligner,
         index: int,
     ) -> SemanticSegment:
         text = str(item.get("text", "")).strip()
         if not text:
             raise RAGChunkingError(f"semantic segment at index {index} has empty text")
 
-        hinted_block_index = _coerce_int(item.get("block_index"))
-        candidate_indexes = list(range(len(blocks)))
-        if hinted_block_index is not None and 0 <= hinted_block_index < len(blocks):
-            candidate_indexes = [hinted_block_index] + [i for i in candidate_indexes if i != hinted_block_index]
-
-        matched_block = None
-        matched_span = None
-        for block_index in candidate_indexes:
-            block = blocks[block_index]
-            block_text = str(block.get("text", ""))
-            if not block_text:
-                continue
-            span = _find_span_in_block(
-                block_text=block_text,
-                segment_text=text,
-                start_pos=search_offsets[block_index],
-            )
-            if span is None and search_offsets[block_index] > 0:
-                span = _find_span_in_block(block_text=block_text, segment_text=text, start_pos=0)
-            if span is None:
-                continue
-            matched_block = block_index
-            matched_span = span
-            break
-
-        if matched_block is None or matched_span is None:
+        matched = aligner.align(text, hinted_block_index=_coerce_int(item.get("block_index")))
+        if matched is None:
             raise RAGChunkingError(
                 f"semantic segment at index {index} is not a verbatim span of the source text"
             )
 
-        span_start, span_end = matched_span
-        search_offsets[matched_block] = max(search_offsets[matched_block], span_end)
+        matched_block, span_start, span_end = matched
         block = blocks[matched_block]
         block_text = str(block.get("text", ""))
         matched_text = block_text[span_start:span_end].strip()
@@ -236,19 +361,7 @@ class OpenAICompatibleSemanticChunkingProvider:
             summary=None,
         )
 
-    def segment(
-        self,
-        *,
-        strategy: str,
-        source_name: str,
-        blocks: list[dict],
-    ) -> list[SemanticSegment]:
-        if not self._api_key:
-            raise RAGChunkingError("chunking provider api key is missing")
-        if not self._base_url:
-            raise RAGChunkingError("chunking provider base url is missing")
-        if not blocks:
-            return []
+    def _request_segment_items(self, *, strategy: str, source_name: str, blocks: list[dict]) -> list:
         body = {
             "model": self.model_name,
             "messages": [
@@ -278,27 +391,187 @@ class OpenAICompatibleSemanticChunkingProvider:
             items = parsed["segments"]
         except Exception as exc:
             raise RAGChunkingError("semantic chunking provider returned invalid response payload") from exc
-
-        segments: list[SemanticSegment] = []
         if not isinstance(items, list):
             raise RAGChunkingError("semantic chunking provider response segments must be a list")
-        search_offsets = [0 for _ in blocks]
-        for idx, item in enumerate(items):
-            if not isinstance(item, dict):
-                raise RAGChunkingError(f"semantic segment at index {idx} must be an object")
-            segments.append(
-                self._align_segment_to_source(
-                    item=item,
-                    blocks=blocks,
-                    source_name=source_name,
-                    search_offsets=search_offsets,
-                    index=idx,
+        return items
+
+    def _segment_window(
+        self,
+        *,
+        strategy: str,
+        source_name: str,
+        blocks: list[dict],
+        window: BlockWindow,
+    ) -> list[SemanticSegment]:
+        window_blocks = blocks[window.start : window.end]
+        cache_key = SemanticWindowCache.key_for(model_name=self.model_name, strategy=strategy, blocks=window_blocks)
+        local_segments = self._cache.get(cache_key) if self._cache is not None else None
+        if local_segments is None:
+            items = self._request_segment_items(strategy=strategy, source_name=source_name, blocks=window_blocks)
+            aligner = SegmentAligner(window_blocks)
+            local_segments = []
+            for idx, item in enumerate(items):
+                if not isinstance(item, dict):
+                    raise RAGChunkingError(f"semantic segment at index {idx} must be an object")
+                local_segments.append(
+                    self._align_segment_to_source(
+                        item=item,
+                        blocks=window_blocks,
+                        source_name=source_name,
+                        aligner=aligner,
+                        index=idx,
+                    )
                 )
-            )
+            if self._cache is not None:
+                self._cache.put(cache_key, local_segments)
+        segments: list[SemanticSegment] = []
+        for local in local_segments:
+            block_index = window.start + int(local.metadata["block_index"])
+            if not window.own_start <= block_index < window.own_end:
+                continue
+            metadata = dict(local.metadata)
+            metadata["source"] = source_name
+            metadata["block_index"] = block_index
+            segments.append(SemanticSegment(text=local.text, metadata=metadata, topic=local.topic, summary=local.summary))
+        return segments
+
+    def segment(
+        self,
+        *,
+        strategy: str,
+        source_name: str,
+        blocks: list[dict],
+        bounds: ChunkingBounds | None = None,
+    ) -> list[SemanticSegment]:
+        if not self._api_key:
+            raise RAGChunkingError("chunking provider api key is missing")
+        if not self._base_url:
+            raise RAGChunkingError("chunking provider base url is missing")
+        if not blocks:
+            return []
+        windows = plan_block_windows(
+            blocks,
+            max_chars=self._window_max_chars,
+            overlap_blocks=self._window_overlap_blocks,
+        )
+
+        def _run(window: BlockWindow) -> list[SemanticSegment]:
+            return self._segment_window(strategy=strategy, source_name=source_name, blocks=blocks, window=window)
+
+        if len(windows) == 1:
+            window_results = [_run(windows[0])]
+        else:
+            with ThreadPoolExecutor(
+                max_workers=min(self._max_workers, len(windows)),
+                thread_name_prefix="rag-semantic-chunk",
+            ) as pool:
+                window_results = list(pool.map(_run, windows))
+
+        segments: list[SemanticSegment] = []
+        seen_spans: set[tuple[int, int, int]] = set()
+        for window_segments in window_results:
+            for segment in window_segments:
+                span = (
+                    int(segment.metadata["block_index"]),
+                    int(segment.metadata["offset_start"]),
+                    int(segment.metadata["offset_end"]),
+                )
+                if span in seen_spans:
+                    continue
+                seen_spans.add(span)
+                segments.append(segment)
         if not segments:
             raise RAGChunkingError("semantic chunking provider returned no valid segments")
         return segments
 
 
+class EmbeddingSimilaritySemanticChunkingProvider:
+    provider_name = "embedding-similarity"
+
+    def __init__(self, *, embedder: Embedder, breakpoint_percentile: float = 90.0, batch_size: int = 64) -> None:
+        self._embedder = embedder
+        self.model_name = f"embedding-similarity:{embedder.model_name}"
+        self.model_version = str(embedder.model_version)
+        self._breakpoint_percentile = min(100.0, max(0.0, float(breakpoint_percentile)))
+        self._batch_size = max(1, int(batch_size))
+
+    def _embed_sentences(self, texts: list[str]) -> np.ndarray:
+        vectors: list[list[float]] = []
+        for start in range(0, len(texts), self._batch_size):
+            batch = texts[start : start + self._batch_size]
+            embedded = self._embedder.embed_documents(batch)
+            if len(embedded) != len(batch):
+                raise RAGChunkingError("semantic chunking embedder returned mismatched vector count")
+            vectors.extend(embedded)
+        matrix = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.where(norms == 0, 1.0, norms)
+
+    def _breakpoints(self, sentences: list[tuple[int, int, int, str]]) -> np.ndarray:
+        if len(sentences) < 2:
+            return np.zeros(0, dtype=bool)
+        matrix = self._embed_sentences([text for _, _, _, text in sentences])
+        distances = 1.0 - np.einsum("ij,ij->i", matrix[:-1], matrix[1:])
+        threshold = np.percentile(distances, self._breakpoint_percentile)
+        return (distances >= threshold) & (distances > _MIN_BREAK_DISTANCE)
+
+    def segment(
+        self,
+        *,
+        strategy: str,
+        source_name: str,
+        blocks: list[dict],
+        bounds: ChunkingBounds | None = None,
+    ) -> list[SemanticSegment]:
+        sentences: list[tuple[int, int, int, str]] = []
+        for block_index, block in enumerate(blocks):
+            block_text = str(block.get("text", ""))
+            for start, end in _sentence_spans(block_text):
+                sentences.append((block_index, start, end, block_text[start:end]))
+        if not sentences:
+            return []
+        try:
+            breakpoints = self._breakpoints(sentences)
+        except RAGChunkingError:
+            raise
+        except Exception as exc:
+            raise RAGChunkingError(f"semantic chunking embedder failed: {exc}") from exc
+        min_tokens = bounds.min_tokens if bounds is not None else 0
+        max_tokens = bounds.max_tokens if bounds is not None else 0
+        token_counts = [estimate_tokens(text) for _, _, _, text in sentences]
+
+        segments: list[SemanticSegment] = []
+        group_start = 0
+        group_tokens = token_counts[0]
+        for index in range(1, len(sentences) + 1):
+            if index < len(sentences):
+                crosses_block = sentences[index][0] != sentences[index - 1][0]
+                semantic_break = bool(breakpoints[index - 1]) and group_tokens >= min_tokens
+                over_max = bool(max_tokens) and group_tokens + token_counts[index] > max_tokens
+                if not (crosses_block or semantic_break or over_max):
+                    group_tokens += token_counts[index]
+                    continue
+            block_index, offset_start, _, _ = sentences[group_start]
+            offset_end = sentences[index - 1][2]
+            block = blocks[block_index]
+            metadata = dict(block.get("metadata", {}))
+            metadata["source"] = source_name
+            metadata["block_index"] = block_index
+            metadata["offset_start"] = offset_start
+            metadata["offset_end"] = offset_end
+            segments.append(
+                SemanticSegment(
+                    text=str(block.get("text", ""))[offset_start:offset_end],
+                    metadata=metadata,
+                    topic=None,
+                    summary=None,
+                )
+            )
+            if index < len(sentences):
+                group_start = index
+                group_tokens = token_counts[index]
+        return segments
+
+
 def serialize_semantic_segments(segments: list[SemanticSegment]) -> list[dict]:
     return [asdict(segment) for segment in segments]
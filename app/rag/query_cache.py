@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Callable
+
+from flask import current_app
+
+from .providers.embedding_cache import normalize_embedding_text
+from .providers.interfaces import Embedder
+
+QueryCacheKey = tuple[str, str, str, int, str]
+
+
+class QueryEmbeddingCache:
+    def __init__(self, *, max_entries: int, ttl_seconds: float, clock: Callable[[], float] = time.monotonic) -> None:
+        self.max_entries = max(int(max_entries), 0)
+        self.ttl_seconds = max(float(ttl_seconds), 0.0)
+        self._clock = clock
+        self._lock = Lock()
+        self._entries: OrderedDict[QueryCacheKey, tuple[float, list[float]]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key_for(embedder: Embedder, text: str) -> QueryCacheKey:
+        return (
+            str(embedder.provider_name),
+            str(embedder.model_name),
+            str(embedder.model_version),
+            int(embedder.dimension),
+            normalize_embedding_text(text),
+        )
+
+    def get(self, key: QueryCacheKey) -> list[float] | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < self._clock():
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return list(entry[1])
+
+    def put(self, key: QueryCacheKey, vector: list[float]) -> None:
+        if self.max_entries == 0 or self.ttl_seconds == 0:
+            return
+        with self._lock:
+            self._entries[key] = (self._clock() + self.ttl_seconds, list(vector))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def embed_query(self, embedder: Embedder, text: str) -> tuple[list[float], bool]:
+        key = self.key_for(embedder, text)
+        cached = self.get(key)
+        if cached is not None:
+            return cached, True
+        vector = embedder.embed_query(text)
+        self.put(key, vector)
+        return vector, False
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxEntries": self.max_entries,
+                "ttlSeconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hitRate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+_query_cache_lock = Lock()
+_query_cache: QueryEmbeddingCache | None = None
+
+
+def get_query_embedding_cache() -> QueryEmbeddingCache:
+    global _query_cache
+    max_entries = int(current_app.config.get("RAG_QUERY_EMBEDDING_CACHE_SIZE", 1024))
+    ttl_seconds = float(current_app.config.get("RAG_QUERY_EMBEDDING_CACHE_TTL_SECONDS", 600))
+    with _query_cache_lock:
+        if (
+            _query_cache is None
+            or _query_cache.max_entries != max(max_entries, 0)
+            or _query_cache.ttl_seconds != max(ttl_seconds, 0.0)
+        ):
+            _query_cache = QueryEmbeddingCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+        return _query_cache
+
+
+def reset_query_embedding_cache_for_tests() -> None:
+    global _query_cache
+    with _query_cache_lock:
+        _query_cache = None
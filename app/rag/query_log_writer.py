@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import atexit
+import logging
+import queue
+from threading import Event, Lock, Thread
+from typing import Any
+
+from flask import Flask
+
+from ..db import session_scope
+from .repository import insert_query_logs
+
+logger = logging.getLogger(__name__)
+
+_writer_lock = Lock()
+
+
+class QueryLogWriter:
+    def __init__(self, app: Flask, *, max_queue: int, batch_size: int, flush_interval_seconds: float) -> None:
+        self._app = app
+        self.max_queue = max(1, int(max_queue))
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval_seconds = max(0.01, float(flush_interval_seconds))
+        self._queue: queue.Queue[dict] = queue.Queue(maxsize=self.max_queue)
+        self._stop = Event()
+        self._write_lock = Lock()
+        self._stats_lock = Lock()
+        self._thread = Thread(target=self._run, name="rag-query-log-writer", daemon=True)
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def submit(self, row: dict) -> bool:
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            with self._stats_lock:
+                self.dropped += 1
+                dropped = self.dropped
+            if dropped == 1 or dropped % 1000 == 0:
+                logger.warning(
+                    "RAG query log queue full; dropping entries",
+                    extra={"event": "rag.query_log.dropped", "dropped": dropped, "max_queue": self.max_queue},
+                )
+            return False
+        return True
+
+    def _drain(self, first: dict | None) -> list[dict]:
+        rows = [first] if first is not None else []
+        while len(rows) < self.batch_size:
+            try:
+                rows.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return rows
+
+    def _write(self, rows: list[dict]) -> None:
+        if not rows:
+            return
+        try:
+            with self._app.app_context():
+                with session_scope() as db:
+                    insert_query_logs(db=db, rows=rows)
+        except Exception:
+            with self._stats_lock:
+                self.failed += len(rows)
+            logger.exception(
+                "Failed to write RAG query logs",
+                extra={"event": "rag.query_log.write_failed", "row_count": len(rows)},
+            )
+            return
+        with self._stats_lock:
+            self.written += len(rows)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                first = self._queue.get(timeout=self.flush_interval_seconds)
+            except queue.Empty:
+                continue
+            if self._queue.qsize() + 1 < self.batch_size:
+                self._stop.wait(self.flush_interval_seconds)
+            with self._write_lock:
+                self._write(self._drain(first))
+
+    def flush(self) -> None:
+        with self._write_lock:
+            while True:
+                rows = self._drain(None)
+                if not rows:
+                    return
+                self._write(rows)
+
+    def close(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout=timeout)
+        self.flush()
+
+    def stats(self) -> dict[str, Any]:
+        with self._stats_lock:
+            return {
+                "queued": self._queue.qsize(),
+                "maxQueue": self.max_queue,
+                "written": self.written,
+                "dropped": self.dropped,
+                "failed": self.failed,
+            }
+
+
+def start_query_log_writer(app: Flask) -> QueryLogWriter:
+    with _writer_lock:
+        writer = app.extensions.get("rag_query_log_writer")
+        if writer is not None:
+            return writer
+        writer = QueryLogWriter(
+            app,
+            max_queue=int(app.config.get("RAG_QUERY_LOG_QUEUE_SIZE", 10000)),
+            batch_size=int(app.config.get("RAG_QUERY_LOG_BATCH_SIZE", 200)),
+            flush_interval_seconds=float(app.config.get("RAG_QUERY_LOG_FLUSH_INTERVAL_SECONDS", 1.0)),
+        )
+        writer.start()
+        atexit.register(writer.close)
+        app.extensions["rag_query_log_writer"] = writer
+        return writer
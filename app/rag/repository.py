@@ -1,10 +1,12 @@
 from __future__ import annotations
 
+import hashlib
+import json
 from datetime import datetime
 
-from sqlalchemy import delete, select
+from sqlalchemy import delete, insert, select
 
-from ..models import RagChunk, RagDocument, RagIndexJob, RagQueryLog
+from ..models import RagChunk, RagDocument, RagIndexJob, RagQueryLog, RagSemanticSegment
 from .errors import RAGAuthorizationError, RAGValidationError
 
 ALLOWED_DOCUMENT_STATUSES = {"uploaded", "indexing", "indexed", "failed", "deleted"}
@@ -100,6 +102,7 @@ def create_index_job(
     db,
     document: RagDocument,
     requested_chunk_strategy: str | None = None,
+    chunking: dict | None = None,
 ) -> RagIndexJob:
     if document.status == "deleted":
         raise RAGValidationError("cannot index deleted document")
@@ -109,6 +112,7 @@ def create_index_job(
         workspace_id=document.workspace_id,
         status="pending",
         requested_chunk_strategy=requested_chunk_strategy,
+        chunking_json=chunking,
     )
     db.add(job)
     db.flush()
@@ -137,6 +141,9 @@ def set_index_job_status(
     chunk_version: str | None = None,
     chunk_fallback_used: bool | None = None,
     chunk_fallback_reason: str | None = None,
+    chunks_added: int | None = None,
+    chunks_unchanged: int | None = None,
+    chunks_removed: int | None = None,
 ) -> None:
     if status not in ALLOWED_INDEX_JOB_STATUSES:
         raise RAGValidationError("invalid index job status")
@@ -148,6 +155,8 @@ def set_index_job_status(
         if job.started_at is None:
             job.started_at = now
         job.finished_at = now
+        job.lease_owner = None
+        job.lease_expires_at = None
         job.duration_ms = int((job.finished_at - job.started_at).total_seconds() * 1000)
     job.status = status
     job.error_stage = error_stage
@@ -166,16 +175,128 @@ def set_index_job_status(
         job.chunk_fallback_used = 1 if chunk_fallback_used else 0
     if chunk_fallback_reason is not None:
         job.chunk_fallback_reason = chunk_fallback_reason
+    if chunks_added is not None:
+        job.chunks_added = max(0, chunks_added)
+    if chunks_unchanged is not None:
+        job.chunks_unchanged = max(0, chunks_unchanged)
+    if chunks_removed is not None:
+        job.chunks_removed = max(0, chunks_removed)
 
 
-def replace_document_chunks(*, db, document: RagDocument, chunks: list[RagChunk]) -> None:
-    db.execute(delete(RagChunk).where(RagChunk.document_id == document.id))
+def chunk_fingerprint(
+    *,
+    metadata: dict | None,
+    embedding_model: str | None,
+    embedding_version: str | None,
+    embedding_dimension: int | None,
+) -> str:
+    payload = json.dumps(
+        [metadata or {}, embedding_model, embedding_version, embedding_dimension],
+        ensure_ascii=False,
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def list_document_chunk_fingerprints(*, db, document_id: int) -> dict[str, str]:
+    rows = db.execute(
+        select(
+            RagChunk.chunk_id,
+            RagChunk.metadata_json,
+            RagChunk.embedding_model,
+            RagChunk.embedding_version,
+            RagChunk.embedding_dimension,
+        )
+        .where(RagChunk.document_id == document_id)
+        .execution_options(yield_per=500)
+    )
+    return {
+        str(chunk_id): chunk_fingerprint(
+            metadata=metadata,
+            embedding_model=embedding_model,
+            embedding_version=embedding_version,
+            embedding_dimension=embedding_dimension,
+        )
+        for chunk_id, metadata, embedding_model, embedding_version, embedding_dimension in rows
+    }
+
+
+def apply_document_chunk_diff(
+    *,
+    db,
+    document: RagDocument,
+    chunks: list[RagChunk],
+    removed_chunk_ids: list[str],
+) -> None:
+    stale_ids = [*removed_chunk_ids, *(chunk.chunk_id for chunk in chunks)]
+    if stale_ids:
+        db.execute(
+            delete(RagChunk)
+            .where(RagChunk.document_id == document.id, RagChunk.chunk_id.in_(stale_ids))
+            .execution_options(rag_workspace_id=document.workspace_id)
+        )
     for chunk in chunks:
         db.add(chunk)
 
 
 def delete_document_chunks(*, db, document: RagDocument) -> None:
-    db.execute(delete(RagChunk).where(RagChunk.document_id == document.id))
+    db.execute(
+        delete(RagChunk)
+        .where(RagChunk.document_id == document.id)
+        .execution_options(rag_workspace_id=document.workspace_id)
+    )
+    db.execute(delete(RagSemanticSegment).where(RagSemanticSegment.document_id == document.id))
+
+
+def store_semantic_segments(*, db, document: RagDocument, segments: dict[str, str]) -> None:
+    if not segments:
+        return
+    existing = set(
+        db.scalars(
+            select(RagSemanticSegment.segment_id).where(
+                RagSemanticSegment.document_id == document.id,
+                RagSemanticSegment.segment_id.in_(list(segments)),
+            )
+        )
+    )
+    for segment_id, text in segments.items():
+        if segment_id in existing:
+            continue
+        db.add(
+            RagSemanticSegment(
+                document_id=document.id,
+                user_id=document.user_id,
+                workspace_id=document.workspace_id,
+                segment_id=segment_id,
+                text=text,
+            )
+        )
+
+
+def prune_semantic_segments(*, db, document: RagDocument, keep_segment_ids: set[str]) -> None:
+    stored = db.scalars(select(RagSemanticSegment.segment_id).where(RagSemanticSegment.document_id == document.id))
+    stale_ids = [segment_id for segment_id in stored if segment_id not in keep_segment_ids]
+    if stale_ids:
+        db.execute(
+            delete(RagSemanticSegment).where(
+                RagSemanticSegment.document_id == document.id,
+                RagSemanticSegment.segment_id.in_(stale_ids),
+            )
+        )
+
+
+def load_semantic_segment_texts(*, db, user_id: int, workspace_id: str, segment_ids: list[str]) -> dict[str, str]:
+    if not segment_ids:
+        return {}
+    rows = db.execute(
+        select(RagSemanticSegment.segment_id, RagSemanticSegment.text).where(
+            RagSemanticSegment.user_id == user_id,
+            RagSemanticSegment.workspace_id == workspace_id,
+            RagSemanticSegment.segment_id.in_(segment_ids),
+        )
+    )
+    return {str(segment_id): str(text) for segment_id, text in rows}
 
 
 def create_chunk_entities(
@@ -216,9 +337,8 @@ def create_chunk_entities(
     return entities
 
 
-def create_query_log(
+def build_query_log_row(
     *,
-    db,
     user_id: int,
     workspace_id: str,
     query_text: str,
@@ -236,25 +356,29 @@ def create_query_log(
     chunk_provider: str | None = None,
     chunk_model: str | None = None,
     failure_reason: str | None = None,
-) -> None:
-    db.add(
-        RagQueryLog(
-            user_id=user_id,
-            workspace_id=workspace_id,
-            query_text=query_text,
-            top_k=top_k,
-            hit_count=hit_count,
-            latency_ms=latency_ms,
-            top_scores={"scores": top_scores},
-            filters=filters,
-            vector_provider=vector_provider,
-            embedder_provider=embedder_provider,
-            embedding_model=embedding_model,
-            embedding_version=embedding_version,
-            embedding_dimension=embedding_dimension,
-            chunk_strategy=chunk_strategy,
-            chunk_provider=chunk_provider,
-            chunk_model=chunk_model,
-            failure_reason=failure_reason,
-        )
-    )
+) -> dict:
+    return {
+        "user_id": user_id,
+        "workspace_id": workspace_id,
+        "query_text": query_text,
+        "top_k": top_k,
+        "hit_count": hit_count,
+        "latency_ms": latency_ms,
+        "top_scores": {"scores": top_scores},
+        "filters": filters,
+        "vector_provider": vector_provider,
+        "embedder_provider": embedder_provider,
+        "embedding_model": embedding_model,
+        "embedding_version": embedding_version,
+        "embedding_dimension": embedding_dimension,
+        "chunk_strategy": chunk_strategy,
+        "chunk_provider": chunk_provider,
+        "chunk_model": chunk_model,
+        "failure_reason": failure_reason,
+        "created_at": datetime.utcnow(),
+    }
+
+
+def insert_query_logs(*, db, rows: list[dict]) -> None:
+    if rows:
+        db.execute(insert(RagQueryLog), rows)
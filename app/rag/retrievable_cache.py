@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import os
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from threading import Lock
+from typing import Any
+
+from flask import current_app, has_app_context
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from ..models import RagChunk, RagDocument
+from .assets import retrievable_root, workspace_storage_key
+
+RetrievableCacheKey = tuple[str, int, str]
+
+_ALL_WORKSPACES = "*"
+_DIRTY_INFO_KEY = "rag_retrievable_dirty"
+
+
+def _write_stamp(path: Path, *, replace: bool) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.parent / f".{path.name}.{uuid.uuid4().hex}"
+    tmp_path.write_text(uuid.uuid4().hex, encoding="utf-8")
+    try:
+        if replace:
+            os.replace(tmp_path, path)
+        else:
+            os.link(tmp_path, path)
+    except FileExistsError:
+        pass
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+
+def read_stamp(path: Path) -> str:
+    try:
+        return path.read_text(encoding="utf-8")
+    except FileNotFoundError:
+        _write_stamp(path, replace=False)
+        return path.read_text(encoding="utf-8")
+
+
+def bump_stamp(path: Path) -> None:
+    _write_stamp(path, replace=True)
+
+
+def retrievable_stamp(workspace_id: str) -> str:
+    root = retrievable_root()
+    global_stamp = read_stamp(root / "ALL.version")
+    return f"{global_stamp}:{read_stamp(root / f'{workspace_storage_key(workspace_id)}.version')}"
+
+
+def invalidate_retrievable_workspaces(workspace_ids: set[str]) -> None:
+    root = retrievable_root()
+    if _ALL_WORKSPACES in workspace_ids:
+        bump_stamp(root / "ALL.version")
+        return
+    for workspace_id in workspace_ids:
+        bump_stamp(root / f"{workspace_storage_key(workspace_id)}.version")
+
+
+@event.listens_for(Session, "after_flush")
+def _track_retrievable_changes(session: Session, flush_context) -> None:
+    dirty: set[str] = session.info.setdefault(_DIRTY_INFO_KEY, set())
+    for instance in session.deleted:
+        if isinstance(instance, (RagChunk, RagDocument)):
+            dirty.add(str(instance.workspace_id))
+    for instance in session.dirty:
+        if isinstance(instance, RagDocument) and inspect(instance).attrs.status.history.has_changes():
+            dirty.add(str(instance.workspace_id))
+    for instance in session.new:
+        if isinstance(instance, RagDocument) and instance.status == "indexed":
+            dirty.add(str(instance.workspace_id))
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _track_retrievable_bulk_changes(orm_execute_state) -> None:
+    if not (orm_execute_state.is_delete or orm_execute_state.is_update):
+        return
+    if any(mapper.class_ in (RagChunk, RagDocument) for mapper in orm_execute_state.all_mappers):
+        workspace_id = orm_execute_state.execution_options.get("rag_workspace_id")
+        scope = str(workspace_id) if workspace_id is not None else _ALL_WORKSPACES
+        orm_execute_state.session.info.setdefault(_DIRTY_INFO_KEY, set()).add(scope)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_retrievable_changes(session: Session) -> None:
+    dirty = session.info.pop(_DIRTY_INFO_KEY, None)
+    if dirty and has_app_context():
+        invalidate_retrievable_workspaces(dirty)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_retrievable_changes(session: Session) -> None:
+    session.info.pop(_DIRTY_INFO_KEY, None)
+
+
+class RetrievableChunkCache:
+    def __init__(self, *, max_workspaces: int) -> None:
+        self.max_workspaces = max(int(max_workspaces), 0)
+        self._lock = Lock()
+        self._entries: OrderedDict[RetrievableCacheKey, tuple[str, frozenset[str]]] = OrderedDict()
+        self._warming: set[RetrievableCacheKey] = set()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: RetrievableCacheKey, *, stamp: str) -> frozenset[str] | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] != stamp:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def begin_warm(self, key: RetrievableCacheKey) -> bool:
+        if self.max_workspaces == 0:
+            return False
+        with self._lock:
+            if key in self._warming:
+                return False
+            self._warming.add(key)
+            return True
+
+    def finish_warm(self, key: RetrievableCacheKey, *, stamp: str, chunk_ids: frozenset[str] | None) -> None:
+        with self._lock:
+            self._warming.discard(key)
+            if chunk_ids is None:
+                return
+            self._entries[key] = (stamp, chunk_ids)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_workspaces:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxWorkspaces": self.max_workspaces,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hitRate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+_retrievable_cache_lock = Lock()
+_retrievable_cache: RetrievableChunkCache | None = None
+
+
+def get_retrievable_chunk_cache() -> RetrievableChunkCache:
+    global _retrievable_cache
+    max_workspaces = int(current_app.config.get("RAG_RETRIEVABLE_CACHE_MAX_WORKSPACES", 64))
+    with _retrievable_cache_lock:
+        if _retrievable_cache is None or _retrievable_cache.max_workspaces != max(max_workspaces, 0):
+            _retrievable_cache = RetrievableChunkCache(max_workspaces=max_workspaces)
+        return _retrievable_cache
+
+
+def reset_retrievable_chunk_cache_for_tests() -> None:
+    global _retrievable_cache
+    with _retrievable_cache_lock:
+        _retrievable_cache = None
@@ -6,6 +6,7 @@ from flask import Blueprint, request, session
 
 from .errors import RAGAuthorizationError, RAGError, RAGValidationError
 from ..logging_utils import bind_log_context, log_audit_event
+from .pipeline.chunking import parse_sentence_offsets
 from .service import (
     build_workspace_debug_snapshot,
     delete_document,
@@ -13,6 +14,7 @@ from .service import (
     get_chunk_embedding_debug,
     get_job_status,
     list_documents,
+    load_hit_segment_texts,
     parse_chunking_request,
     rag_search,
     reindex_document,
@@ -27,11 +29,11 @@ def _json_error(message: str, status_code: int):
     return {"ok": False, "error": message}, status_code
 
 
-def _semantic_segment_payload(metadata: dict) -> dict | None:
+def _semantic_segment_payload(metadata: dict, segment_texts: dict[str, str]) -> dict | None:
     if not isinstance(metadata, dict):
         return None
     segment_id = metadata.get("semantic_segment_id")
-    segment_text = metadata.get("semantic_segment_text")
+    segment_text = metadata.get("semantic_segment_text") or segment_texts.get(str(segment_id))
     if not isinstance(segment_id, str) or not segment_id.strip():
         return None
     if not isinstance(segment_text, str) or not segment_text.strip():
@@ -47,6 +49,7 @@ def _semantic_segment_payload(metadata: dict) -> dict | None:
         "topic": metadata.get("semantic_segment_topic"),
         "summary": metadata.get("semantic_segment_summary"),
         "source": metadata.get("semantic_segment_source"),
+        "sentenceOffsets": parse_sentence_offsets(metadata),
     }
     return payload
 
@@ -382,6 +385,7 @@ def search():
     query = payload.get("query", "")
     top_k = payload.get("topK", 5)
     filters = payload.get("filters", {})
+    mode = payload.get("mode")
     workspace_id = str(payload.get("workspaceId", "default")).strip() or "default"
     bind_log_context(user_id=user_id, workspace_id=workspace_id)
 
@@ -389,6 +393,8 @@ def search():
         return _json_error("topK must be an integer", 400)
     if not isinstance(filters, dict):
         return _json_error("filters must be an object", 400)
+    if mode is not None and not isinstance(mode, str):
+        return _json_error("mode must be a string", 400)
 
     try:
         hits = rag_search(
@@ -397,6 +403,7 @@ def search():
             query=str(query),
             top_k=top_k,
             filters=filters,
+            mode=mode,
         )
     except RAGAuthorizationError as exc:
         return _json_error(str(exc), 403)
@@ -412,6 +419,7 @@ def search():
         logger.exception("RAG search failed")
         return _json_error("rag search failed", 500)
 
+    segment_texts = load_hit_segment_texts(user_id=user_id, workspace_id=workspace_id, hits=hits)
     log_audit_event(
         "rag.search.executed",
         operation_status="succeeded",
@@ -432,7 +440,7 @@ def search():
                     "section": hit.section,
                     "content": hit.content,
                     "metadata": hit.metadata,
-                    "semanticSegment": _semantic_segment_payload(hit.metadata),
+                    "semanticSegment": _semantic_segment_payload(hit.metadata, segment_texts),
                 }
                 for hit in hits
             ]
@@ -65,6 +65,7 @@ class ChunkingRequest:
     max_tokens: int | None
     overlap_tokens: int | None
     min_tokens: int | None
+    embedding_unit: str | None = None
 
 
 @dataclass(slots=True)
@@ -1,23 +1,39 @@
 from __future__ import annotations
 
-import concurrent.futures
 import logging
 import time
+from collections.abc import Iterable
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import asdict
+from functools import partial
+from itertools import chain
 from datetime import datetime
 from pathlib import Path
+from threading import Thread
 from typing import Any
 
 from flask import current_app
-from sqlalchemy import func
+from sqlalchemy import func, select, update
 
 from ..db import session_scope
 from ..logging_utils import bind_log_context, run_with_log_context, snapshot_log_context
 from ..models import RagChunk, RagDocument, RagIndexJob
-from .assets import cleanup_artifact, create_derived_asset, create_original_asset, uploads_root
+from .assets import (
+    cleanup_artifact,
+    create_derived_asset,
+    create_original_asset,
+    lexical_index_key,
+    lexical_root,
+    page_checkpoint_asset,
+    uploads_root,
+)
 from .errors import RAGAuthorizationError, RAGContractError, RAGValidationError
 from .fileloaders import load_source_document
-from .fileloaders.canonical import parse_canonical_text
-from .pipeline.indexer import chunk_document_blocks
+from .fileloaders.canonical import iter_canonical_file
+from .fileloaders.checkpoint import PageCheckpoint
+from .lexical_index import LexicalIndex, fuse_ranked_hits, get_lexical_index
+from .job_queue import IndexJobHeartbeat, claim_index_job, notify_index_workers, owns_index_job
+from .pipeline.indexer import iter_document_chunks, iter_payload_windows
 from .pipeline.chunking import build_chunking_applied, resolve_chunking_plan
 from .providers.registry import (
     get_chunker,
@@ -26,33 +42,33 @@ from .providers.registry import (
     get_semantic_chunking_provider,
     get_vector_store,
 )
+from .query_cache import get_query_embedding_cache
+from .retrievable_cache import RetrievableChunkCache, get_retrievable_chunk_cache, retrievable_stamp
 from .repository import (
+    apply_document_chunk_diff,
+    build_query_log_row,
+    chunk_fingerprint,
     create_chunk_entities,
     create_document,
     create_index_job,
-    create_query_log,
     delete_document_chunks,
     ensure_document_deletable,
     get_document_for_scope,
     get_index_job_for_scope,
+    insert_query_logs,
+    list_document_chunk_fingerprints,
     list_documents_for_scope,
-    replace_document_chunks,
+    load_semantic_segment_texts,
+    prune_semantic_segments,
     set_document_status,
     set_index_job_status,
+    store_semantic_segments,
 )
 from .schemas import ChunkingRequest, RAGAnswerPayload, RetrievalHit
 
 logger = logging.getLogger(__name__)
-_executor: concurrent.futures.ThreadPoolExecutor | None = None
-
 
-def _ensure_executor() -> concurrent.futures.ThreadPoolExecutor:
-    global _executor
-    if _executor is None:
-        _executor = concurrent.futures.ThreadPoolExecutor(
-            max_workers=max(1, int(current_app.config.get("RAG_INDEX_MAX_WORKERS", 2)))
-        )
-    return _executor
+RETRIEVAL_MODES = {"vector", "hybrid", "lexical"}
 
 
 def _allowed_extensions() -> set[str]:
@@ -70,6 +86,13 @@ def _collection_name_for_workspace(workspace_id: str) -> str:
     return f"workspace_{workspace_id}"
 
 
+def _retrieval_mode(mode: str | None) -> str:
+    resolved = str(mode or current_app.config.get("RAG_RETRIEVAL_MODE", "vector")).strip().lower()
+    if resolved not in RETRIEVAL_MODES:
+        raise RAGValidationError(f"retrieval mode is invalid; allowed: {', '.join(sorted(RETRIEVAL_MODES))}")
+    return resolved
+
+
 def parse_chunking_request(chunking: dict | None) -> ChunkingRequest | None:
     if chunking is None:
         return None
@@ -79,6 +102,11 @@ def parse_chunking_request(chunking: dict | None) -> ChunkingRequest | None:
     version = chunking.get("version")
     if version is not None and not isinstance(version, str):
         raise RAGValidationError("chunking.version must be a string")
+    embedding_unit = chunking.get("embeddingUnit")
+    if embedding_unit is None:
+        embedding_unit = chunking.get("embedding_unit")
+    if embedding_unit is not None and not isinstance(embedding_unit, str):
+        raise RAGValidationError("chunking.embeddingUnit must be a string")
     numeric_fields = {
         "targetTokens": "target_tokens",
         "maxTokens": "max_tokens",
@@ -107,6 +135,7 @@ def parse_chunking_request(chunking: dict | None) -> ChunkingRequest | None:
         max_tokens=values["max_tokens"],
         overlap_tokens=values["overlap_tokens"],
         min_tokens=values["min_tokens"],
+        embedding_unit=embedding_unit.strip().lower() if embedding_unit and embedding_unit.strip() else None,
     )
 
 
@@ -119,6 +148,7 @@ def _chunking_plan_from_request(chunking_request: ChunkingRequest | None):
             "max_tokens": chunking_request.max_tokens,
             "overlap_tokens": chunking_request.overlap_tokens,
             "min_tokens": chunking_request.min_tokens,
+            "embedding_unit": chunking_request.embedding_unit,
         }
         payload = {"chunking": chunking_payload}
     else:
@@ -242,20 +272,35 @@ def _filter_retrievable_hits(
             "removedChunkIds": [],
         }
 
-    with session_scope() as db:
-        rows = (
-            db.query(RagChunk.chunk_id)
-            .join(RagDocument, RagDocument.id == RagChunk.document_id)
-            .filter(
-                RagChunk.user_id == user_id,
-                RagChunk.workspace_id == workspace_id,
-                RagChunk.chunk_id.in_(requested_chunk_ids),
-                RagDocument.user_id == user_id,
-                RagDocument.workspace_id == workspace_id,
-                RagDocument.status == "indexed",
+    stamp = retrievable_stamp(workspace_id)
+    cache = get_retrievable_chunk_cache()
+    cache_key = (str(uploads_root()), int(user_id), workspace_id)
+    cached_chunk_ids = cache.get(cache_key, stamp=stamp)
+    if cached_chunk_ids is not None:
+        rows = [(chunk_id,) for chunk_id in requested_chunk_ids if chunk_id in cached_chunk_ids]
+    else:
+        with session_scope() as db:
+            rows = (
+                db.query(RagChunk.chunk_id)
+                .join(RagDocument, RagDocument.id == RagChunk.document_id)
+                .filter(
+                    RagChunk.user_id == user_id,
+                    RagChunk.workspace_id == workspace_id,
+                    RagChunk.chunk_id.in_(requested_chunk_ids),
+                    RagDocument.user_id == user_id,
+                    RagDocument.workspace_id == workspace_id,
+                    RagDocument.status == "indexed",
+                )
+                .all()
+            )
+        if cache.begin_warm(cache_key):
+            _schedule_retrievable_warm(
+                cache,
+                cache_key=cache_key,
+                stamp=stamp,
+                user_id=user_id,
+                workspace_id=workspace_id,
             )
-            .all()
-        )
 
     valid_chunk_ids = {str(chunk_id) for chunk_id, in rows}
     filtered_hits = [hit for hit in hits if str(hit.chunk_id or "").strip() in valid_chunk_ids]
@@ -265,9 +310,71 @@ def _filter_retrievable_hits(
         "keptCount": len(filtered_hits),
         "removedCount": len(removed_chunk_ids),
         "removedChunkIds": removed_chunk_ids[:20],
+        "source": "cache" if cached_chunk_ids is not None else "database",
     }
 
 
+def _load_retrievable_chunk_ids(*, user_id: int, workspace_id: str) -> frozenset[str]:
+    with session_scope() as db:
+        rows = db.execute(
+            select(RagChunk.chunk_id)
+            .join(RagDocument, RagDocument.id == RagChunk.document_id)
+            .where(
+                RagChunk.user_id == user_id,
+                RagChunk.workspace_id == workspace_id,
+                RagDocument.user_id == user_id,
+                RagDocument.workspace_id == workspace_id,
+                RagDocument.status == "indexed",
+            )
+            .execution_options(yield_per=1000)
+        )
+        return frozenset(str(chunk_id) for chunk_id, in rows)
+
+
+def _warm_retrievable_chunks(
+    app,
+    cache: RetrievableChunkCache,
+    *,
+    cache_key: tuple[str, int, str],
+    stamp: str,
+    user_id: int,
+    workspace_id: str,
+) -> None:
+    chunk_ids: frozenset[str] | None = None
+    try:
+        with app.app_context():
+            chunk_ids = _load_retrievable_chunk_ids(user_id=user_id, workspace_id=workspace_id)
+    except Exception:
+        logger.exception(
+            "Failed to warm retrievable chunk cache",
+            extra={"event": "rag.retrievable.warm_failed", "workspace_id": workspace_id},
+        )
+    finally:
+        cache.finish_warm(cache_key, stamp=stamp, chunk_ids=chunk_ids)
+
+
+def _schedule_retrievable_warm(
+    cache: RetrievableChunkCache,
+    *,
+    cache_key: tuple[str, int, str],
+    stamp: str,
+    user_id: int,
+    workspace_id: str,
+) -> None:
+    app = current_app._get_current_object()
+    kwargs = {"cache_key": cache_key, "stamp": stamp, "user_id": user_id, "workspace_id": workspace_id}
+    if bool(app.config.get("TESTING", False)):
+        _warm_retrievable_chunks(app, cache, **kwargs)
+        return
+    Thread(
+        target=run_with_log_context,
+        args=(snapshot_log_context(), _warm_retrievable_chunks, app, cache),
+        kwargs=kwargs,
+        name=f"rag-retrievable-warm-{user_id}",
+        daemon=True,
+    ).start()
+
+
 def _clear_document_index_fields(document: RagDocument) -> None:
     document.embedding_model = None
     document.embedding_version = None
@@ -275,30 +382,169 @@ def _clear_document_index_fields(document: RagDocument) -> None:
     document.indexed_at = None
 
 
-def _delete_document_vectors(*, workspace_id: str, document_id: int) -> None:
+def _delete_document_vectors(*, user_id: int, workspace_id: str, document_id: int) -> None:
     vector_store = get_vector_store()
     vector_store.delete_document_chunks(
         workspace_id=workspace_id,
         collection_name=_collection_name_for_workspace(workspace_id),
         document_id=document_id,
     )
+    get_lexical_index(lexical_root()).remove_document(
+        lexical_index_key(user_id=user_id, workspace_id=workspace_id), document_id
+    )
+
+
+def _ensure_lexical_index(*, user_id: int, workspace_id: str) -> LexicalIndex:
+    index = get_lexical_index(lexical_root())
+    key = lexical_index_key(user_id=user_id, workspace_id=workspace_id)
+    if index.is_built(key):
+        return index
+    started = time.perf_counter()
+    document_count = 0
+    with session_scope() as db:
+        rows = db.execute(
+            select(RagChunk.document_id, RagChunk.chunk_id, RagChunk.content)
+            .join(RagDocument, RagDocument.id == RagChunk.document_id)
+            .where(
+                RagChunk.user_id == user_id,
+                RagChunk.workspace_id == workspace_id,
+                RagDocument.user_id == user_id,
+                RagDocument.status == "indexed",
+            )
+            .order_by(RagChunk.document_id, RagChunk.id)
+            .execution_options(yield_per=500)
+        )
+        writer = None
+        current_document_id = None
+        for document_id, chunk_id, content in rows:
+            if document_id != current_document_id:
+                if writer is not None:
+                    writer.commit()
+                writer = index.document_writer(key, int(document_id))
+                current_document_id = document_id
+                document_count += 1
+            writer.add(chunk_id, content)
+        if writer is not None:
+            writer.commit()
+    index.mark_built(key)
+    logger.info(
+        "RAG lexical index backfilled",
+        extra={
+            "event": "rag.lexical.backfilled",
+            "user_id": user_id,
+            "workspace_id": workspace_id,
+            "document_count": document_count,
+            "latency_ms": int((time.perf_counter() - started) * 1000),
+        },
+    )
+    return index
+
+
+def _lexical_hits(
+    *,
+    user_id: int,
+    workspace_id: str,
+    query: str,
+    limit: int,
+    filters: dict[str, str | int],
+) -> list[RetrievalHit]:
+    if limit <= 0:
+        return []
+    index = _ensure_lexical_index(user_id=user_id, workspace_id=workspace_id)
+    index_key = lexical_index_key(user_id=user_id, workspace_id=workspace_id)
+    hits: list[RetrievalHit] = []
+    examined = 0
+    window = limit
+    # Metadata filters are applied after ranking, so widen the ranked window until
+    # enough chunks survive the filter or the index has no more matches.
+    while True:
+        scored = index.search(index_key, query, limit=window)
+        batch = scored[examined:]
+        examined = len(scored)
+        if batch:
+            hits.extend(
+                _lexical_batch_hits(
+                    user_id=user_id,
+                    workspace_id=workspace_id,
+                    scored=batch,
+                    filters=filters,
+                    limit=limit - len(hits),
+                )
+            )
+        if len(hits) >= limit or len(scored) < window:
+            return hits
+        window *= 4
+
+
+def _lexical_batch_hits(
+    *,
+    user_id: int,
+    workspace_id: str,
+    scored: list[tuple[str, float]],
+    filters: dict[str, str | int],
+    limit: int,
+) -> list[RetrievalHit]:
+    with session_scope() as db:
+        rows = (
+            db.query(RagChunk)
+            .join(RagDocument, RagDocument.id == RagChunk.document_id)
+            .filter(
+                RagChunk.user_id == user_id,
+                RagChunk.workspace_id == workspace_id,
+                RagChunk.chunk_id.in_([chunk_id for chunk_id, _ in scored]),
+                RagDocument.user_id == user_id,
+                RagDocument.workspace_id == workspace_id,
+                RagDocument.status == "indexed",
+            )
+            .all()
+        )
+    chunks = {chunk.chunk_id: chunk for chunk in rows}
+    hits: list[RetrievalHit] = []
+    for chunk_id, score in scored:
+        chunk = chunks.get(chunk_id)
+        if chunk is None:
+            continue
+        metadata = dict(chunk.metadata_json or {})
+        if any(metadata.get(key) != value for key, value in filters.items()):
+            continue
+        hits.append(
+            RetrievalHit(
+                chunk_id=chunk_id,
+                score=float(score),
+                source=chunk.source or "unknown",
+                page=chunk.page,
+                section=chunk.section,
+                content=chunk.content,
+                metadata=metadata,
+            )
+        )
+        if len(hits) >= limit:
+            break
+    return hits
 
 
 def _delete_document_file(document: RagDocument) -> None:
     expected_root = uploads_root()
     cleanup_artifact(document.storage_path, expected_root=expected_root)
     cleanup_artifact(document.derived_text_path, expected_root=expected_root)
+    checkpoint_path = page_checkpoint_asset(
+        user_id=document.user_id,
+        workspace_id=document.workspace_id,
+        document_id=document.id,
+    )
+    cleanup_artifact(str(checkpoint_path), expected_root=expected_root)
 
 
-def _read_canonical_blocks(document: RagDocument) -> list:
+def _read_canonical_blocks(document: RagDocument) -> Iterable:
     derived_path = Path(str(document.derived_text_path or "")).expanduser()
     if not derived_path.exists():
         raise RAGValidationError("canonical text asset is missing")
-    raw = derived_path.read_text(encoding="utf-8")
-    blocks = parse_canonical_text(raw)
-    if not blocks:
-        raise RAGValidationError("canonical text asset is empty")
-    return blocks
+    blocks = iter_canonical_file(derived_path)
+    try:
+        first = next(blocks)
+    except StopIteration:
+        raise RAGValidationError("canonical text asset is empty") from None
+    return chain([first], blocks)
 
 
 def _persist_derived_document(*, user_id: int, workspace_id: str, document_id: int, loaded_document) -> list:
@@ -316,7 +562,23 @@ def _persist_derived_document(*, user_id: int, workspace_id: str, document_id: i
     return loaded_document.blocks
 
 
-def _load_or_build_canonical_blocks(*, user_id: int, workspace_id: str, document_id: int) -> list:
+def _record_page_progress(app, job_id: int, pages_done: int, pages_total: int) -> None:
+    with app.app_context():
+        with session_scope() as db:
+            db.execute(
+                update(RagIndexJob)
+                .where(RagIndexJob.id == job_id)
+                .values(pages_done=max(0, pages_done), pages_total=max(0, pages_total))
+            )
+
+
+def _load_or_build_canonical_blocks(
+    *,
+    user_id: int,
+    workspace_id: str,
+    document_id: int,
+    job_id: int | None = None,
+) -> Iterable:
     with session_scope() as db:
         document = get_document_for_scope(db=db, document_id=document_id, user_id=user_id, workspace_id=workspace_id)
         source_name = document.source_name
@@ -335,19 +597,28 @@ def _load_or_build_canonical_blocks(*, user_id: int, workspace_id: str, document
                     extra={"document_id": document_id, "workspace_id": workspace_id},
                 )
 
+    checkpoint = PageCheckpoint(
+        page_checkpoint_asset(user_id=user_id, workspace_id=workspace_id, document_id=document_id),
+        on_progress=(
+            partial(_record_page_progress, current_app._get_current_object(), job_id) if job_id is not None else None
+        ),
+    )
     loaded_document = load_source_document(
         path=Path(str(storage_path)),
         extension=file_extension,
         source_name=source_name,
+        checkpoint=checkpoint,
     )
     if not loaded_document.blocks:
         raise RAGValidationError("document produced no canonical text blocks")
-    return _persist_derived_document(
+    blocks = _persist_derived_document(
         user_id=user_id,
         workspace_id=workspace_id,
         document_id=document_id,
         loaded_document=loaded_document,
     )
+    checkpoint.discard()
+    return blocks
 
 
 def upload_document(*, user_id: int, workspace_id: str, file_storage, chunking: ChunkingRequest | None = None):
@@ -421,14 +692,18 @@ def enqueue_index_job(
     workspace = _workspace_from_request(workspace_id)
     plan = _chunking_plan_from_request(chunking)
     app = current_app._get_current_object()
-    context_snapshot = snapshot_log_context()
     with session_scope() as db:
         document = get_document_for_scope(db=db, document_id=document_id, user_id=user_id, workspace_id=workspace)
         if document.status == "indexing":
             raise RAGValidationError("document is already indexing")
         set_document_status(document=document, status="indexing")
         document.chunk_strategy = plan.request.strategy
-        job = create_index_job(db=db, document=document, requested_chunk_strategy=plan.request.strategy)
+        job = create_index_job(
+            db=db,
+            document=document,
+            requested_chunk_strategy=plan.request.strategy,
+            chunking=asdict(chunking) if chunking is not None else None,
+        )
         job_payload = {
             "jobId": job.id,
             "documentId": document.id,
@@ -453,26 +728,45 @@ def enqueue_index_job(
     )
     if bool(app.config.get("TESTING", False)):
         run_with_log_context(
-            context_snapshot,
-            _run_index_job,
+            snapshot_log_context(),
+            process_next_index_job,
             app,
-            job_payload["jobId"],
-            user_id,
-            workspace,
-            chunking,
+            worker_id=f"inline:{job_payload['jobId']}",
+            job_id=job_payload["jobId"],
         )
     else:
-        _ensure_executor().submit(
-            run_with_log_context,
-            context_snapshot,
-            _run_index_job,
+        notify_index_workers()
+    return job_payload
+
+
+def process_next_index_job(app, *, worker_id: str, job_id: int | None = None) -> bool:
+    lease_seconds = float(app.config.get("RAG_INDEX_LEASE_SECONDS", 120))
+    with app.app_context():
+        claimed = claim_index_job(
+            worker_id=worker_id,
+            lease_seconds=lease_seconds,
+            max_attempts=int(app.config.get("RAG_INDEX_MAX_ATTEMPTS", 3)),
+            job_id=job_id,
+        )
+    if claimed is None:
+        return False
+    heartbeat = IndexJobHeartbeat(
+        app,
+        job_id=claimed.job_id,
+        worker_id=worker_id,
+        lease_seconds=lease_seconds,
+        interval_seconds=float(app.config.get("RAG_INDEX_HEARTBEAT_SECONDS", 30)),
+    )
+    with heartbeat:
+        _run_index_job(
             app,
-            job_payload["jobId"],
-            user_id,
-            workspace,
-            chunking,
+            claimed.job_id,
+            claimed.user_id,
+            claimed.workspace_id,
+            parse_chunking_request(claimed.chunking) if claimed.chunking else None,
+            worker_id=worker_id,
         )
-    return job_payload
+    return True
 
 
 def reindex_document(
@@ -505,7 +799,7 @@ def delete_document(*, user_id: int, workspace_id: str, document_id: int) -> dic
         _clear_document_index_fields(document)
         set_document_status(document=document, status="deleted")
 
-    _delete_document_vectors(workspace_id=workspace, document_id=document_id)
+    _delete_document_vectors(user_id=user_id, workspace_id=workspace, document_id=document_id)
 
     with session_scope() as db:
         document = get_document_for_scope(
@@ -526,11 +820,14 @@ def _run_index_job(
     user_id: int,
     workspace_id: str,
     chunking: ChunkingRequest | None = None,
+    *,
+    worker_id: str | None = None,
 ) -> None:
     started = datetime.utcnow()
     chunk_count = 0
-    chunking_applied = None
+    chunks_added = 0
     document_id: int | None = None
+    lexical_writer = None
     try:
         with app.app_context():
             with session_scope() as db:
@@ -551,6 +848,7 @@ def _run_index_job(
                 )
                 set_index_job_status(job=job, status="running")
                 set_document_status(document=document, status="indexing")
+                existing_chunks = list_document_chunk_fingerprints(db=db, document_id=document_id)
                 logger.info(
                     "RAG indexing job started",
                     extra={
@@ -564,85 +862,138 @@ def _run_index_job(
                 user_id=user_id,
                 workspace_id=workspace_id,
                 document_id=document_id,
+                job_id=job_id,
             )
-            chunker = get_chunker()
-            semantic_provider = get_semantic_chunking_provider()
             embedder = get_embedder()
             vector_store = get_vector_store()
             collection_name = _collection_name_for_workspace(workspace_id)
-            chunk_payloads, chunking_applied = chunk_document_blocks(
+            payload_stream, chunking_applied = iter_document_chunks(
                 blocks=canonical_blocks,
                 document_id=document_id,
                 source_name=source_name,
-                chunker=chunker,
-                semantic_provider=semantic_provider,
+                chunker=get_chunker(),
+                semantic_provider=get_semantic_chunking_provider(),
                 chunking_request=chunking,
                 chunk_size=int(current_app.config["RAG_CHUNK_SIZE"]),
                 overlap=int(current_app.config["RAG_CHUNK_OVERLAP"]),
             )
-            for payload in chunk_payloads:
-                payload.metadata["user_id"] = user_id
-                payload.metadata["workspace_id"] = workspace_id
-                payload.metadata["document_id"] = document_id
-                if chunking_applied is not None:
-                    payload.metadata["chunk_provider"] = chunking_applied.provider
-                    payload.metadata["chunk_model"] = chunking_applied.model
-            vectors = embedder.embed_documents([item.text for item in chunk_payloads])
-            for vector in vectors:
-                if len(vector) != embedder.dimension:
-                    raise RAGValidationError("embedding dimension mismatch during indexing")
-
-            vector_store.delete_document_chunks(
-                workspace_id=workspace_id,
-                collection_name=collection_name,
-                document_id=document_id,
+            embedding_fields = {
+                "embedding_model": embedder.model_name,
+                "embedding_version": embedder.model_version,
+                "embedding_dimension": embedder.dimension,
+            }
+            window_max_chunks = max(1, int(current_app.config.get("RAG_INDEX_WINDOW_MAX_CHUNKS", 256)))
+            window_max_bytes = max(1, int(current_app.config.get("RAG_INDEX_MEMORY_BUDGET_MB", 64))) * 1024 * 1024 // 2
+            seen_chunk_ids: set[str] = set()
+            seen_segment_ids: set[str] = set()
+            lexical_writer = get_lexical_index(lexical_root()).document_writer(
+                lexical_index_key(user_id=user_id, workspace_id=workspace_id), document_id
             )
-            vector_store.upsert_chunks(
+            log_context = snapshot_log_context()
+            pending_write: Future | None = None
+            with ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"rag-index-writer-{job_id}") as writer:
+                for window in iter_payload_windows(
+                    payload_stream,
+                    max_chunks=window_max_chunks,
+                    max_bytes=window_max_bytes,
+                    vector_dimension=embedder.dimension,
+                ):
+                    changed_payloads = []
+                    changed_segments: dict[str, str] = {}
+                    for payload in window:
+                        segment_id = payload.metadata.get("semantic_segment_id")
+                        segment_text = payload.metadata.pop("semantic_segment_text", None)
+                        if payload.metadata.get("embedding_unit") == "segment":
+                            # The chunk content already is the segment text; resolve it from the hit instead.
+                            segment_id = None
+                        if segment_id:
+                            seen_segment_ids.add(str(segment_id))
+                        payload.metadata["user_id"] = user_id
+                        payload.metadata["workspace_id"] = workspace_id
+                        payload.metadata["document_id"] = document_id
+                        payload.metadata["chunk_provider"] = chunking_applied.provider
+                        payload.metadata["chunk_model"] = chunking_applied.model
+                        seen_chunk_ids.add(payload.chunk_id)
+                        lexical_writer.add(payload.chunk_id, payload.text)
+                        fingerprint = chunk_fingerprint(metadata=payload.metadata, **embedding_fields)
+                        if existing_chunks.get(payload.chunk_id) != fingerprint:
+                            changed_payloads.append(payload)
+                            if segment_id and segment_text:
+                                changed_segments[str(segment_id)] = str(segment_text)
+                    chunk_count += len(window)
+                    if not changed_payloads:
+                        continue
+                    vectors = embedder.embed_documents([item.text for item in changed_payloads])
+                    for vector in vectors:
+                        if len(vector) != embedder.dimension:
+                            raise RAGValidationError("embedding dimension mismatch during indexing")
+                    if pending_write is not None:
+                        pending_write.result()
+                    pending_write = writer.submit(
+                        run_with_log_context,
+                        log_context,
+                        _write_index_window,
+                        app,
+                        job_id=job_id,
+                        user_id=user_id,
+                        workspace_id=workspace_id,
+                        worker_id=worker_id,
+                        document=document,
+                        chunk_payloads=changed_payloads,
+                        segments=changed_segments,
+                        vectors=vectors,
+                        **embedding_fields,
+                    )
+                    chunks_added += len(changed_payloads)
+                if pending_write is not None:
+                    pending_write.result()
+
+            removed_chunk_ids = [chunk_id for chunk_id in existing_chunks if chunk_id not in seen_chunk_ids]
+            chunks_unchanged = chunk_count - chunks_added
+            vector_store.delete_chunks(
                 workspace_id=workspace_id,
                 collection_name=collection_name,
-                chunk_payloads=chunk_payloads,
-                vectors=vectors,
-            )
-            chunk_entities = create_chunk_entities(
-                document=document,
-                chunk_payloads=chunk_payloads,
-                embedding_model=embedder.model_name,
-                embedding_version=embedder.model_version,
-                embedding_dimension=embedder.dimension,
+                chunk_ids=removed_chunk_ids,
             )
-            chunk_count = len(chunk_entities)
 
             with session_scope() as db:
                 job = get_index_job_for_scope(db=db, job_id=job_id, user_id=user_id, workspace_id=workspace_id)
+                db.refresh(job, with_for_update=True)
+                if not owns_index_job(job, worker_id):
+                    _log_lost_index_lease(job_id=job_id, worker_id=worker_id)
+                    return
                 document = get_document_for_scope(
                     db=db,
                     document_id=job.document_id,
                     user_id=user_id,
                     workspace_id=workspace_id,
                 )
-                replace_document_chunks(db=db, document=document, chunks=chunk_entities)
+                apply_document_chunk_diff(db=db, document=document, chunks=[], removed_chunk_ids=removed_chunk_ids)
+                prune_semantic_segments(db=db, document=document, keep_segment_ids=seen_segment_ids)
                 document.embedding_model = embedder.model_name
                 document.embedding_version = embedder.model_version
                 document.embedding_dimension = embedder.dimension
-                if chunking_applied is not None:
-                    document.chunk_strategy = chunking_applied.strategy
-                    document.chunk_provider = chunking_applied.provider
-                    document.chunk_model = chunking_applied.model
-                    document.chunk_version = chunking_applied.version
-                    document.chunk_fallback_used = 1 if chunking_applied.fallback_used else 0
-                    document.chunk_fallback_reason = chunking_applied.fallback_reason
+                document.chunk_strategy = chunking_applied.strategy
+                document.chunk_provider = chunking_applied.provider
+                document.chunk_model = chunking_applied.model
+                document.chunk_version = chunking_applied.version
+                document.chunk_fallback_used = 1 if chunking_applied.fallback_used else 0
+                document.chunk_fallback_reason = chunking_applied.fallback_reason
                 set_document_status(document=document, status="indexed", indexed_at=datetime.utcnow())
                 set_index_job_status(
                     job=job,
                     status="done",
                     chunks_count=chunk_count,
-                    applied_chunk_strategy=(chunking_applied.strategy if chunking_applied else None),
-                    chunk_provider=(chunking_applied.provider if chunking_applied else None),
-                    chunk_model=(chunking_applied.model if chunking_applied else None),
-                    chunk_version=(chunking_applied.version if chunking_applied else None),
-                    chunk_fallback_used=(chunking_applied.fallback_used if chunking_applied else False),
-                    chunk_fallback_reason=(chunking_applied.fallback_reason if chunking_applied else None),
-                    )
+                    applied_chunk_strategy=chunking_applied.strategy,
+                    chunk_provider=chunking_applied.provider,
+                    chunk_model=chunking_applied.model,
+                    chunk_version=chunking_applied.version,
+                    chunk_fallback_used=chunking_applied.fallback_used,
+                    chunk_fallback_reason=chunking_applied.fallback_reason,
+                    chunks_added=chunks_added,
+                    chunks_unchanged=chunks_unchanged,
+                    chunks_removed=len(removed_chunk_ids),
+                )
                 logger.info(
                     "RAG indexing job persisted indexed state",
                     extra={
@@ -650,14 +1001,26 @@ def _run_index_job(
                         "job_id": job_id,
                         "document_id": document_id,
                         "chunk_count": chunk_count,
+                        "chunks_added": chunks_added,
+                        "chunks_unchanged": chunks_unchanged,
+                        "chunks_removed": len(removed_chunk_ids),
                     },
                 )
+            lexical_writer.commit()
+    except _IndexLeaseLost:
+        _log_lost_index_lease(job_id=job_id, worker_id=worker_id)
     except Exception as exc:
         logger.exception("RAG indexing job failed", extra={"event": "rag.index.failed", "job_id": job_id})
         with app.app_context():
+            if worker_id is not None:
+                with session_scope() as db:
+                    job = db.get(RagIndexJob, job_id)
+                    if job is None or not owns_index_job(job, worker_id):
+                        _log_lost_index_lease(job_id=job_id, worker_id=worker_id)
+                        return
             if document_id is not None:
                 try:
-                    _delete_document_vectors(workspace_id=workspace_id, document_id=document_id)
+                    _delete_document_vectors(user_id=user_id, workspace_id=workspace_id, document_id=document_id)
                 except Exception:
                     logger.exception(
                         "Failed to clear document vectors after indexing failure",
@@ -688,6 +1051,8 @@ def _run_index_job(
                         extra={"event": "rag.index.failure_persist_failed", "job_id": job_id},
                     )
     finally:
+        if lexical_writer is not None:
+            lexical_writer.abort()
         elapsed = int((datetime.utcnow() - started).total_seconds() * 1000)
         logger.info(
             "RAG indexing job finished",
@@ -695,6 +1060,55 @@ def _run_index_job(
         )
 
 
+class _IndexLeaseLost(Exception):
+    pass
+
+
+def _write_index_window(
+    app,
+    *,
+    job_id: int,
+    user_id: int,
+    workspace_id: str,
+    worker_id: str | None,
+    document: RagDocument,
+    chunk_payloads: list,
+    segments: dict[str, str],
+    vectors: list[list[float]],
+    embedding_model: str,
+    embedding_version: str,
+    embedding_dimension: int,
+) -> None:
+    with app.app_context():
+        get_vector_store().upsert_chunks(
+            workspace_id=workspace_id,
+            collection_name=_collection_name_for_workspace(workspace_id),
+            chunk_payloads=chunk_payloads,
+            vectors=vectors,
+        )
+        chunk_entities = create_chunk_entities(
+            document=document,
+            chunk_payloads=chunk_payloads,
+            embedding_model=embedding_model,
+            embedding_version=embedding_version,
+            embedding_dimension=embedding_dimension,
+        )
+        with session_scope() as db:
+            job = get_index_job_for_scope(db=db, job_id=job_id, user_id=user_id, workspace_id=workspace_id)
+            db.refresh(job, with_for_update=True)
+            if not owns_index_job(job, worker_id):
+                raise _IndexLeaseLost(job_id)
+            apply_document_chunk_diff(db=db, document=document, chunks=chunk_entities, removed_chunk_ids=[])
+            store_semantic_segments(db=db, document=document, segments=segments)
+
+
+def _log_lost_index_lease(*, job_id: int, worker_id: str | None) -> None:
+    logger.warning(
+        "RAG indexing job lease is held by another worker; discarding result",
+        extra={"event": "rag.index.lease_lost", "job_id": job_id, "worker_id": worker_id},
+    )
+
+
 def get_job_status(*, user_id: int, workspace_id: str, job_id: int) -> dict:
     workspace = _workspace_from_request(workspace_id)
     with session_scope() as db:
@@ -707,6 +1121,11 @@ def get_job_status(*, user_id: int, workspace_id: str, job_id: int) -> dict:
             "errorStage": job.error_stage,
             "errorMessage": job.error_message,
             "chunksCount": job.chunks_count,
+            "chunksAdded": job.chunks_added,
+            "chunksUnchanged": job.chunks_unchanged,
+            "chunksRemoved": job.chunks_removed,
+            "pagesTotal": job.pages_total,
+            "pagesDone": job.pages_done,
             "startedAt": job.started_at.isoformat() if job.started_at else None,
             "finishedAt": job.finished_at.isoformat() if job.finished_at else None,
             "durationMs": job.duration_ms,
@@ -730,6 +1149,7 @@ def rag_search(
     top_k: int,
     filters: dict[str, str | int] | None = None,
     include_debug: bool = False,
+    mode: str | None = None,
 ) -> list[RetrievalHit] | tuple[list[RetrievalHit], dict[str, Any]]:
     workspace = _workspace_from_request(workspace_id)
     text = str(query).strip()
@@ -737,6 +1157,7 @@ def rag_search(
         raise RAGValidationError("query is required")
     if top_k <= 0:
         raise RAGValidationError("top_k must be positive")
+    retrieval_mode = _retrieval_mode(mode)
 
     scoped_filters = dict(filters or {})
     if "user_id" in scoped_filters and scoped_filters["user_id"] != user_id:
@@ -746,9 +1167,18 @@ def rag_search(
     scoped_filters["user_id"] = user_id
     scoped_filters["workspace_id"] = workspace
 
-    embedder = get_embedder()
-    vector_store = get_vector_store()
+    use_vector = retrieval_mode != "lexical"
+    use_lexical = retrieval_mode != "vector"
+    embedder = get_embedder() if use_vector else None
+    vector_store = get_vector_store() if use_vector else None
     reranker = get_reranker()
+    query_cache = get_query_embedding_cache()
+    query_cache_hit = False
+    vector_provider = vector_store.provider_name if vector_store is not None else "lexical"
+    embedder_provider = embedder.provider_name if embedder is not None else "none"
+    embedding_model = embedder.model_name if embedder is not None else ""
+    embedding_version = embedder.model_version if embedder is not None else ""
+    embedding_dimension = embedder.dimension if embedder is not None else 0
 
     start = time.perf_counter()
     failure_reason: str | None = None
@@ -757,6 +1187,8 @@ def rag_search(
     raw_hits: list[RetrievalHit] = []
     threshold_hits: list[RetrievalHit] = []
     consistency_hits: list[RetrievalHit] = []
+    lexical_hits: list[RetrievalHit] = []
+    candidate_hits: list[RetrievalHit] = []
     query_vector: list[float] = []
     threshold = float(current_app.config.get("RAG_RETRIEVAL_SCORE_THRESHOLD", 0.0))
     candidate_top_k = max(top_k, min(top_k * 5, 50))
@@ -767,23 +1199,38 @@ def rag_search(
         "removedChunkIds": [],
     }
     try:
-        query_vector = embedder.embed_query(text)
-        if len(query_vector) != embedder.dimension:
-            raise RAGValidationError("query embedding dimension mismatch")
-        raw_hits = vector_store.query(
-            workspace_id=workspace,
-            collection_name=_collection_name_for_workspace(workspace),
-            query_vector=query_vector,
-            top_k=candidate_top_k,
-            filters=scoped_filters,
-        )
-        threshold_hits = [hit for hit in raw_hits if hit.score >= threshold]
-        consistency_hits, consistency_debug = _filter_retrievable_hits(
-            user_id=user_id,
-            workspace_id=workspace,
-            hits=threshold_hits,
-        )
-        hits = consistency_hits
+        if use_vector:
+            query_vector, query_cache_hit = query_cache.embed_query(embedder, text)
+            if len(query_vector) != embedder.dimension:
+                raise RAGValidationError("query embedding dimension mismatch")
+            raw_hits = vector_store.query(
+                workspace_id=workspace,
+                collection_name=_collection_name_for_workspace(workspace),
+                query_vector=query_vector,
+                top_k=candidate_top_k,
+                filters=scoped_filters,
+            )
+            threshold_hits = [hit for hit in raw_hits if hit.score >= threshold]
+            consistency_hits, consistency_debug = _filter_retrievable_hits(
+                user_id=user_id,
+                workspace_id=workspace,
+                hits=threshold_hits,
+            )
+        if use_lexical:
+            lexical_hits = _lexical_hits(
+                user_id=user_id,
+                workspace_id=workspace,
+                query=text,
+                limit=candidate_top_k,
+                filters=scoped_filters,
+            )
+        if retrieval_mode == "hybrid":
+            candidate_hits = fuse_ranked_hits([consistency_hits, lexical_hits])
+        elif retrieval_mode == "lexical":
+            candidate_hits = lexical_hits
+        else:
+            candidate_hits = consistency_hits
+        hits = candidate_hits
         if reranker:
             hits = reranker.rerank(query=text, hits=hits, top_k=top_k)
         else:
@@ -804,9 +1251,8 @@ def rag_search(
                 chunk_provider = str(first_meta.get("chunk_provider"))
             if isinstance(first_meta.get("chunk_model"), str):
                 chunk_model = str(first_meta.get("chunk_model"))
-        with session_scope() as db:
-            create_query_log(
-                db=db,
+        _record_query_log(
+            build_query_log_row(
                 user_id=user_id,
                 workspace_id=workspace,
                 query_text=text,
@@ -815,16 +1261,17 @@ def rag_search(
                 latency_ms=latency_ms,
                 top_scores=[round(hit.score, 6) for hit in hits[:3]],
                 filters=scoped_filters,
-                vector_provider=vector_store.provider_name,
-                embedder_provider=embedder.provider_name,
-                embedding_model=embedder.model_name,
-                embedding_version=embedder.model_version,
-                embedding_dimension=embedder.dimension,
+                vector_provider=vector_provider,
+                embedder_provider=embedder_provider,
+                embedding_model=embedding_model,
+                embedding_version=embedding_version,
+                embedding_dimension=embedding_dimension,
                 chunk_strategy=chunk_strategy,
                 chunk_provider=chunk_provider,
                 chunk_model=chunk_model,
                 failure_reason=failure_reason,
             )
+        )
         logger.info(
             "RAG search executed",
             extra={
@@ -834,14 +1281,16 @@ def rag_search(
                 "latency_ms": latency_ms,
                 "hit_count": len(hits),
                 "top_k": top_k,
-                "vector_provider": vector_store.provider_name,
-                "embedder_provider": embedder.provider_name,
-                "embedding_model": embedder.model_name,
-                "embedding_version": embedder.model_version,
-                "embedding_dimension": embedder.dimension,
+                "retrieval_mode": retrieval_mode,
+                "vector_provider": vector_provider,
+                "embedder_provider": embedder_provider,
+                "embedding_model": embedding_model,
+                "embedding_version": embedding_version,
+                "embedding_dimension": embedding_dimension,
                 "chunk_strategy": chunk_strategy,
                 "chunk_provider": chunk_provider,
                 "chunk_model": chunk_model,
+                "query_cache_hit": query_cache_hit,
                 "failure_reason": failure_reason,
             },
         )
@@ -853,14 +1302,16 @@ def rag_search(
             "candidateTopK": candidate_top_k,
             "latencyMs": latency_ms,
             "filters": scoped_filters,
+            "mode": retrieval_mode,
             "vector": {
-                "vectorProvider": vector_store.provider_name,
-                "embedderProvider": embedder.provider_name,
-                "embeddingModel": embedder.model_name,
-                "embeddingVersion": embedder.model_version,
-                "embeddingDimension": embedder.dimension,
+                "vectorProvider": vector_provider,
+                "embedderProvider": embedder_provider,
+                "embeddingModel": embedding_model,
+                "embeddingVersion": embedding_version,
+                "embeddingDimension": embedding_dimension,
                 "queryVectorNorm": round(vector_norm, 6),
                 "queryVectorSample": [round(float(item), 6) for item in query_vector[:16]],
+                "queryCache": {"hit": query_cache_hit, **query_cache.stats()},
             },
             "retrieval": {
                 "threshold": threshold,
@@ -872,11 +1323,17 @@ def rag_search(
                 "afterConsistencyHits": [_hit_debug_payload(hit) for hit in consistency_hits],
                 "consistencyFilter": consistency_debug,
             },
+            "lexical": {
+                "enabled": use_lexical,
+                "count": len(lexical_hits),
+                "hits": [_hit_debug_payload(hit) for hit in lexical_hits],
+                "fusedHits": [_hit_debug_payload(hit) for hit in candidate_hits] if retrieval_mode == "hybrid" else [],
+            },
             "rerank": {
                 "enabled": bool(reranker),
                 "provider": str(getattr(reranker, "provider_name", "")) if reranker else "",
                 "model": str(getattr(reranker, "model_name", "")) if reranker else "",
-                "before": [_hit_debug_payload(hit) for hit in consistency_hits],
+                "before": [_hit_debug_payload(hit) for hit in candidate_hits],
                 "after": [_hit_debug_payload(hit) for hit in hits],
             },
         }
@@ -884,6 +1341,43 @@ def rag_search(
     return hits
 
 
+def load_hit_segment_texts(*, user_id: int, workspace_id: str, hits: list[RetrievalHit]) -> dict[str, str]:
+    segment_texts: dict[str, str] = {}
+    stored_segment_ids: set[str] = set()
+    for hit in hits:
+        metadata = hit.metadata if isinstance(hit.metadata, dict) else {}
+        segment_id = metadata.get("semantic_segment_id")
+        if not segment_id or metadata.get("semantic_segment_text"):
+            continue
+        if metadata.get("embedding_unit") == "segment":
+            segment_texts[str(segment_id)] = hit.content
+        else:
+            stored_segment_ids.add(str(segment_id))
+    stored_segment_ids.difference_update(segment_texts)
+    if not stored_segment_ids:
+        return segment_texts
+    workspace = _workspace_from_request(workspace_id)
+    with session_scope() as db:
+        segment_texts.update(
+            load_semantic_segment_texts(
+                db=db,
+                user_id=user_id,
+                workspace_id=workspace,
+                segment_ids=sorted(stored_segment_ids),
+            )
+        )
+    return segment_texts
+
+
+def _record_query_log(row: dict) -> None:
+    writer = current_app.extensions.get("rag_query_log_writer")
+    if writer is not None:
+        writer.submit(row)
+        return
+    with session_scope() as db:
+        insert_query_logs(db=db, rows=[row])
+
+
 def build_cited_response(*, base_reply: str, hits: list[RetrievalHit], knowledge_required: bool) -> RAGAnswerPayload:
     if not hits:
         if knowledge_required:
@@ -970,6 +1464,11 @@ def build_workspace_debug_snapshot(*, user_id: int, workspace_id: str, limit: in
                 "documentId": job.document_id,
                 "status": job.status,
                 "chunksCount": job.chunks_count,
+                "chunksAdded": job.chunks_added,
+                "chunksUnchanged": job.chunks_unchanged,
+                "chunksRemoved": job.chunks_removed,
+                "pagesTotal": job.pages_total,
+                "pagesDone": job.pages_done,
                 "errorStage": job.error_stage,
                 "errorMessage": job.error_message,
                 "startedAt": job.started_at.isoformat() if job.started_at else None,
@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import argparse
+import logging
+import multiprocessing
+from threading import Event, Lock, Thread
+
+from flask import Flask
+
+from .job_queue import new_worker_id, wait_for_index_work
+from .service import process_next_index_job
+
+logger = logging.getLogger(__name__)
+
+_embedded_lock = Lock()
+
+
+def run_index_worker(app: Flask, *, worker_id: str, stop_event: Event, max_jobs: int | None = None) -> int:
+    poll_interval = max(0.05, float(app.config.get("RAG_INDEX_POLL_INTERVAL_SECONDS", 2)))
+    processed = 0
+    logger.info("RAG index worker started", extra={"event": "rag.worker.started", "worker_id": worker_id})
+    while not stop_event.is_set() and (max_jobs is None or processed < max_jobs):
+        try:
+            handled = process_next_index_job(app, worker_id=worker_id)
+        except Exception:
+            logger.exception("RAG index worker iteration failed", extra={"event": "rag.worker.failed", "worker_id": worker_id})
+            handled = False
+        if handled:
+            processed += 1
+            continue
+        wait_for_index_work(poll_interval)
+    logger.info(
+        "RAG index worker stopped",
+        extra={"event": "rag.worker.stopped", "worker_id": worker_id, "processed": processed},
+    )
+    return processed
+
+
+def start_embedded_index_workers(app: Flask) -> None:
+    with _embedded_lock:
+        if "rag_index_workers" in app.extensions:
+            return
+        stop_event = Event()
+        threads = []
+        for _ in range(max(1, int(app.config.get("RAG_INDEX_MAX_WORKERS", 2)))):
+            thread = Thread(
+                target=run_index_worker,
+                args=(app,),
+                kwargs={"worker_id": new_worker_id("rag-index-embedded"), "stop_event": stop_event},
+                name="rag-index-worker",
+                daemon=True,
+            )
+            thread.start()
+            threads.append(thread)
+        app.extensions["rag_index_workers"] = {"stop_event": stop_event, "threads": threads}
+
+
+def _worker_process_main() -> None:
+    from .. import create_app
+
+    app = create_app({"RAG_INDEX_QUEUE_MODE": "external"})
+    run_index_worker(app, worker_id=new_worker_id(), stop_event=Event())
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Run durable RAG index workers.")
+    parser.add_argument("--processes", type=int, default=1, help="number of worker processes to start")
+    args = parser.parse_args(argv)
+    count = max(1, int(args.processes))
+    if count == 1:
+        _worker_process_main()
+        return
+    context = multiprocessing.get_context("spawn")
+    processes = [context.Process(target=_worker_process_main, name=f"rag-index-worker-{index}") for index in range(count)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+
+if __name__ == "__main__":
+    main()
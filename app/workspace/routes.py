@@ -2,6 +2,10 @@ from __future__ import annotations
 
 import json
 import logging
+import queue
+from contextvars import copy_context
+from threading import Thread
+from typing import Any, Callable, Iterator
 
 from flask import Blueprint, Response, current_app, request, session, stream_with_context
 from sqlalchemy import select
@@ -158,6 +162,28 @@ def _reply_chunks(reply: str, *, chunk_size: int = 48) -> list[str]:
     return [text[index : index + chunk_size] for index in range(0, len(text), chunk_size)]
 
 
+def _iter_streamed_reply(
+    work: Callable[[Callable[[str], None]], dict[str, Any]],
+) -> Iterator[tuple[str, Any]]:
+    events: queue.Queue[tuple[str, Any]] = queue.Queue()
+
+    def _worker() -> None:
+        try:
+            result = work(lambda text: events.put(("delta", text)))
+        except BaseException as exc:
+            events.put(("error", exc))
+        else:
+            events.put(("result", result))
+
+    context = copy_context()
+    Thread(target=context.run, args=(_worker,), name="workspace-chat-stream", daemon=True).start()
+    while True:
+        kind, value = events.get()
+        yield kind, value
+        if kind != "delta":
+            return
+
+
 @workspace_bp.get("/context")
 def get_workspace_context():
     user_id = _current_user_id()
@@ -378,39 +404,41 @@ def workspace_chat():
             role=role,
             conversation_id=conversation_id,
         )
-        try:
-            result = generate_reply_payload(
-                role=role,
-                system_prompt=preset["systemPrompt"],
-                user_message=message,
-                user_id=user_id,
-                workspace_id=workspace_id,
-                conversation_history=conversation_history,
-                conversation_context=conversation_context,
-                rag_debug_enabled=debug_enabled,
-                entity=entity,
-                intent=intent,
-                agent_trace_enabled=trace_enabled,
-                agent_trace_debug_details_enabled=trace_details_enabled,
-            )
-        except AgentServiceError:
-            log_audit_event(
-                "workspace.chat.failed",
-                operation_status="failed",
-                resource_type="workspace",
-                resource_id=workspace_id,
-                role=role,
-            )
-            logger.exception("Agent runtime failed for workspace chat")
-            return _json_error("agent service unavailable", 502)
 
+    try:
+        result = generate_reply_payload(
+            role=role,
+            system_prompt=preset["systemPrompt"],
+            user_message=message,
+            user_id=user_id,
+            workspace_id=workspace_id,
+            conversation_history=conversation_history,
+            conversation_context=conversation_context,
+            rag_debug_enabled=debug_enabled,
+            entity=entity,
+            intent=intent,
+            agent_trace_enabled=trace_enabled,
+            agent_trace_debug_details_enabled=trace_details_enabled,
+        )
+    except AgentServiceError:
         log_audit_event(
-            "workspace.chat.completed",
-            operation_status="succeeded",
+            "workspace.chat.failed",
+            operation_status="failed",
             resource_type="workspace",
             resource_id=workspace_id,
             role=role,
         )
+        logger.exception("Agent runtime failed for workspace chat")
+        return _json_error("agent service unavailable", 502)
+
+    log_audit_event(
+        "workspace.chat.completed",
+        operation_status="succeeded",
+        resource_type="workspace",
+        resource_id=workspace_id,
+        role=role,
+    )
+    with session_scope() as db:
         save_conversation_turn(
             db,
             thread=thread,
@@ -420,16 +448,16 @@ def workspace_chat():
             conversation_context=conversation_context,
         )
 
-        return {
-            "ok": True,
-            "data": _chat_response_data(
-                result=result,
-                role=role,
-                system_prompt=preset["systemPrompt"],
-                trace_enabled=trace_enabled,
-                debug_enabled=debug_enabled,
-            ),
-        }
+    return {
+        "ok": True,
+        "data": _chat_response_data(
+            result=result,
+            role=role,
+            system_prompt=preset["systemPrompt"],
+            trace_enabled=trace_enabled,
+            debug_enabled=debug_enabled,
+        ),
+    }
 
 
 @workspace_bp.post("/chat/stream")
@@ -490,7 +518,8 @@ def workspace_chat_stream():
             role=role,
         )
         yield _stream_event({"type": "started", "role": role})
-        try:
+
+        def _run_turn(on_token: Callable[[str], None]) -> dict[str, Any]:
             with session_scope() as db:
                 thread, conversation_history, conversation_context = load_conversation_history(
                     db,
@@ -499,39 +528,56 @@ def workspace_chat_stream():
                     role=role,
                     conversation_id=conversation_id,
                 )
-                result = generate_reply_payload(
-                    role=role,
-                    system_prompt=preset["systemPrompt"],
-                    user_message=message,
-                    user_id=user_id,
-                    workspace_id=workspace_id,
-                    conversation_history=conversation_history,
-                    conversation_context=conversation_context,
-                    rag_debug_enabled=debug_enabled,
-                    entity=entity,
-                    intent=intent,
-                    agent_trace_enabled=trace_enabled,
-                    agent_trace_debug_details_enabled=trace_details_enabled,
-                )
+            turn_result = generate_reply_payload(
+                role=role,
+                system_prompt=preset["systemPrompt"],
+                user_message=message,
+                user_id=user_id,
+                workspace_id=workspace_id,
+                conversation_history=conversation_history,
+                conversation_context=conversation_context,
+                rag_debug_enabled=debug_enabled,
+                entity=entity,
+                intent=intent,
+                agent_trace_enabled=trace_enabled,
+                agent_trace_debug_details_enabled=trace_details_enabled,
+                on_token=on_token,
+            )
+            with session_scope() as db:
                 save_conversation_turn(
                     db,
                     thread=thread,
                     user_message=message,
-                    assistant_result=result,
-                    intent=str(result.get("intent", intent)).strip(),
+                    assistant_result=turn_result,
+                    intent=str(turn_result.get("intent", intent)).strip(),
                     conversation_context=conversation_context,
                 )
-        except AgentServiceError:
-            log_audit_event(
-                "workspace.chat.failed",
-                operation_status="failed",
-                resource_type="workspace",
-                resource_id=workspace_id,
-                role=role,
-            )
-            logger.exception("Agent runtime failed for workspace chat stream")
-            yield _stream_event({"type": "error", "error": "agent service unavailable"})
-            return
+                return turn_result
+
+        result: dict[str, Any] = {}
+        streamed = False
+        for kind, value in _iter_streamed_reply(_run_turn):
+            if kind == "delta":
+                streamed = True
+                yield _stream_event({"type": "delta", "text": value})
+            elif kind == "error":
+                if not isinstance(value, AgentServiceError):
+                    raise value
+                log_audit_event(
+                    "workspace.chat.failed",
+                    operation_status="failed",
+                    resource_type="workspace",
+                    resource_id=workspace_id,
+                    role=role,
+                )
+                logger.error(
+                    "Agent runtime failed for workspace chat stream",
+                    exc_info=(type(value), value, value.__traceback__),
+                )
+                yield _stream_event({"type": "error", "error": "agent service unavailable"})
+                return
+            else:
+                result = value
 
         log_audit_event(
             "workspace.chat.completed",
@@ -540,8 +586,9 @@ def workspace_chat_stream():
             resource_id=workspace_id,
             role=role,
         )
-        for chunk in _reply_chunks(result.get("reply", "")):
-            yield _stream_event({"type": "delta", "text": chunk})
+        if not streamed:
+            for chunk in _reply_chunks(result.get("reply", "")):
+                yield _stream_event({"type": "delta", "text": chunk})
         meta = _chat_response_data(
             result=result,
             role=role,
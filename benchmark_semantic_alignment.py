@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import argparse
+import time
+
+from app.rag.providers.semantic_chunking_provider import (
+    SegmentAligner,
+    _collapse_whitespace,
+    _normalize_with_mapping,
+    _trim_span,
+)
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Compare per-segment rescanning with SegmentAligner on LLM-style semantic segments."
+    )
+    parser.add_argument(
+        "--sentences",
+        default="500,2000",
+        help="Comma-separated sentence counts for the synthetic contract block (default: 500,2000).",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=3,
+        help="Runs per size; the best time is reported (default: 3).",
+    )
+    return parser.parse_args()
+
+
+def _contract_block(sentence_count: int) -> tuple[str, list[str]]:
+    sentences = [f"第{index}条  甲方应当在\n合同生效后{index}日内支付款项。" for index in range(sentence_count)]
+    return " ".join(sentences), sentences
+
+
+def _fake_chunker_segments(sentences: list[str]) -> list[str]:
+    return [_collapse_whitespace(sentence) for sentence in sentences]
+
+
+def _rescan_find_span(*, block_text: str, segment_text: str, start_pos: int) -> tuple[int, int] | None:
+    direct_idx = block_text.find(segment_text, max(0, start_pos))
+    if direct_idx >= 0:
+        return _trim_span(block_text, direct_idx, direct_idx + len(segment_text))
+    normalized_segment = _collapse_whitespace(segment_text)
+    if not normalized_segment:
+        return None
+    start_anchor = max(0, start_pos)
+    for anchor in (start_anchor, 0):
+        normalized, mapping = _normalize_with_mapping(block_text[anchor:])
+        norm_idx = normalized.find(normalized_segment)
+        if norm_idx < 0:
+            continue
+        norm_end = norm_idx + len(normalized_segment)
+        span_start, span_end = _trim_span(block_text, anchor + mapping[norm_idx], anchor + mapping[norm_end - 1] + 1)
+        if _collapse_whitespace(block_text[span_start:span_end]) == normalized_segment:
+            return span_start, span_end
+    return None
+
+
+def _align_by_rescanning(block_text: str, segments: list[str]) -> list[tuple[int, int]]:
+    spans: list[tuple[int, int]] = []
+    cursor = 0
+    for segment in segments:
+        span = _rescan_find_span(block_text=block_text, segment_text=segment, start_pos=cursor)
+        if span is None and cursor > 0:
+            span = _rescan_find_span(block_text=block_text, segment_text=segment, start_pos=0)
+        if span is None:
+            raise RuntimeError(f"segment not found: {segment!r}")
+        cursor = max(cursor, span[1])
+        spans.append(span)
+    return spans
+
+
+def _align_with_aligner(block_text: str, segments: list[str]) -> list[tuple[int, int]]:
+    aligner = SegmentAligner([{"text": block_text}])
+    spans: list[tuple[int, int]] = []
+    for segment in segments:
+        matched = aligner.align(segment, hinted_block_index=0)
+        if matched is None:
+            raise RuntimeError(f"segment not found: {segment!r}")
+        spans.append((matched[1], matched[2]))
+    return spans
+
+
+def _best_seconds(func, *args, repeat: int) -> tuple[float, list[tuple[int, int]]]:
+    best = float("inf")
+    result: list[tuple[int, int]] = []
+    for _ in range(max(1, repeat)):
+        started = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main() -> int:
+    args = _parse_args()
+    sizes = [int(item) for item in str(args.sentences).split(",") if item.strip()]
+    print(f"{'segments':>9} {'chars':>8} {'rescan_s':>10} {'aligner_s':>10} {'speedup':>8}")
+    for size in sizes:
+        block_text, sentences = _contract_block(size)
+        segments = _fake_chunker_segments(sentences)
+        rescan_seconds, rescan_spans = _best_seconds(_align_by_rescanning, block_text, segments, repeat=args.repeat)
+        aligner_seconds, aligner_spans = _best_seconds(_align_with_aligner, block_text, segments, repeat=args.repeat)
+        if rescan_spans != aligner_spans:
+            raise RuntimeError("aligner spans differ from the rescanning baseline")
+        speedup = rescan_seconds / aligner_seconds if aligner_seconds else float("inf")
+        print(f"{size:>9} {len(block_text):>8} {rescan_seconds:>10.4f} {aligner_seconds:>10.4f} {speedup:>7.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,4 +1,4 @@
-import { apiRequest, buildApiUrl } from "@/shared/api/client";
+import { apiRequest, buildApiUrl, notifyUnauthorized } from "@/shared/api/client";
 import {
   normalizeBankruptcyRecord,
   normalizeBankruptcyRecordList,
@@ -12,6 +12,10 @@ const normalizePlotUrl = (value) => {
   return value.startsWith("/") ? buildApiUrl(value) : value;
 };
 
+const PLOT_POLL_ATTEMPTS = 60;
+
+const wait = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
 const normalizeRecordResponse = (record) => {
   const normalized = normalizeBankruptcyRecord(record);
   normalized.plotUrl = normalizePlotUrl(normalized.plotUrl);
@@ -91,3 +95,23 @@ export const deleteBankruptcyRecord = (recordId, workspaceId) =>
   apiRequest(`/api/bankruptcy/records/${Number(recordId)}?workspaceId=${encodeURIComponent(String(workspaceId || "default"))}`, {
     method: "DELETE",
   });
+
+export const fetchBankruptcyPlot = async (plotUrl, { signal } = {}) => {
+  for (let attempt = 0; attempt < PLOT_POLL_ATTEMPTS; attempt += 1) {
+    const response = await fetch(plotUrl, { credentials: "include", signal });
+    if (response.status === 202) {
+      const retryAfterSeconds = Number(response.headers.get("Retry-After")) || 1;
+      await wait(retryAfterSeconds * 1000);
+      if (signal?.aborted) {
+        break;
+      }
+      continue;
+    }
+    notifyUnauthorized(response.status);
+    if (!response.ok) {
+      return { ok: false, status: response.status, blob: null };
+    }
+    return { ok: true, status: response.status, blob: await response.blob() };
+  }
+  return { ok: false, status: 202, blob: null };
+};
@@ -34,6 +34,7 @@ export const normalizeBankruptcyRecord = (raw) => ({
   threshold: raw?.threshold == null ? null : Number(raw.threshold),
   riskLevel: raw?.riskLevel === "high" ? "high" : raw?.riskLevel === "low" ? "low" : "",
   plotUrl: typeof raw?.plotUrl === "string" ? raw.plotUrl : "",
+  plotStatus: ["ready", "pending", "failed"].includes(raw?.plotStatus) ? raw.plotStatus : "",
   topFeatures: normalizeTopFeatures(raw?.topFeatures),
   inputSummary: normalizeInputSummary(raw?.inputSummary),
   createdAt: normalizeDate(raw?.createdAt),
@@ -0,0 +1,56 @@
+import { onBeforeUnmount, ref, watch } from "vue";
+
+import { fetchBankruptcyPlot } from "@/entities/bankruptcy/api";
+
+export const useBankruptcyPlot = (plotUrlSource) => {
+  const plotSrc = ref("");
+  const plotState = ref("idle");
+  let controller = null;
+
+  const release = () => {
+    controller?.abort();
+    controller = null;
+    if (plotSrc.value) {
+      URL.revokeObjectURL(plotSrc.value);
+    }
+    plotSrc.value = "";
+  };
+
+  watch(
+    plotUrlSource,
+    async (plotUrl) => {
+      release();
+      if (!plotUrl) {
+        plotState.value = "idle";
+        return;
+      }
+      const current = new AbortController();
+      controller = current;
+      plotState.value = "loading";
+      try {
+        const result = await fetchBankruptcyPlot(plotUrl, { signal: current.signal });
+        if (current.signal.aborted) {
+          return;
+        }
+        if (result.ok) {
+          plotSrc.value = URL.createObjectURL(result.blob);
+          plotState.value = "ready";
+          return;
+        }
+        plotState.value = "failed";
+      } catch {
+        if (!current.signal.aborted) {
+          plotState.value = "failed";
+        }
+      }
+    },
+    { immediate: true },
+  );
+
+  onBeforeUnmount(release);
+
+  return {
+    plotSrc,
+    plotState,
+  };
+};
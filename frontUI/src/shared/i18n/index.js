@@ -166,6 +166,8 @@ export const COPY = {
     bankruptcyRiskLow: "低风险",
     bankruptcyTopFeatures: "关键解释特征",
     bankruptcyPlot: "SHAP 局部解释图",
+    bankruptcyPlotRendering: "解释图生成中...",
+    bankruptcyPlotFailed: "解释图生成失败",
     bankruptcyWorkspaceScope: "当前工作区",
     bankruptcyHistory: "历史记录",
     bankruptcyNoRecords: "当前工作区还没有保存的分析记录。",
@@ -372,6 +374,8 @@ export const COPY = {
     bankruptcyRiskLow: "Low Risk",
     bankruptcyTopFeatures: "Top Explanation Features",
     bankruptcyPlot: "SHAP Local Explanation",
+    bankruptcyPlotRendering: "Rendering explanation plot...",
+    bankruptcyPlotFailed: "Explanation plot failed to render",
     bankruptcyWorkspaceScope: "Workspace",
     bankruptcyHistory: "History",
     bankruptcyNoRecords: "No saved bankruptcy records exist in this workspace yet.",
@@ -0,0 +1,11 @@
+-- 009_add_rag_index_job_leases.sql
+
+ALTER TABLE rag_index_jobs
+    ADD COLUMN IF NOT EXISTS chunking_json JSON NULL AFTER chunk_fallback_reason,
+    ADD COLUMN IF NOT EXISTS attempts INT NOT NULL DEFAULT 0 AFTER chunking_json,
+    ADD COLUMN IF NOT EXISTS lease_owner VARCHAR(128) NULL AFTER attempts,
+    ADD COLUMN IF NOT EXISTS lease_expires_at DATETIME NULL AFTER lease_owner,
+    ADD COLUMN IF NOT EXISTS heartbeat_at DATETIME NULL AFTER lease_expires_at;
+
+ALTER TABLE rag_index_jobs
+    ADD INDEX IF NOT EXISTS idx_rag_index_jobs_queue (status, lease_expires_at, id);
@@ -0,0 +1,6 @@
+-- 010_add_rag_index_job_chunk_diff_counts.sql
+
+ALTER TABLE rag_index_jobs
+    ADD COLUMN IF NOT EXISTS chunks_added INT NOT NULL DEFAULT 0 AFTER chunks_count,
+    ADD COLUMN IF NOT EXISTS chunks_unchanged INT NOT NULL DEFAULT 0 AFTER chunks_added,
+    ADD COLUMN IF NOT EXISTS chunks_removed INT NOT NULL DEFAULT 0 AFTER chunks_unchanged;
@@ -0,0 +1,5 @@
+-- 011_add_rag_index_job_page_progress.sql
+
+ALTER TABLE rag_index_jobs
+    ADD COLUMN IF NOT EXISTS pages_total INT NOT NULL DEFAULT 0 AFTER chunks_removed,
+    ADD COLUMN IF NOT EXISTS pages_done INT NOT NULL DEFAULT 0 AFTER pages_total;
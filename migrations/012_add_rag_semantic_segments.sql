@@ -0,0 +1,17 @@
+-- 012_add_rag_semantic_segments.sql
+
+CREATE TABLE IF NOT EXISTS rag_semantic_segments (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    document_id BIGINT NOT NULL,
+    user_id BIGINT NOT NULL,
+    workspace_id VARCHAR(128) NOT NULL,
+    segment_id VARCHAR(64) NOT NULL,
+    text LONGTEXT NOT NULL,
+    created_at DATETIME NOT NULL,
+    UNIQUE KEY uq_rag_semantic_segments_document_segment (document_id, segment_id),
+    INDEX idx_rag_semantic_segments_document_id (document_id),
+    INDEX idx_rag_semantic_segments_user_id (user_id),
+    INDEX idx_rag_semantic_segments_workspace_id (workspace_id),
+    INDEX idx_rag_semantic_segments_segment_id (segment_id),
+    CONSTRAINT fk_rag_semantic_segments_document FOREIGN KEY (document_id) REFERENCES rag_documents(id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
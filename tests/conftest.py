@@ -25,6 +25,7 @@ def app(tmp_path):
     rag_upload_dir.mkdir(parents=True, exist_ok=True)
     rag_chroma_dir = tmp_path / "chromadb"
     rag_chroma_dir.mkdir(parents=True, exist_ok=True)
+    rag_embedding_cache_dir = tmp_path / "embedding_cache"
     bankruptcy_upload_dir = tmp_path / "bankruptcy_csv"
     bankruptcy_upload_dir.mkdir(parents=True, exist_ok=True)
     bankruptcy_plot_dir = tmp_path / "bankruptcy_plots"
@@ -64,6 +65,7 @@ def app(tmp_path):
         "RAG_OCR_BASE_URL": "",
         "RAG_CHROMADB_PERSIST_DIR": str(rag_chroma_dir),
         "RAG_CHROMADB_COLLECTION_PREFIX": "test_rag",
+        "RAG_EMBEDDING_CACHE_DIR": str(rag_embedding_cache_dir),
         "RAG_CHUNK_STRATEGY_DEFAULT": "paragraph",
         "RAG_CHUNK_STRATEGY_ALLOWED": ("paragraph", "semantic_llm"),
         "RAG_CHUNK_FALLBACK_STRATEGY": "paragraph",
@@ -72,6 +74,7 @@ def app(tmp_path):
         "BANKRUPTCY_SCALER_PATH": "assets/bankruptcy/model/scaler_borderline_smote.pkl",
         "BANKRUPTCY_UPLOAD_DIR": str(bankruptcy_upload_dir),
         "BANKRUPTCY_PLOT_DIR": str(bankruptcy_plot_dir),
+        "BANKRUPTCY_PLOT_ASYNC_ENABLED": False,
     }
     app = create_app(config)
     return app
@@ -93,6 +96,7 @@ def db_session(app):
             session.execute(text("DELETE FROM rag_query_logs"))
             session.execute(text("DELETE FROM rag_index_jobs"))
             session.execute(text("DELETE FROM rag_chunks"))
+            session.execute(text("DELETE FROM rag_semantic_segments"))
             session.execute(text("DELETE FROM rag_documents"))
             session.execute(text("DELETE FROM bankruptcy_analysis_records"))
             session.execute(text("DELETE FROM email_codes"))
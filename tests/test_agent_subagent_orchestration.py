@@ -114,3 +114,125 @@ def test_mcp_subagent_requests_server_clarification_when_ambiguous(app):
     assert result["mcp_completed"] is True
     assert result["needs_clarification"] is True
     assert "server" in result["clarification_question"].lower()
+
+
+def test_search_graph_runs_lookups_in_parallel_with_per_lookup_timeouts(monkeypatch):
+    import threading
+    import time
+
+    from flask import Flask
+
+    from app.agent.graph import search
+
+    barrier = threading.Barrier(3, timeout=2)
+
+    def _plan(state):
+        return {"use_kg": True, "use_rag": True, "use_web": True, "strategy": "hybrid", "kg_result": {}}
+
+    def _kg(state):
+        barrier.wait()
+        return {"kg_result": {"ok": True, "summary": "graph"}, "graph_meta": {"source": "kg"}}
+
+    def _rag(state):
+        barrier.wait()
+        return {
+            "rag_result": {"ok": True},
+            "rag_chunks": [{"source": "doc.pdf", "content": "private", "score": 0.5, "metadata": {}}],
+        }
+
+    def _web(state):
+        barrier.wait()
+        time.sleep(1.0)
+        return {"web_result": {"ok": True, "results": [{"url": "https://example.test", "score": 0.9}]}}
+
+    monkeypatch.setattr(search, "_search_plan_node", _plan)
+    monkeypatch.setattr(search, "_kg_lookup_node", _kg)
+    monkeypatch.setattr(search, "_rag_lookup_node", _rag)
+    monkeypatch.setattr(search, "_web_lookup_node", _web)
+    graph = search.build_search_graph()
+
+    flask_app = Flask(__name__)
+    flask_app.config["AGENT_SEARCH_WEB_TIMEOUT_SECONDS"] = 0.2
+    with flask_app.app_context():
+        result = graph.invoke({"query": "q", "llm": None, "user_id": 1, "workspace_id": "ws"})
+
+    assert [item["source_type"] for item in result["evidence"]] == ["knowledge_graph", "rag"]
+    assert result["web_result"]["ok"] is False
+    assert "timed out" in result["web_result"]["error"]
+    assert result["status"] == "done"
+
+
+def test_hung_search_lookup_does_not_time_out_the_next_turns_lookups(monkeypatch, caplog):
+    import logging
+    import threading
+
+    from flask import Flask
+
+    from app.agent.graph import search
+
+    release = threading.Event()
+    calls = {"kg": 0}
+
+    def _plan(state):
+        return {"use_kg": True, "use_rag": False, "use_web": False, "strategy": "kg", "kg_result": {}}
+
+    def _kg(state):
+        calls["kg"] += 1
+        if calls["kg"] == 1:
+            release.wait(5)
+        return {"kg_result": {"ok": True, "summary": f"graph {calls['kg']}"}, "graph_meta": {"source": "kg"}}
+
+    monkeypatch.setattr(search, "_search_plan_node", _plan)
+    monkeypatch.setattr(search, "_kg_lookup_node", _kg)
+    graph = search.build_search_graph()
+
+    flask_app = Flask(__name__)
+    flask_app.config["AGENT_SEARCH_KG_TIMEOUT_SECONDS"] = 0.3
+    flask_app.config["AGENT_SEARCH_LOOKUP_SATURATION_THRESHOLD"] = 1
+    try:
+        with flask_app.app_context(), caplog.at_level(logging.WARNING, logger=search.logger.name):
+            first = graph.invoke({"query": "q", "llm": None, "user_id": 1, "workspace_id": "ws"})
+            second = graph.invoke({"query": "q", "llm": None, "user_id": 1, "workspace_id": "ws"})
+    finally:
+        release.set()
+
+    assert "timed out" in first["kg_result"]["error"]
+    assert second["kg_result"] == {"ok": True, "summary": "graph 2"}
+    assert any(getattr(record, "event", "") == "agent.search.lookup_saturated" for record in caplog.records)
+
+
+def test_compose_answer_streams_tokens_matching_final_reply():
+    from types import SimpleNamespace
+
+    from app.agent.graph.nodes import compose_answer_node
+    from app.workspace.routes import _iter_streamed_reply
+
+    class _StreamingLLM:
+        def stream(self, messages):
+            for text in ["\n ", "Hello", " world", "  ", "!", "\n\n"]:
+                yield SimpleNamespace(content=text)
+
+        def invoke(self, messages):
+            raise AssertionError("invoke should not be used when streaming")
+
+    tokens: list[str] = []
+    result = compose_answer_node(
+        {
+            "main_llm": _StreamingLLM(),
+            "prompt_template": "{role}: {system_prompt}",
+            "role": "investor",
+            "system_prompt": "",
+            "user_message": "hi",
+            "conversation_history": [],
+            "stream_callback": tokens.append,
+        }
+    )
+    assert result["reply"] == "Hello world  !"
+    assert "".join(tokens) == result["reply"]
+
+    def _work(on_token):
+        on_token("a")
+        on_token("b")
+        return {"reply": "ab"}
+
+    assert list(_iter_streamed_reply(_work)) == [("delta", "a"), ("delta", "b"), ("result", {"reply": "ab"})]
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import io
+import json
 import warnings
 from pathlib import Path
 from urllib.parse import parse_qs, urlparse
@@ -152,6 +153,37 @@ def test_bankruptcy_predict_returns_structured_result_and_plot(client, db_sessio
     assert plot_response.mimetype == "image/png"
 
 
+def test_bankruptcy_predict_batch_streams_row_results(client, db_session):
+    bankruptcy_service.reset_runtime_for_tests()
+    user = User(email="bankruptcy-batch@example.com", password_hash=generate_password_hash("password123"))
+    db_session.add(user)
+    db_session.commit()
+    headers = _auth_headers(client, user.id)
+
+    header, row = _sample_lines()
+    response = client.post(
+        "/api/bankruptcy/predict/batch",
+        data={
+            "workspaceId": "ws-risk",
+            "plotRows": "1",
+            "file": (io.BytesIO(f"{header}\n{row}\n{row}\n".encode("utf-8")), "book.csv"),
+        },
+        headers=headers,
+        content_type="multipart/form-data",
+    )
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+    events = [json.loads(line) for line in response.get_data(as_text=True).splitlines() if line.strip()]
+    assert events[0]["type"] == "started"
+    assert events[0]["rowCount"] == 2
+    row_events = [event for event in events if event["type"] == "row"]
+    assert [event["row"] for event in row_events] == [0, 1]
+    assert row_events[0]["probability"] == row_events[1]["probability"]
+    assert "plotUrl" not in row_events[0]
+    assert client.get(row_events[1]["plotUrl"]).status_code == 200
+    assert events[-1] == {"type": "done", "scoredRows": 2, "failedRows": 0}
+
+
 def test_bankruptcy_plot_supports_chinese_company_name(client, db_session):
     bankruptcy_service.reset_runtime_for_tests()
     user = User(email="bankruptcy-chinese-plot@example.com", password_hash=generate_password_hash("password123"))
@@ -347,3 +379,187 @@ def test_bankruptcy_record_scope_is_enforced(client, db_session):
     )
     assert analyze_response.status_code == 403
     assert analyze_response.get_json()["error"] == "bankruptcy record is outside authorized scope"
+
+
+def test_bankruptcy_runtime_reuses_cached_tree_explainer(tmp_path, monkeypatch, caplog):
+    import shap
+    from flask import Flask
+
+    bankruptcy_service.reset_runtime_for_tests()
+    constructed: list[object] = []
+    original_explainer = shap.TreeExplainer
+
+    def _counting_explainer(model, *args, **kwargs):
+        constructed.append(model)
+        return original_explainer(model, *args, **kwargs)
+
+    monkeypatch.setattr(shap, "TreeExplainer", _counting_explainer)
+    flask_app = Flask("app")
+    flask_app.config.update(
+        BANKRUPTCY_MODEL_PATH="assets/bankruptcy/model/xgb_borderline_smote.pkl",
+        BANKRUPTCY_SCALER_PATH="assets/bankruptcy/model/scaler_borderline_smote.pkl",
+    )
+
+    bankruptcy_service.warm_bankruptcy_runtime(flask_app)
+    with flask_app.app_context(), caplog.at_level("INFO", logger="app.bankruptcy.service"):
+        runtime = bankruptcy_service._get_runtime()
+        feature_names = list(runtime["feature_names"])
+        frame = runtime["pd"].DataFrame([[0.1] * len(feature_names)], columns=feature_names)
+        results = [
+            bankruptcy_service._analyze_frame(
+                frame=frame,
+                company_name="ACME",
+                feature_names=feature_names,
+                runtime=runtime,
+            )
+            for index in range(2)
+        ]
+
+    bankruptcy_service.reset_runtime_for_tests()
+    assert len(constructed) == 1
+    assert results[0]["topFeatures"] == results[1]["topFeatures"]
+    timings = [record for record in caplog.records if getattr(record, "event", "") == "bankruptcy.analysis.timing"]
+    assert len(timings) == 2
+    assert all(record.scale_ms >= 0 and record.predict_ms >= 0 and record.explain_ms >= 0 for record in timings)
+
+
+def test_bankruptcy_batch_scores_all_rows_once_and_plots_requested_rows(tmp_path):
+    from flask import Flask
+    from werkzeug.datastructures import FileStorage
+
+    bankruptcy_service.reset_runtime_for_tests()
+    flask_app = Flask("app")
+    flask_app.config.update(
+        SECRET_KEY="test-secret",
+        BANKRUPTCY_MODEL_PATH="assets/bankruptcy/model/xgb_borderline_smote.pkl",
+        BANKRUPTCY_SCALER_PATH="assets/bankruptcy/model/scaler_borderline_smote.pkl",
+        BANKRUPTCY_PLOT_DIR=str(tmp_path / "plots"),
+        BANKRUPTCY_PLOT_ASYNC_ENABLED=False,
+    )
+    with flask_app.app_context():
+        runtime = bankruptcy_service._get_runtime()
+        feature_names = list(runtime["feature_names"])
+        rows = [[0.1] * len(feature_names), ["bad"] + [0.1] * (len(feature_names) - 1), [0.2] * len(feature_names)]
+        lines = [",".join(["enterprise_name", *feature_names])]
+        lines.extend(",".join([f"Company {index}", *map(str, values)]) for index, values in enumerate(rows))
+        upload = FileStorage(stream=io.BytesIO("\n".join(lines).encode("utf-8")), filename="book.csv")
+
+        summary, results = bankruptcy_service.analyze_bankruptcy_csv_batch(
+            user_id=1,
+            workspace_id="ws-batch",
+            file_storage=upload,
+            plot_rows="2",
+        )
+        items = list(results)
+        single = bankruptcy_service._analyze_frame(
+            frame=runtime["pd"].DataFrame([rows[0]], columns=feature_names),
+            company_name="Company 0",
+            feature_names=feature_names,
+            runtime=runtime,
+        )
+
+    bankruptcy_service.reset_runtime_for_tests()
+    assert summary["rowCount"] == 3
+    assert summary["plotRows"] == [2]
+    assert [item["ok"] for item in items] == [True, False, True]
+    assert items[1]["error"] == f"feature '{feature_names[0]}' must be numeric"
+    assert items[0]["companyName"] == "Company 0"
+    assert abs(items[0]["probability"] - single["probability"]) < 1e-6
+    assert "plotUrl" not in items[0]
+    assert items[2]["plotUrl"].startswith("/api/bankruptcy/plots/")
+    assert len(list((tmp_path / "plots").rglob("*.png"))) == 1
+
+
+def test_bankruptcy_plots_render_in_process_pool_and_are_cached(tmp_path):
+    from flask import Flask
+
+    from app.bankruptcy import plots as bankruptcy_plots
+
+    bankruptcy_plots.reset_plot_renderer_for_tests()
+    flask_app = Flask("app")
+    flask_app.config.update(BANKRUPTCY_PLOT_WORKERS=1)
+    top_features = [
+        {"name": "ROA", "shapValue": 0.4, "direction": "increase_risk", "absoluteValue": 0.4},
+        {"name": "Debt ratio", "shapValue": -0.2, "direction": "decrease_risk", "absoluteValue": 0.2},
+    ]
+    cache_key = bankruptcy_plots.plot_cache_key(model_version="abc123", company_name="A公司", top_features=top_features)
+    assert cache_key == bankruptcy_plots.plot_cache_key(
+        model_version="abc123",
+        company_name="A公司",
+        top_features=[dict(item) for item in top_features],
+    )
+    assert cache_key != bankruptcy_plots.plot_cache_key(model_version="def456", company_name="A公司", top_features=top_features)
+    plot_path = tmp_path / f"record-7-{cache_key}.png"
+
+    try:
+        with flask_app.app_context():
+            first = bankruptcy_plots.schedule_plot(plot_path=plot_path, top_features=top_features, company_name="A公司")
+            second = bankruptcy_plots.schedule_plot(plot_path=plot_path, top_features=top_features, company_name="A公司")
+            status = bankruptcy_plots.plot_status(plot_path, wait_seconds=120)
+            cached = bankruptcy_plots.schedule_plot(plot_path=plot_path, top_features=top_features, company_name="A公司")
+    finally:
+        bankruptcy_plots.reset_plot_renderer_for_tests()
+
+    assert (first, second) == ("pending", "pending")
+    assert status == "ready"
+    assert cached == "ready"
+    assert plot_path.read_bytes().startswith(b"\x89PNG")
+    assert [path.name for path in tmp_path.iterdir()] == [plot_path.name]
+
+
+def test_spawned_plot_workers_do_not_boot_the_app_from_main(monkeypatch):
+    import runpy
+
+    import app as app_package
+
+    calls: list[object] = []
+    monkeypatch.setattr(app_package, "create_app", lambda *args, **kwargs: calls.append(args))
+    main_path = Path(__file__).resolve().parent.parent / "main.py"
+
+    worker_globals = runpy.run_path(str(main_path), run_name="__mp_main__")
+
+    assert calls == []
+    assert "app" not in worker_globals
+
+
+def test_missing_sample_plot_is_rescheduled_from_saved_inputs(tmp_path):
+    import pytest
+    from flask import Flask
+
+    from app.bankruptcy import plots as bankruptcy_plots
+    from app.bankruptcy.assets import cached_plot_asset
+    from app.bankruptcy.errors import BankruptcyNotFoundError, BankruptcyPlotPendingError
+
+    bankruptcy_plots.reset_plot_renderer_for_tests()
+    flask_app = Flask("app")
+    flask_app.config.update(
+        SECRET_KEY="test-secret",
+        BANKRUPTCY_PLOT_DIR=str(tmp_path / "plots"),
+        BANKRUPTCY_PLOT_WORKERS=1,
+        BANKRUPTCY_PLOT_WAIT_SECONDS=0,
+    )
+    top_features = [{"name": "ROA", "shapValue": 0.4, "direction": "increase_risk", "absoluteValue": 0.4}]
+
+    try:
+        with flask_app.app_context():
+            plot_path, plot_url = cached_plot_asset(user_id=7, workspace_id="ws-risk", cache_key="abc123-feedfacefeedface")
+            token = parse_qs(urlparse(plot_url).query)["token"][0]
+            with pytest.raises(BankruptcyNotFoundError):
+                bankruptcy_service.read_plot_asset(
+                    user_id=7, workspace_id="ws-risk", filename=plot_path.name, token=token
+                )
+
+            bankruptcy_plots.save_plot_inputs(plot_path, top_features=top_features, company_name="A公司")
+            with pytest.raises(BankruptcyPlotPendingError):
+                bankruptcy_service.read_plot_asset(
+                    user_id=7, workspace_id="ws-risk", filename=plot_path.name, token=token
+                )
+            assert bankruptcy_plots.plot_status(plot_path, wait_seconds=120) == "ready"
+            served = bankruptcy_service.read_plot_asset(
+                user_id=7, workspace_id="ws-risk", filename=plot_path.name, token=token
+            )
+    finally:
+        bankruptcy_plots.reset_plot_renderer_for_tests()
+
+    assert served == plot_path
+    assert plot_path.read_bytes().startswith(b"\x89PNG")
@@ -687,6 +687,46 @@ def test_workspace_chat_job_completes_and_saves_scoped_memory(client, app, db_se
     assert thread.conversation_id == "job-conv-a"
 
 
+def test_workspace_chat_releases_db_connections_while_generating(client, app, db_session, monkeypatch):
+    user = User(email="chat-pool@example.com", nickname="ChatPool", password_hash=generate_password_hash("password123"))
+    db_session.add(user)
+    db_session.commit()
+    headers = _auth_headers(client, user.id)
+
+    response = client.patch("/api/workspace/context", json={"role": "investor"}, headers=headers)
+    assert response.status_code == 200
+    app.config["AGENT_CHAT_JOBS_SYNC_EXECUTION"] = True
+
+    pool = app.extensions["db_engine"].pool
+    baseline = pool.checkedout()
+    checked_out: list[int] = []
+
+    def _fake_generate_reply_payload(**kwargs):
+        checked_out.append(pool.checkedout())
+        return {
+            "reply": "pooled reply",
+            "citations": [],
+            "sources": [],
+            "noEvidence": False,
+            "intent": "answer",
+            "graph": {},
+            "graphMeta": {},
+        }
+
+    monkeypatch.setattr("app.workspace.routes.generate_reply_payload", _fake_generate_reply_payload)
+    monkeypatch.setattr("app.agent.jobs.generate_reply_payload", _fake_generate_reply_payload)
+
+    chat_response = client.post("/api/workspace/chat", json=_chat_payload("pool question", "pool-conv"), headers=headers)
+    assert chat_response.status_code == 200
+    job_response = client.post("/api/workspace/chat/jobs", json=_chat_payload("pool job", "pool-conv"), headers=headers)
+    assert job_response.status_code == 202
+
+    assert checked_out == [baseline, baseline]
+    db_session.expire_all()
+    messages = db_session.execute(select(AgentConversationMessage).order_by(AgentConversationMessage.id)).scalars().all()
+    assert [item.content for item in messages] == ["pool question", "pooled reply", "pool job", "pooled reply"]
+
+
 def test_workspace_chat_job_failure_records_job_without_memory_turn(client, app, db_session, monkeypatch):
     user = User(email="chat-job-fail@example.com", nickname="ChatJobFail", password_hash=generate_password_hash("password123"))
     db_session.add(user)
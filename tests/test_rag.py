@@ -10,7 +10,7 @@ from werkzeug.security import generate_password_hash
 
 from app.agent.graph.search import _search_plan_node
 from app.db import get_session
-from app.rag.errors import RAGConfigurationError, RAGContractError
+from app.rag.errors import RAGConfigurationError, RAGContractError, RAGValidationError
 from app.rag.fileloaders import load_source_document
 from app.rag.fileloaders.canonical import parse_canonical_text
 from app.rag.pipeline.indexer import parse_and_chunk_document
@@ -18,7 +18,7 @@ from app.rag.providers.semantic_chunking_provider import OpenAICompatibleSemanti
 from app.rag.providers.registry import get_chunker, get_embedder, get_reranker, get_semantic_chunking_provider
 from app.rag.providers.registry import get_vector_store
 from app.rag.schemas import ChunkingRequest, RetrievalHit
-from app.models import RagChunk, RagDocument, RagIndexJob, User
+from app.models import RagChunk, RagDocument, RagIndexJob, RagSemanticSegment, User
 
 
 def _auth_headers(client, user_id: int) -> dict[str, str]:
@@ -272,6 +272,153 @@ def test_rag_delete_keeps_record_but_clears_active_assets(client, app, db_sessio
     assert derived_path.exists() is False
 
 
+def test_rag_lexical_search_matches_exact_codes_without_embedding(client, app, db_session, monkeypatch):
+    app.config["RAG_ENABLED"] = True
+    app.config["RAG_AUTO_INDEX_ON_UPLOAD"] = False
+
+    user = _create_user(db_session, "rag-lexical@example.com")
+    headers = _auth_headers(client, user.id)
+    upload_payload = _upload_text_document(
+        client,
+        headers,
+        "ws-lexical",
+        "codes.txt",
+        "公司代码 600519.SH 对应贵州茅台。\n\n另一段讨论现金流折现模型。",
+    )
+    _index_document(client, headers, "ws-lexical", int(upload_payload["id"]))
+
+    def _no_embedder():
+        raise AssertionError("lexical search must not load the embedder")
+
+    monkeypatch.setattr("app.rag.service.get_embedder", _no_embedder)
+    response = client.post(
+        "/api/rag/search",
+        json={"workspaceId": "ws-lexical", "query": "600519.SH", "topK": 3, "mode": "lexical"},
+        headers=headers,
+    )
+    assert response.status_code == 200
+    chunks = response.get_json()["data"]["chunks"]
+    assert chunks
+    assert "600519.SH" in chunks[0]["content"]
+
+    invalid = client.post(
+        "/api/rag/search",
+        json={"workspaceId": "ws-lexical", "query": "600519", "topK": 3, "mode": "sparse"},
+        headers=headers,
+    )
+    assert invalid.status_code == 400
+
+
+def test_rag_search_serves_consistency_filter_from_cache_until_invalidated(client, app, db_session):
+    from app.rag.service import rag_search
+
+    app.config["RAG_ENABLED"] = True
+    app.config["RAG_AUTO_INDEX_ON_UPLOAD"] = False
+    app.config["RAG_RETRIEVAL_SCORE_THRESHOLD"] = -10.0
+    app.config["RAG_RETRIEVAL_MODE"] = "vector"
+
+    user = _create_user(db_session, "rag-retrievable-cache@example.com")
+    headers = _auth_headers(client, user.id)
+    first = _upload_text_document(client, headers, "ws-retrievable", "first.txt", "第一份缓存校验文档。")
+    second = _upload_text_document(client, headers, "ws-retrievable", "second.txt", "第二份缓存校验文档。")
+    _index_document(client, headers, "ws-retrievable", int(first["id"]))
+    _index_document(client, headers, "ws-retrievable", int(second["id"]))
+
+    def _search():
+        with app.app_context():
+            return rag_search(
+                user_id=user.id,
+                workspace_id="ws-retrievable",
+                query="缓存校验",
+                top_k=5,
+                include_debug=True,
+            )
+
+    _, cold_debug = _search()
+    assert cold_debug["retrieval"]["consistencyFilter"]["source"] == "database"
+    warm_hits, warm_debug = _search()
+    assert warm_debug["retrieval"]["consistencyFilter"]["source"] == "cache"
+    assert {hit.metadata["document_id"] for hit in warm_hits} == {int(first["id"]), int(second["id"])}
+
+    delete_response = client.delete(f"/api/rag/documents/{int(first['id'])}?workspaceId=ws-retrievable", headers=headers)
+    assert delete_response.status_code == 200
+    hits, debug = _search()
+    assert debug["retrieval"]["consistencyFilter"]["source"] == "database"
+    assert {hit.metadata["document_id"] for hit in hits} == {int(second["id"])}
+
+
+def test_rag_stores_semantic_segment_text_once_and_loads_it_at_search_time(client, app, db_session):
+    app.config["RAG_ENABLED"] = True
+    app.config["RAG_AUTO_INDEX_ON_UPLOAD"] = False
+    app.config["RAG_RETRIEVAL_SCORE_THRESHOLD"] = -10.0
+
+    user = _create_user(db_session, "rag-segment-store@example.com")
+    headers = _auth_headers(client, user.id)
+    upload_payload = _upload_text_document(
+        client,
+        headers,
+        "ws-segments",
+        "segments.txt",
+        "第一句讲收入。第二句讲利润。第三句讲现金流。",
+    )
+    document_id = int(upload_payload["id"])
+    _index_document(client, headers, "ws-segments", document_id)
+
+    chunks = db_session.query(RagChunk).filter(RagChunk.document_id == document_id).all()
+    assert len(chunks) == 3
+    assert all("semantic_segment_text" not in (chunk.metadata_json or {}) for chunk in chunks)
+    segments = db_session.query(RagSemanticSegment).filter(RagSemanticSegment.document_id == document_id).all()
+    assert len(segments) == 1
+    assert segments[0].segment_id == chunks[0].metadata_json["semantic_segment_id"]
+
+    response = client.post(
+        "/api/rag/search",
+        json={"workspaceId": "ws-segments", "query": "利润", "topK": 3},
+        headers=headers,
+    )
+    assert response.status_code == 200
+    hits = response.get_json()["data"]["chunks"]
+    assert hits
+    assert all("semantic_segment_text" not in hit["metadata"] for hit in hits)
+    assert all(hit["semanticSegment"]["text"] == segments[0].text for hit in hits)
+
+    delete_response = client.delete(f"/api/rag/documents/{document_id}?workspaceId=ws-segments", headers=headers)
+    assert delete_response.status_code == 200
+    db_session.expire_all()
+    assert db_session.query(RagSemanticSegment).filter(RagSemanticSegment.document_id == document_id).count() == 0
+
+
+def test_rag_segment_embedding_unit_does_not_duplicate_segment_text(client, app, db_session):
+    app.config["RAG_ENABLED"] = True
+    app.config["RAG_AUTO_INDEX_ON_UPLOAD"] = False
+    app.config["RAG_RETRIEVAL_SCORE_THRESHOLD"] = -10.0
+
+    user = _create_user(db_session, "rag-segment-unit@example.com")
+    headers = _auth_headers(client, user.id)
+    upload_payload = _upload_text_document(
+        client,
+        headers,
+        "ws-segment-unit",
+        "segment-unit.txt",
+        "第一句讲收入。第二句讲利润。第三句讲现金流。",
+    )
+    document_id = int(upload_payload["id"])
+    _index_document(client, headers, "ws-segment-unit", document_id, chunking={"embeddingUnit": "segment"})
+
+    chunks = db_session.query(RagChunk).filter(RagChunk.document_id == document_id).all()
+    assert len(chunks) == 1
+    assert db_session.query(RagSemanticSegment).filter(RagSemanticSegment.document_id == document_id).count() == 0
+
+    response = client.post(
+        "/api/rag/search",
+        json={"workspaceId": "ws-segment-unit", "query": "利润", "topK": 3},
+        headers=headers,
+    )
+    assert response.status_code == 200
+    hits = response.get_json()["data"]["chunks"]
+    assert [hit["semanticSegment"]["text"] for hit in hits] == [chunks[0].content]
+
+
 def test_rag_search_ignores_orphaned_vectors_when_chunk_rows_are_deleted(client, app, db_session):
     app.config["RAG_ENABLED"] = True
     app.config["RAG_AUTO_INDEX_ON_UPLOAD"] = False
@@ -333,6 +480,68 @@ def test_rag_delete_rejects_indexing_documents(client, app, db_session):
     assert persisted.status == "indexing"
 
 
+def test_rag_index_queue_reclaims_expired_leases(client, app, db_session):
+    from datetime import datetime, timedelta
+
+    from app.rag.service import process_next_index_job
+
+    app.config["RAG_ENABLED"] = True
+    app.config["RAG_AUTO_INDEX_ON_UPLOAD"] = False
+    app.config["RAG_INDEX_MAX_ATTEMPTS"] = 2
+
+    user = _create_user(db_session, "rag-queue@example.com")
+    headers = _auth_headers(client, user.id)
+    crashed_id = int(_upload_text_document(client, headers, "ws-queue", "crashed.txt", "崩溃后需要重新领取的任务")["id"])
+    live_id = int(_upload_text_document(client, headers, "ws-queue", "live.txt", "仍在运行中的任务")["id"])
+    exhausted_id = int(_upload_text_document(client, headers, "ws-queue", "exhausted.txt", "多次租约过期的任务")["id"])
+
+    now = datetime.utcnow()
+    jobs = {}
+    for document_id, owner, expires_at, attempts in (
+        (crashed_id, "crashed-worker", now - timedelta(seconds=5), 1),
+        (live_id, "live-worker", now + timedelta(minutes=5), 1),
+        (exhausted_id, "crashed-worker", now - timedelta(seconds=5), 2),
+    ):
+        document = db_session.get(RagDocument, document_id)
+        document.status = "indexing"
+        job = RagIndexJob(
+            document_id=document_id,
+            user_id=user.id,
+            workspace_id="ws-queue",
+            status="running",
+            requested_chunk_strategy="paragraph",
+            chunking_json={"strategy": "paragraph"},
+            attempts=attempts,
+            lease_owner=owner,
+            lease_expires_at=expires_at,
+            started_at=now - timedelta(minutes=1),
+        )
+        db_session.add(job)
+        db_session.flush()
+        jobs[document_id] = int(job.id)
+    db_session.commit()
+
+    assert process_next_index_job(app, worker_id="worker-b") is True
+    assert process_next_index_job(app, worker_id="worker-b") is False
+
+    db_session.expire_all()
+    reclaimed = db_session.get(RagIndexJob, jobs[crashed_id])
+    assert reclaimed.status == "done"
+    assert reclaimed.attempts == 2
+    assert reclaimed.lease_owner is None
+    assert _load_rag_document(app, crashed_id).status == "indexed"
+    assert _count_document_chunks(app, crashed_id) > 0
+
+    live = db_session.get(RagIndexJob, jobs[live_id])
+    assert live.status == "running"
+    assert live.lease_owner == "live-worker"
+
+    exhausted = db_session.get(RagIndexJob, jobs[exhausted_id])
+    assert exhausted.status == "failed"
+    assert exhausted.error_stage == "lease"
+    assert _load_rag_document(app, exhausted_id).status == "failed"
+
+
 def test_rag_reindex_replaces_active_artifacts_and_retry_recovers(client, app, db_session, monkeypatch):
     app.config["RAG_ENABLED"] = True
     app.config["RAG_AUTO_INDEX_ON_UPLOAD"] = False
@@ -356,14 +565,14 @@ def test_rag_reindex_replaces_active_artifacts_and_retry_recovers(client, app, d
     first_chunk_count = _count_document_chunks(app, document_id)
     assert first_chunk_count > 0
 
-    from app.rag.pipeline.indexer import chunk_document_blocks
+    from app.rag.pipeline.indexer import iter_document_chunks
 
-    original_chunking = chunk_document_blocks
+    original_chunking = iter_document_chunks
 
     def _broken_chunking(*args, **kwargs):
         raise RuntimeError("forced retry path")
 
-    monkeypatch.setattr("app.rag.service.chunk_document_blocks", _broken_chunking)
+    monkeypatch.setattr("app.rag.service.iter_document_chunks", _broken_chunking)
     failed_response = client.post(
         f"/api/rag/documents/{document_id}/reindex",
         json={"workspaceId": "ws-reindex", "chunking": {"strategy": "semantic_llm"}},
@@ -380,7 +589,7 @@ def test_rag_reindex_replaces_active_artifacts_and_retry_recovers(client, app, d
     assert failed_document.status == "failed"
     assert _count_document_chunks(app, document_id) == 0
 
-    monkeypatch.setattr("app.rag.service.chunk_document_blocks", original_chunking)
+    monkeypatch.setattr("app.rag.service.iter_document_chunks", original_chunking)
     retry_response = client.post(
         f"/api/rag/documents/{document_id}/reindex",
         json={"workspaceId": "ws-reindex", "chunking": {"strategy": "semantic_llm"}},
@@ -463,6 +672,84 @@ def test_rag_reindex_reuses_derived_canonical_asset(client, app, db_session, mon
     assert reindex_job_response.get_json()["data"]["status"] == "done"
 
 
+def test_rag_reindex_only_embeds_changed_chunks(client, app, db_session, monkeypatch):
+    app.config["RAG_ENABLED"] = True
+    app.config["RAG_AUTO_INDEX_ON_UPLOAD"] = False
+
+    user = _create_user(db_session, "rag-diff@example.com")
+    headers = _auth_headers(client, user.id)
+    upload_payload = _upload_text_document(
+        client,
+        headers,
+        "ws-diff",
+        "diff.txt",
+        "第一段内容。\n\n第二段内容。",
+    )
+    document_id = int(upload_payload["id"])
+
+    first_job = _index_document(client, headers, "ws-diff", document_id)
+    first_payload = client.get(f"/api/rag/jobs/{first_job['jobId']}?workspaceId=ws-diff", headers=headers).get_json()[
+        "data"
+    ]
+    assert first_payload["status"] == "done"
+    assert first_payload["chunksAdded"] == first_payload["chunksCount"] > 0
+    assert first_payload["chunksUnchanged"] == 0
+    assert first_payload["chunksRemoved"] == 0
+
+    embedded_texts: list[str] = []
+    embedder = get_embedder()
+    original_embed = embedder.embed_documents
+
+    def _tracking_embed(texts):
+        embedded_texts.extend(texts)
+        return original_embed(texts)
+
+    monkeypatch.setattr(embedder, "embed_documents", _tracking_embed)
+    same_job = client.post(
+        f"/api/rag/documents/{document_id}/reindex",
+        json={"workspaceId": "ws-diff"},
+        headers=headers,
+    ).get_json()["data"]
+    same_payload = client.get(f"/api/rag/jobs/{same_job['jobId']}?workspaceId=ws-diff", headers=headers).get_json()[
+        "data"
+    ]
+    assert same_payload["status"] == "done"
+    assert same_payload["chunksUnchanged"] == first_payload["chunksCount"]
+    assert same_payload["chunksAdded"] == 0
+    assert same_payload["chunksRemoved"] == 0
+    assert embedded_texts == []
+
+    stored_document = _load_rag_document(app, document_id)
+    assert stored_document is not None
+    derived_path = Path(stored_document.derived_text_path)
+    derived_path.write_text(
+        derived_path.read_text(encoding="utf-8").replace("第二段内容。", "第二段已经修改。"),
+        encoding="utf-8",
+    )
+    edited_job = client.post(
+        f"/api/rag/documents/{document_id}/reindex",
+        json={"workspaceId": "ws-diff"},
+        headers=headers,
+    ).get_json()["data"]
+    edited_payload = client.get(
+        f"/api/rag/jobs/{edited_job['jobId']}?workspaceId=ws-diff", headers=headers
+    ).get_json()["data"]
+    assert edited_payload["status"] == "done"
+    assert edited_payload["chunksAdded"] > 0
+    assert edited_payload["chunksRemoved"] > 0
+    assert edited_payload["chunksAdded"] + edited_payload["chunksUnchanged"] == edited_payload["chunksCount"]
+    assert embedded_texts and all("第二段已经修改" in text for text in embedded_texts)
+    assert _count_document_chunks(app, document_id) == edited_payload["chunksCount"]
+
+    search_response = client.post(
+        "/api/rag/search",
+        json={"workspaceId": "ws-diff", "query": "第二段内容", "topK": 10, "filters": {}},
+        headers=headers,
+    )
+    assert search_response.status_code == 200
+    assert all("第二段内容" not in item["content"] for item in search_response.get_json()["data"]["chunks"])
+
+
 def test_rag_embedding_debug_endpoint_returns_chunk_vector(client, app, db_session):
     app.config["RAG_ENABLED"] = True
     app.config["RAG_DEBUG_VISUALIZATION_ENABLED"] = True
@@ -751,6 +1038,76 @@ def test_semantic_chunking_fallback_execution(client, app, db_session):
     assert isinstance(semantic_segment["text"], str) and semantic_segment["text"]
 
 
+def test_read_canonical_blocks_parses_the_asset_once(tmp_path: Path, monkeypatch):
+    from types import SimpleNamespace
+
+    from app.rag import service
+    from app.rag.fileloaders.canonical import iter_canonical_file, serialize_canonical_blocks
+    from app.rag.schemas import TextBlock
+
+    blocks = [TextBlock(text=f"第{index}段。", metadata={"source": "a.txt"}) for index in range(5)]
+    canonical_path = tmp_path / "canonical.txt"
+    canonical_path.write_text(serialize_canonical_blocks(blocks), encoding="utf-8")
+    parsed: list[TextBlock] = []
+
+    def _counting_iter(path: Path):
+        for block in iter_canonical_file(path):
+            parsed.append(block)
+            yield block
+
+    monkeypatch.setattr(service, "iter_canonical_file", _counting_iter)
+    streamed = service._read_canonical_blocks(SimpleNamespace(derived_text_path=str(canonical_path)))
+    assert len(parsed) == 1
+    assert [block.text for block in streamed] == [block.text for block in blocks]
+    assert len(parsed) == len(blocks)
+
+    empty_path = tmp_path / "empty.txt"
+    empty_path.write_text("", encoding="utf-8")
+    with pytest.raises(RAGValidationError, match="empty"):
+        service._read_canonical_blocks(SimpleNamespace(derived_text_path=str(empty_path)))
+
+
+def test_streamed_chunking_matches_materialized_payloads_and_bounds_windows(tmp_path: Path):
+    from flask import Flask
+
+    from app.rag.fileloaders.canonical import iter_canonical_file, serialize_canonical_blocks
+    from app.rag.pipeline.indexer import chunk_document_blocks, iter_document_chunks, iter_payload_windows
+    from app.rag.schemas import TextBlock
+
+    blocks = [
+        TextBlock(
+            text=f"第{index}段。" + "这是用于流式索引的测试内容。" * (1 + index % 7),
+            metadata={"source": "stream.txt", "page": index // 10 + 1},
+        )
+        for index in range(400)
+    ]
+    canonical_path = tmp_path / "canonical.txt"
+    canonical_path.write_text(serialize_canonical_blocks(blocks), encoding="utf-8")
+    assert list(iter_canonical_file(canonical_path)) == parse_canonical_text(canonical_path.read_text(encoding="utf-8"))
+
+    flask_app = Flask(__name__)
+    flask_app.config.update(RAG_CHUNK_STRATEGY_ALLOWED=("paragraph",), RAG_CHUNK_FALLBACK_STRATEGY="paragraph")
+    arguments = {
+        "document_id": 7,
+        "source_name": "stream.txt",
+        "chunker": get_chunker(),
+        "semantic_provider": None,
+        "chunking_request": None,
+        "chunk_size": 1200,
+        "overlap": 150,
+    }
+    with flask_app.app_context():
+        materialized, applied = chunk_document_blocks(blocks=blocks, **arguments)
+        stream, streamed_applied = iter_document_chunks(blocks=iter_canonical_file(canonical_path), **arguments)
+        windows = list(iter_payload_windows(stream, max_chunks=64, max_bytes=200_000, vector_dimension=128))
+
+    assert streamed_applied == applied
+    assert [payload.chunk_id for window in windows for payload in window] == [item.chunk_id for item in materialized]
+    assert len(windows) > 1
+    assert all(len(window) <= 64 for window in windows)
+    assert all(sum(32 * 128 + 2 * len(item.text) for item in window) <= 200_000 for window in windows)
+
+
 def test_markdown_fileloader_normalizes_structured_text(app, tmp_path: Path):
     sample = tmp_path / "notes.md"
     sample.write_text(
@@ -835,6 +1192,142 @@ def test_pdf_fileloader_fails_when_ocr_is_required_but_unavailable(app, tmp_path
     assert "ocr required" in str(exc_info.value).lower()
 
 
+def test_pdf_fileloader_ocrs_scanned_pages_in_parallel_from_one_document(tmp_path: Path, monkeypatch):
+    import threading
+
+    import fitz
+
+    from app.rag.fileloaders import pdf_loader
+    from app.rag.fileloaders.pdf_loader import PdfFileLoader
+
+    sample = tmp_path / "scanned.pdf"
+    document = fitz.open()
+    for index in range(6):
+        page = document.new_page(width=595, height=842)
+        if index == 0:
+            page.insert_text((72, 72), "This page has enough native text to skip OCR entirely.")
+        else:
+            color = (0.9, 0.1, 0.1) if index == 3 else (0, 0, 0)
+            page.draw_rect(fitz.Rect(72, 72, 520, 400), color=color, fill=color)
+    document.save(str(sample))
+    document.close()
+
+    opened: list[str] = []
+    original_open = fitz.open
+
+    def _counting_open(*args, **kwargs):
+        opened.append(str(args[0]) if args else "")
+        return original_open(*args, **kwargs)
+
+    monkeypatch.setattr(fitz, "open", _counting_open)
+
+    class _RecordingOCRProvider:
+        provider_name = "recording"
+
+        def __init__(self) -> None:
+            self.images: dict[int, bytes] = {}
+            self.active = 0
+            self.peak = 0
+            self._lock = threading.Lock()
+
+        def recognize_page(self, *, image_bytes: bytes, mime_type: str, source_name: str, page_number: int) -> str:
+            with self._lock:
+                self.active += 1
+                self.peak = max(self.peak, self.active)
+            time.sleep(0.05 * (7 - page_number))
+            with self._lock:
+                self.active -= 1
+                self.images[page_number] = image_bytes
+            return f"OCR text for page {page_number}"
+
+    provider = _RecordingOCRProvider()
+    loader = PdfFileLoader(loader_version="v1", ocr_provider_factory=lambda: provider, ocr_max_workers=3)
+    loaded = loader.load(path=sample, source_name="scanned.pdf")
+
+    assert [block.metadata["page"] for block in loaded.blocks] == [1, 2, 3, 4, 5, 6]
+    assert loaded.blocks[0].metadata["extraction_method"] == "native"
+    assert [block.text for block in loaded.blocks[1:]] == [f"OCR text for page {page}" for page in range(2, 7)]
+    assert loaded.extraction_method == "mixed"
+    assert provider.peak == 3
+    assert opened == [str(sample)]
+    png_colour_type = {page: image[25] for page, image in provider.images.items()}
+    assert png_colour_type[4] == 2
+    assert all(png_colour_type[page] == 0 for page in (2, 3, 5, 6))
+    assert pdf_loader._select_page_dpi(fitz.open().new_page(width=595, height=842), max_dpi=180, max_side_px=2048) == 175
+
+
+def test_pdf_fileloader_resumes_ocr_from_page_checkpoint(tmp_path: Path):
+    import fitz
+
+    from app.rag.errors import RAGValidationError
+    from app.rag.fileloaders.checkpoint import PageCheckpoint
+    from app.rag.fileloaders.pdf_loader import PdfFileLoader
+
+    sample = tmp_path / "long-scan.pdf"
+    document = fitz.open()
+    for _ in range(5):
+        page = document.new_page(width=300, height=400)
+        page.draw_rect(fitz.Rect(20, 20, 280, 380), color=(0, 0, 0), fill=(0, 0, 0))
+    document.save(str(sample))
+    document.close()
+
+    class _FlakyOCRProvider:
+        provider_name = "flaky"
+
+        def __init__(self, failing_page: int | None) -> None:
+            self.failing_page = failing_page
+            self.pages: list[int] = []
+
+        def recognize_page(self, *, image_bytes: bytes, mime_type: str, source_name: str, page_number: int) -> str:
+            self.pages.append(page_number)
+            if page_number == self.failing_page:
+                raise RAGValidationError("ocr provider unavailable")
+            return f"page {page_number} text"
+
+    checkpoint_path = tmp_path / "pages.jsonl"
+    first_progress: list[tuple[int, int]] = []
+    first_provider = _FlakyOCRProvider(failing_page=4)
+    first_loader = PdfFileLoader(
+        loader_version="v1",
+        ocr_provider_factory=lambda: first_provider,
+        ocr_max_workers=1,
+        checkpoint=PageCheckpoint(checkpoint_path, on_progress=lambda done, total: first_progress.append((done, total))),
+    )
+    with pytest.raises(RAGValidationError):
+        first_loader.load(path=sample, source_name="long-scan.pdf")
+    completed_pages = [page for page in first_provider.pages if page != 4]
+    assert completed_pages[:3] == [1, 2, 3]
+    assert first_progress == [(done, 5) for done in range(len(completed_pages) + 1)]
+    with checkpoint_path.open("a", encoding="utf-8") as handle:
+        handle.write('{"page": 4, "page_hash": "torn')
+
+    resumed_progress: list[tuple[int, int]] = []
+    resumed_provider = _FlakyOCRProvider(failing_page=None)
+    resumed_loader = PdfFileLoader(
+        loader_version="v1",
+        ocr_provider_factory=lambda: resumed_provider,
+        ocr_max_workers=1,
+        checkpoint=PageCheckpoint(checkpoint_path, on_progress=lambda done, total: resumed_progress.append((done, total))),
+    )
+    loaded = resumed_loader.load(path=sample, source_name="long-scan.pdf")
+
+    assert resumed_provider.pages == [page for page in range(1, 6) if page not in completed_pages]
+    assert resumed_progress == [(done, 5) for done in range(len(completed_pages), 6)]
+    assert [block.text for block in loaded.blocks] == [f"page {page} text" for page in range(1, 6)]
+    assert loaded.ocr_provider == "flaky"
+    assert len(checkpoint_path.read_text(encoding="utf-8").splitlines()) == 5
+
+    sample.write_bytes(sample.read_bytes() + b"\n% edited\n")
+    changed_provider = _FlakyOCRProvider(failing_page=None)
+    PdfFileLoader(
+        loader_version="v1",
+        ocr_provider_factory=lambda: changed_provider,
+        ocr_max_workers=1,
+        checkpoint=PageCheckpoint(checkpoint_path),
+    ).load(path=sample, source_name="long-scan.pdf")
+    assert changed_provider.pages == [1, 2, 3, 4, 5]
+
+
 class _FakeHTTPResponse:
     def __init__(self, payload: dict):
         self._raw = json.dumps(payload, ensure_ascii=False).encode("utf-8")
@@ -1072,3 +1565,1072 @@ def test_search_plan_uses_kg_only_for_explicit_graph_request():
     assert result["use_kg"] is True
     assert result["use_rag"] is False
     assert result["use_web"] is False
+
+
+def test_chroma_vector_store_registry_reuses_clients_and_collection_handles(tmp_path: Path, monkeypatch):
+    from app.rag.providers import chromadb_store
+    from app.rag.schemas import ChunkPayload
+
+    created_clients: list[str] = []
+
+    class _FakeCollection:
+        def __init__(self):
+            self.rows: dict[str, dict] = {}
+
+        def upsert(self, *, ids, embeddings, documents, metadatas):
+            for chunk_id, vector, text, metadata in zip(ids, embeddings, documents, metadatas):
+                self.rows[chunk_id] = {"vector": vector, "text": text, "metadata": metadata}
+
+        def get(self, *, ids, include):
+            return {"embeddings": [self.rows[item]["vector"] for item in ids if item in self.rows]}
+
+    class _FakeClient:
+        def __init__(self, path: str):
+            created_clients.append(path)
+            self.collections: dict[str, _FakeCollection] = {}
+            self.lookups = 0
+
+        def get_or_create_collection(self, *, name: str):
+            self.lookups += 1
+            return self.collections.setdefault(name, _FakeCollection())
+
+        def delete_collection(self, *, name: str):
+            self.collections.pop(name, None)
+
+    import chromadb
+
+    monkeypatch.setattr(chromadb, "PersistentClient", _FakeClient)
+    chromadb_store.reset_chroma_clients_for_tests()
+    try:
+        first = chromadb_store.ChromaVectorStore(persist_dir=str(tmp_path), collection_prefix="t")
+        second = chromadb_store.ChromaVectorStore(persist_dir=str(tmp_path), collection_prefix="t")
+        assert first._chroma_client is second._chroma_client
+        assert len(created_clients) == 1
+
+        payload = ChunkPayload(chunk_id="c1", text="alpha", metadata={"document_id": 1})
+        first.upsert_chunks(workspace_id="ws", collection_name="workspace_ws", chunk_payloads=[payload], vectors=[[1.0, 0.0]])
+        assert first.get_chunk_vector(workspace_id="ws", collection_name="workspace_ws", chunk_id="c1") == [1.0, 0.0]
+        assert first._chroma_client.lookups == 1
+
+        first.delete_collection(workspace_id="ws", collection_name="workspace_ws")
+        assert first.get_chunk_vector(workspace_id="ws", collection_name="workspace_ws", chunk_id="c1") is None
+        assert first._chroma_client.lookups == 2
+    finally:
+        chromadb_store.reset_chroma_clients_for_tests()
+
+
+def test_chroma_vector_store_retries_only_stale_collection_errors(tmp_path: Path):
+    chromadb = pytest.importorskip("chromadb")
+
+    from app.rag.providers import chromadb_store
+    from app.rag.schemas import ChunkPayload
+
+    chromadb_store.reset_chroma_clients_for_tests()
+    try:
+        store = chromadb_store.ChromaVectorStore(persist_dir=str(tmp_path), collection_prefix="t")
+        if store._chroma_client is None:
+            pytest.skip("chromadb client is unavailable")
+        payload = ChunkPayload(chunk_id="c1", text="alpha", metadata={"document_id": 1})
+        store.upsert_chunks(workspace_id="ws", collection_name="workspace_ws", chunk_payloads=[payload], vectors=[[1.0, 0.0]])
+
+        key = store._collection_key("ws", "workspace_ws")
+        store._chroma_client.delete_collection(name=key)
+        store.upsert_chunks(workspace_id="ws", collection_name="workspace_ws", chunk_payloads=[payload], vectors=[[0.0, 1.0]])
+        assert store.get_chunk_vector(workspace_id="ws", collection_name="workspace_ws", chunk_id="c1") == [0.0, 1.0]
+
+        attempts: list[int] = []
+
+        def _mismatched_upsert(collection):
+            attempts.append(1)
+            return collection.upsert(ids=["c2"], embeddings=[[1.0, 0.0, 0.0]], documents=["beta"], metadatas=[{"document_id": 2}])
+
+        with pytest.raises(chromadb.errors.ChromaError):
+            store._run_on_collection(key, _mismatched_upsert)
+        assert len(attempts) == 1
+        assert key in store._collections
+    finally:
+        chromadb_store.reset_chroma_clients_for_tests()
+
+
+def test_fallback_vector_store_matrix_search_matches_exact_cosine_ranking(tmp_path: Path, monkeypatch):
+    import random
+
+    from app.rag.providers import chromadb_store
+    from app.rag.schemas import ChunkPayload
+
+    monkeypatch.setattr(chromadb_store, "_get_chroma_client", lambda persist_dir: None)
+    chromadb_store.reset_chroma_clients_for_tests()
+    try:
+        store = chromadb_store.ChromaVectorStore(persist_dir=str(tmp_path), collection_prefix="t")
+        rng = random.Random(7)
+        payloads = []
+        vectors = []
+        for index in range(300):
+            payloads.append(
+                ChunkPayload(
+                    chunk_id=f"chunk-{index}",
+                    text=f"text {index}",
+                    metadata={"document_id": index % 3, "source": "a.txt"},
+                )
+            )
+            vectors.append([rng.uniform(-1.0, 1.0) for _ in range(16)])
+        vectors[5] = list(vectors[4])
+        store.upsert_chunks(workspace_id="ws", collection_name="workspace_ws", chunk_payloads=payloads, vectors=vectors)
+
+        query_vector = [rng.uniform(-1.0, 1.0) for _ in range(16)]
+        for filters in ({}, {"document_id": 1}):
+            expected = sorted(
+                (
+                    (chromadb_store._cosine_similarity(query_vector, vector), payload.chunk_id)
+                    for payload, vector in zip(payloads, vectors)
+                    if all(payload.metadata.get(k) == v for k, v in filters.items())
+                ),
+                key=lambda item: item[0],
+                reverse=True,
+            )[:10]
+            hits = store.query(
+                workspace_id="ws",
+                collection_name="workspace_ws",
+                query_vector=query_vector,
+                top_k=10,
+                filters=filters,
+            )
+            assert [(hit.score, hit.chunk_id) for hit in hits] == expected
+
+        store.delete_document_chunks(workspace_id="ws", collection_name="workspace_ws", document_id=1)
+        assert store.query(
+            workspace_id="ws",
+            collection_name="workspace_ws",
+            query_vector=query_vector,
+            top_k=10,
+            filters={"document_id": 1},
+        ) == []
+
+        store.delete_chunks(workspace_id="ws", collection_name="workspace_ws", chunk_ids=["chunk-0", "chunk-3", "missing"])
+        remaining = store.query(
+            workspace_id="ws",
+            collection_name="workspace_ws",
+            query_vector=query_vector,
+            top_k=300,
+            filters={"document_id": 0},
+        )
+        assert {"chunk-0", "chunk-3"}.isdisjoint(hit.chunk_id for hit in remaining)
+        assert len(remaining) == 98
+    finally:
+        chromadb_store.reset_chroma_clients_for_tests()
+
+
+def test_fallback_vector_log_recovers_torn_writes_and_compacts(tmp_path: Path, monkeypatch):
+    from app.rag.providers import chromadb_store
+    from app.rag.providers.fallback_wal import FallbackCollectionLog
+    from app.rag.schemas import ChunkPayload
+
+    monkeypatch.setattr(chromadb_store, "_get_chroma_client", lambda persist_dir: None)
+    chromadb_store.reset_chroma_clients_for_tests()
+    legacy_path = tmp_path / "t_ws_workspace_ws.json"
+    legacy_path.write_text(
+        json.dumps(
+            {
+                "vectors": {"legacy": [1.0, 0.0]},
+                "documents": {"legacy": "legacy text"},
+                "metadatas": {"legacy": {"document_id": 9}},
+            }
+        ),
+        encoding="utf-8",
+    )
+    try:
+        store = chromadb_store.ChromaVectorStore(persist_dir=str(tmp_path), collection_prefix="t")
+        for index in range(3):
+            store.upsert_chunks(
+                workspace_id="ws",
+                collection_name="workspace_ws",
+                chunk_payloads=[ChunkPayload(chunk_id=f"c{index}", text=f"t{index}", metadata={"document_id": index})],
+                vectors=[[0.0, 1.0]],
+            )
+        store.delete_document_chunks(workspace_id="ws", collection_name="workspace_ws", document_id=1)
+        assert not legacy_path.exists()
+
+        log_dir = tmp_path / "t_ws_workspace_ws.fallback"
+        segment = sorted(log_dir.glob("segment-*.log"))[-1]
+        with segment.open("ab") as handle:
+            handle.write(b'{"op": "upsert", "items": [["torn"')
+
+        chromadb_store.reset_chroma_clients_for_tests()
+        reloaded = chromadb_store.ChromaVectorStore(persist_dir=str(tmp_path), collection_prefix="t")
+        assert reloaded.get_chunk_vector(workspace_id="ws", collection_name="workspace_ws", chunk_id="legacy") == [1.0, 0.0]
+        assert reloaded.get_chunk_vector(workspace_id="ws", collection_name="workspace_ws", chunk_id="c0") == [0.0, 1.0]
+        assert reloaded.get_chunk_vector(workspace_id="ws", collection_name="workspace_ws", chunk_id="c1") is None
+        assert segment.read_bytes().endswith(b"\n")
+
+        log = FallbackCollectionLog(directory=log_dir)
+        data = log.load()
+        sealed = log.begin_compaction(data)
+        log.finish_compaction(sealed, data)
+        assert len(list(log_dir.glob("snapshot-*.json"))) == 1
+        assert len(list(log_dir.glob("segment-*.log"))) == 1
+        assert set(FallbackCollectionLog(directory=log_dir).load()["vectors"]) == {"legacy", "c0", "c2"}
+    finally:
+        chromadb_store.reset_chroma_clients_for_tests()
+
+
+def test_fallback_vector_log_is_shared_safely_between_processes(tmp_path: Path):
+    from app.rag.providers.fallback_wal import FallbackCollectionLog, apply_record
+
+    log_dir = tmp_path / "shared.fallback"
+
+    def _upsert(chunk_id: str) -> dict:
+        return {"op": "upsert", "items": [[chunk_id, [1.0, 0.0], chunk_id, {"document_id": 1}]]}
+
+    def _write(log: FallbackCollectionLog, data: dict, chunk_id: str) -> None:
+        record = _upsert(chunk_id)
+        log.append(record, data)
+        apply_record(data, record)
+
+    # Two instances stand in for the web process and an index worker: each keeps its own
+    # in-memory view of the manifest, exactly as separate processes would.
+    web = FallbackCollectionLog(directory=log_dir, segment_max_bytes=1)
+    web_data = web.load()
+    worker = FallbackCollectionLog(directory=log_dir, segment_max_bytes=1)
+    worker_data = worker.load()
+
+    _write(web, web_data, "w1")
+    _write(worker, worker_data, "k1")
+    _write(web, web_data, "w2")
+    _write(worker, worker_data, "k2")
+    segments = sorted(path.name for path in log_dir.glob("segment-*.log"))
+    assert len(segments) == len(set(segments)) == 4
+    assert set(worker_data["vectors"]) == {"w1", "k1", "w2", "k2"}
+    assert web.refresh(web_data) is True
+    assert set(web_data["vectors"]) == {"w1", "k1", "w2", "k2"}
+
+    late = FallbackCollectionLog(directory=log_dir)
+    assert set(late.load()["vectors"]) == {"w1", "k1", "w2", "k2"}
+    _write(worker, worker_data, "k3")
+
+    sealed = web.begin_compaction(web_data)
+    _write(worker, worker_data, "k4")
+    web.finish_compaction(sealed, {name: dict(values) for name, values in web_data.items()})
+    assert len(list(log_dir.glob("snapshot-*.json"))) == 1
+
+    _write(worker, worker_data, "k5")
+    expected = {"w1", "k1", "w2", "k2", "k3", "k4", "k5"}
+    assert set(worker_data["vectors"]) == expected
+    assert set(FallbackCollectionLog(directory=log_dir).load()["vectors"]) == expected
+
+
+def test_openai_compatible_embedder_batches_in_order_and_retries_transient_errors(monkeypatch):
+    from urllib import error as urllib_error
+
+    from app.rag.providers import embedding_batcher
+    from app.rag.providers.embedding_batcher import EmbeddingBatchPolicy, plan_embedding_batches
+    from app.rag.providers.langchain_embedder import OpenAICompatibleEmbedder
+
+    assert plan_embedding_batches(["a" * 40] * 5, max_items=2, max_tokens=1000) == [(0, 2), (2, 4), (4, 5)]
+    assert plan_embedding_batches(["a" * 40] * 3, max_items=10, max_tokens=20) == [(0, 2), (2, 3)]
+
+    calls: list[list[str]] = []
+    failures = {"remaining": 1}
+    delays: list[float] = []
+
+    def _fake_urlopen(req, timeout=None):
+        inputs = json.loads(req.data.decode("utf-8"))["input"]
+        calls.append(inputs)
+        if inputs[0] == "t2" and failures["remaining"]:
+            failures["remaining"] -= 1
+            raise urllib_error.HTTPError(req.full_url, 429, "Too Many Requests", {"Retry-After": "0.25"}, None)
+        return _FakeHTTPResponse(
+            {
+                "data": [
+                    {"index": position, "embedding": [1.0, float(text[1:])]}
+                    for position, text in reversed(list(enumerate(inputs)))
+                ]
+            }
+        )
+
+    monkeypatch.setattr("app.rag.providers.langchain_embedder.urllib_request.urlopen", _fake_urlopen)
+    monkeypatch.setattr(embedding_batcher.time, "sleep", delays.append)
+    embedder = OpenAICompatibleEmbedder(
+        model_name="embed",
+        model_version="1",
+        dimension=2,
+        api_key="key",
+        base_url="http://example.test/v1",
+        timeout_seconds=5,
+        batch_policy=EmbeddingBatchPolicy(max_items=2, max_tokens=0, max_in_flight=3),
+    )
+    texts = [f"t{index}" for index in range(5)]
+    vectors = embedder.embed_documents(texts)
+
+    assert [round(vector[1] / vector[0], 6) for vector in vectors] == [0.0, 1.0, 2.0, 3.0, 4.0]
+    assert sorted(len(batch) for batch in calls) == [1, 2, 2, 2]
+    assert delays == [0.25]
+
+    def _fail_bad_request(req, timeout=None):
+        raise urllib_error.HTTPError(req.full_url, 400, "Bad Request", {}, None)
+
+    monkeypatch.setattr("app.rag.providers.langchain_embedder.urllib_request.urlopen", _fail_bad_request)
+    with pytest.raises(embedding_batcher.EmbeddingRequestError):
+        embedder.embed_documents(["t1"])
+    assert delays == [0.25]
+
+
+def test_embedding_retry_skips_auth_and_payload_errors_but_retries_transport_failures():
+    from urllib import error as urllib_error
+
+    from app.rag.providers.embedding_batcher import EmbeddingBatchPolicy, EmbeddingRequestError, call_with_retry
+
+    policy = EmbeddingBatchPolicy(max_items=1, max_tokens=1, max_retries=3)
+    delays: list[float] = []
+
+    def _raise(exc: BaseException):
+        def _call():
+            attempts.append(1)
+            raise exc
+
+        return _call
+
+    for failure in (
+        ValueError("status_code: 401, code: InvalidApiKey, message: Invalid API-key provided."),
+        KeyError("output"),
+        TypeError("'NoneType' object is not subscriptable"),
+    ):
+        attempts: list[int] = []
+        with pytest.raises(type(failure)):
+            call_with_retry(_raise(failure), policy=policy, sleep=delays.append)
+        assert len(attempts) == 1
+
+    attempts = []
+    try:
+        json.loads("{")
+    except json.JSONDecodeError as decode_error:
+        wrapped = EmbeddingRequestError("embedding request failed")
+        wrapped.__cause__ = decode_error
+    with pytest.raises(EmbeddingRequestError):
+        call_with_retry(_raise(wrapped), policy=policy, sleep=delays.append)
+    assert len(attempts) == 1
+    assert delays == []
+
+    for failure in (urllib_error.URLError("connection refused"), TimeoutError("timed out"), ConnectionResetError()):
+        attempts = []
+        with pytest.raises(type(failure)):
+            call_with_retry(_raise(failure), policy=policy, sleep=delays.append)
+        assert len(attempts) == policy.max_retries + 1
+
+
+def test_cached_embedder_reuses_vectors_and_evicts_least_recently_used(tmp_path: Path):
+    from app.rag.providers.embedding_cache import CachedEmbedder, EmbeddingCache
+
+    class _CountingEmbedder:
+        provider_name = "counting"
+        model_name = "count-model"
+        model_version = "1"
+        dimension = 2
+
+        def __init__(self):
+            self.calls: list[list[str]] = []
+
+        def embed_documents(self, texts):
+            self.calls.append(list(texts))
+            return [[float(len(text)), 1.0] for text in texts]
+
+        def embed_query(self, text):
+            return [float(len(text)), 1.0]
+
+    inner = _CountingEmbedder()
+    cache = EmbeddingCache(path=tmp_path / "cache.sqlite3", max_bytes=1024 * 1024)
+    embedder = CachedEmbedder(embedder=inner, cache=cache)
+
+    assert embedder.embed_documents(["alpha", "beta", "alpha"]) == [[5.0, 1.0], [4.0, 1.0], [5.0, 1.0]]
+    assert inner.calls == [["alpha", "beta"]]
+    assert embedder.embed_documents([" alpha ", "gamma"]) == [[5.0, 1.0], [5.0, 1.0]]
+    assert inner.calls[-1] == ["gamma"]
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 4
+    cache.close()
+
+    reopened = EmbeddingCache(path=tmp_path / "cache.sqlite3", max_bytes=220)
+    assert reopened.stats()["bytes"] == 3 * (16 + 64)
+    reopened.put_many(provider="counting", model="count-model", dimension=2, items={"f" * 64: [1.0, 2.0]})
+    assert reopened.stats()["evictions"] >= 2
+    assert reopened.get_many(provider="counting", model="count-model", dimension=2, digests=["f" * 64])
+    reopened.close()
+
+
+def test_cached_embedder_falls_back_to_inner_embedder_when_cache_fails(tmp_path: Path, caplog):
+    from app.rag.providers.embedding_cache import CachedEmbedder, EmbeddingCache
+    from app.rag.providers.langchain_embedder import FakeEmbedder
+
+    inner = FakeEmbedder(model_name="fake-embeddings", model_version="1", dimension=8)
+    cache = EmbeddingCache(path=tmp_path / "cache.sqlite3", max_bytes=1024 * 1024)
+    cache.close()
+    embedder = CachedEmbedder(embedder=inner, cache=cache)
+
+    with caplog.at_level("WARNING"):
+        vectors = embedder.embed_documents(["alpha", "beta"])
+
+    assert vectors == inner.embed_documents(["alpha", "beta"])
+    events = {getattr(record, "event", None) for record in caplog.records}
+    assert {"rag.embedding.cache_read_failed", "rag.embedding.cache_write_failed"} <= events
+
+
+def test_query_embedding_cache_expires_and_evicts_entries():
+    from app.rag.query_cache import QueryEmbeddingCache
+
+    class _Embedder:
+        provider_name = "fake"
+        model_name = "fake-embeddings"
+        model_version = "1"
+        dimension = 2
+
+        def __init__(self):
+            self.calls = 0
+
+        def embed_query(self, text):
+            self.calls += 1
+            return [float(len(text)), 0.0]
+
+    now = {"value": 0.0}
+    cache = QueryEmbeddingCache(max_entries=2, ttl_seconds=10, clock=lambda: now["value"])
+    embedder = _Embedder()
+
+    assert cache.embed_query(embedder, "what is ebitda") == ([14.0, 0.0], False)
+    assert cache.embed_query(embedder, "  what is  ebitda ") == ([14.0, 0.0], True)
+    cache.embed_query(embedder, "second")
+    cache.embed_query(embedder, "third")
+    assert cache.embed_query(embedder, "what is ebitda")[1] is False
+    now["value"] = 11.0
+    assert cache.embed_query(embedder, "what is ebitda")[1] is False
+    assert embedder.calls == 5
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 5
+    assert stats["hitRate"] == round(1 / 6, 4)
+
+
+def test_lexical_tokenizer_splits_cjk_bigrams_and_keeps_codes():
+    from app.rag.lexical_index import tokenize
+
+    tokens = tokenize("贵州茅台 600519.SH 第12条")
+    assert "贵州" in tokens and "州茅" in tokens and "茅台" in tokens
+    assert "600519.sh" in tokens and "600519" in tokens and "sh" in tokens
+    assert "第" in tokens and "12" in tokens and "条" in tokens
+
+
+def test_lexical_index_updates_documents_incrementally(tmp_path: Path):
+    from app.rag.lexical_index import LexicalIndex
+
+    index = LexicalIndex(tmp_path)
+    writer = index.document_writer("ws", 1)
+    writer.add("c1", "贵州茅台 600519.SH 年报")
+    writer.add("c2", "现金流折现模型")
+    writer.commit()
+    other = index.document_writer("ws", 2)
+    other.add("c3", "比亚迪 002594.SZ 年报")
+    other.commit()
+
+    assert [chunk_id for chunk_id, _ in index.search("ws", "600519.SH", limit=5)] == ["c1"]
+    assert {chunk_id for chunk_id, _ in index.search("ws", "年报", limit=5)} == {"c1", "c3"}
+
+    rewrite = index.document_writer("ws", 1)
+    rewrite.add("c4", "现金流折现模型")
+    rewrite.commit()
+    assert index.search("ws", "600519", limit=5) == []
+    assert [chunk_id for chunk_id, _ in index.search("ws", "折现", limit=5)] == ["c4"]
+
+    aborted = index.document_writer("ws", 2)
+    aborted.add("c5", "600519")
+    aborted.abort()
+    index.remove_document("ws", 1)
+    assert index.search("ws", "折现", limit=5) == []
+    assert [chunk_id for chunk_id, _ in index.search("ws", "002594", limit=5)] == ["c3"]
+    assert not index.is_built("ws")
+    index.mark_built("ws")
+    assert index.is_built("ws")
+
+
+def test_reciprocal_rank_fusion_rewards_hits_in_both_rankings():
+    from app.rag.lexical_index import fuse_ranked_hits
+
+    def _hit(chunk_id: str, score: float) -> RetrievalHit:
+        return RetrievalHit(chunk_id=chunk_id, score=score, source="s", page=None, section=None, content=chunk_id, metadata={})
+
+    fused = fuse_ranked_hits([[_hit("a", 0.9), _hit("b", 0.8)], [_hit("b", 12.0), _hit("c", 3.0)]], k=60)
+    assert [hit.chunk_id for hit in fused] == ["b", "a", "c"]
+    assert fused[0].score == pytest.approx(1 / 62 + 1 / 61)
+    assert fused[1].score == pytest.approx(1 / 61)
+
+
+def test_retrievable_chunk_cache_checks_version_stamp(tmp_path: Path):
+    from app.rag.retrievable_cache import RetrievableChunkCache, bump_stamp, read_stamp
+
+    stamp_path = tmp_path / "ws.version"
+    stamp = read_stamp(stamp_path)
+    assert stamp and read_stamp(stamp_path) == stamp
+
+    cache = RetrievableChunkCache(max_workspaces=1)
+    key = (str(tmp_path), 1, "ws")
+    assert cache.get(key, stamp=stamp) is None
+    assert cache.begin_warm(key) is True
+    assert cache.begin_warm(key) is False
+    cache.finish_warm(key, stamp=stamp, chunk_ids=frozenset({"c1", "c2"}))
+    assert cache.get(key, stamp=stamp) == frozenset({"c1", "c2"})
+
+    bump_stamp(stamp_path)
+    assert read_stamp(stamp_path) != stamp
+    assert cache.get(key, stamp=read_stamp(stamp_path)) is None
+
+    cache.finish_warm(key, stamp="a", chunk_ids=frozenset({"c1"}))
+    cache.finish_warm((str(tmp_path), 2, "ws"), stamp="b", chunk_ids=frozenset({"c3"}))
+    assert cache.get(key, stamp="a") is None
+    assert cache.stats()["size"] == 1
+    assert RetrievableChunkCache(max_workspaces=0).begin_warm(key) is False
+
+
+def test_query_log_writer_batches_drops_overflow_and_flushes_on_close(monkeypatch):
+    from contextlib import contextmanager
+
+    from flask import Flask
+
+    from app.rag import query_log_writer
+    from app.rag.query_log_writer import QueryLogWriter
+
+    batches: list[list[dict]] = []
+
+    @contextmanager
+    def _session_scope():
+        yield None
+
+    monkeypatch.setattr(query_log_writer, "session_scope", _session_scope)
+    monkeypatch.setattr(query_log_writer, "insert_query_logs", lambda *, db, rows: batches.append(list(rows)))
+
+    writer = QueryLogWriter(Flask("app"), max_queue=3, batch_size=2, flush_interval_seconds=60)
+    assert [writer.submit({"query_text": f"q{index}"}) for index in range(4)] == [True, True, True, False]
+    writer.flush()
+    assert batches == [[{"query_text": "q0"}, {"query_text": "q1"}], [{"query_text": "q2"}]]
+
+    writer.start()
+    writer.submit({"query_text": "q4"})
+    writer.close(timeout=5)
+    assert batches[-1] == [{"query_text": "q4"}]
+    assert writer.stats() == {"queued": 0, "maxQueue": 3, "written": 4, "dropped": 1, "failed": 0}
+
+
+def test_segment_embedding_unit_emits_one_payload_per_segment_with_sentence_offsets():
+    from app.rag.errors import RAGValidationError
+    from app.rag.pipeline.chunking import (
+        paragraph_blocks_to_semantic_segments,
+        parse_sentence_offsets,
+        resolve_chunking_plan,
+        semantic_segments_to_payloads,
+    )
+
+    config = {"RAG_CHUNK_STRATEGY_ALLOWED": ("paragraph", "semantic_llm"), "RAG_CHUNK_EMBEDDING_UNIT": "sentence"}
+    assert resolve_chunking_plan(payload=None, config=config).request.embedding_unit == "sentence"
+    plan = resolve_chunking_plan(payload={"chunking": {"embeddingUnit": "Segment"}}, config=config)
+    assert plan.request.embedding_unit == "segment"
+    with pytest.raises(RAGValidationError):
+        resolve_chunking_plan(payload={"chunking": {"embeddingUnit": "page"}}, config=config)
+
+    text = "第一句讲收入。第二句讲利润。第三句讲现金流。"
+    segments = paragraph_blocks_to_semantic_segments(blocks=[{"text": text, "metadata": {}}], source_name="s.txt")
+    sentence_payloads = semantic_segments_to_payloads(
+        segments=segments, document_id=7, source_name="s.txt", strategy="paragraph", version="v1"
+    )
+    segment_payloads = semantic_segments_to_payloads(
+        segments=segments,
+        document_id=7,
+        source_name="s.txt",
+        strategy="paragraph",
+        version="v1",
+        embedding_unit="segment",
+    )
+    assert len(sentence_payloads) == 3
+    assert len(segment_payloads) == 1
+    payload = segment_payloads[0]
+    assert payload.text == text
+    assert payload.chunk_id not in {item.chunk_id for item in sentence_payloads}
+    assert payload.metadata["semantic_segment_id"] == sentence_payloads[0].metadata["semantic_segment_id"]
+    offsets = parse_sentence_offsets(payload.metadata)
+    assert [text[start:end] for start, end in offsets] == [item.text for item in sentence_payloads]
+
+
+def test_openai_semantic_provider_segments_overlapping_windows_concurrently_with_cache(monkeypatch):
+    from threading import Lock
+
+    from app.rag.providers.semantic_chunking_provider import SemanticWindowCache, plan_block_windows
+
+    windows = plan_block_windows([{"text": "x" * 10} for _ in range(5)], max_chars=25, overlap_blocks=1)
+    assert [(item.start, item.end) for item in windows] == [(0, 2), (1, 3), (2, 4), (3, 5)]
+    assert [(item.own_start, item.own_end) for item in windows] == [(0, 2), (2, 3), (3, 4), (4, 5)]
+
+    calls: list[list[str]] = []
+    calls_lock = Lock()
+
+    def _fake_urlopen(req, timeout):
+        prompt = json.loads(req.data.decode("utf-8"))["messages"][1]["content"]
+        window_blocks = json.loads(prompt.split("Blocks: ", 1)[1])
+        with calls_lock:
+            calls.append([block["text"] for block in window_blocks])
+        segments = [
+            {"text": block["text"].split("。")[0] + "。", "block_index": block["block_index"], "metadata": {}}
+            for block in window_blocks
+        ]
+        return _FakeHTTPResponse(
+            {"choices": [{"message": {"content": json.dumps({"segments": segments}, ensure_ascii=False)}}]}
+        )
+
+    monkeypatch.setattr("app.rag.providers.semantic_chunking_provider.urllib_request.urlopen", _fake_urlopen)
+    provider = OpenAICompatibleSemanticChunkingProvider(
+        model_name="semantic-chunker-v1",
+        api_key="test-key",
+        base_url="http://example.test",
+        timeout_seconds=5,
+        window_max_chars=20,
+        window_overlap_blocks=1,
+        max_workers=3,
+        cache=SemanticWindowCache(max_entries=16),
+    )
+    blocks = [{"text": f"第{index}块的第一句。第二句。", "metadata": {"page": index}} for index in range(6)]
+
+    segments = provider.segment(strategy="semantic_llm", source_name="long.txt", blocks=blocks)
+    assert [segment.metadata["block_index"] for segment in segments] == list(range(6))
+    assert [segment.text for segment in segments] == [f"第{index}块的第一句。" for index in range(6)]
+    assert all(segment.metadata["page"] == segment.metadata["block_index"] for segment in segments)
+    assert len(calls) > 1
+    assert all(len(window) <= 2 for window in calls)
+
+    request_count = len(calls)
+    again = provider.segment(strategy="semantic_llm", source_name="renamed.txt", blocks=blocks)
+    assert len(calls) == request_count
+    assert [segment.text for segment in again] == [segment.text for segment in segments]
+    assert all(segment.metadata["source"] == "renamed.txt" for segment in again)
+
+
+def test_segment_aligner_matches_reflowed_segments_in_one_forward_pass():
+    from app.rag.providers.semantic_chunking_provider import SegmentAligner
+
+    sentences = [f"第{index}条  甲方应当在\n合同生效后{index}日内付款。" for index in range(200)]
+    block_text = " ".join(sentences)
+    aligner = SegmentAligner([{"text": "无关内容。"}, {"text": block_text}])
+
+    previous_end = 0
+    for sentence in sentences:
+        matched = aligner.align(" ".join(sentence.split()), hinted_block_index=1)
+        assert matched is not None
+        block_index, start, end = matched
+        assert block_index == 1
+        assert block_text[start:end] == sentence
+        assert start >= previous_end
+        previous_end = end
+
+    assert aligner.align("第0条 甲方应当在 合同生效后0日内付款。") == (1, 0, len(sentences[0]))
+    assert aligner.align("无关内容。") == (0, 0, 5)
+    assert aligner.align("不存在的句子") is None
+
+
+def test_embedding_similarity_provider_cuts_at_similarity_drops_within_bounds():
+    from app.rag.providers.semantic_chunking_provider import EmbeddingSimilaritySemanticChunkingProvider
+    from app.rag.schemas import ChunkingBounds
+
+    class _TopicEmbedder:
+        provider_name = "topic"
+        model_name = "topic-embedder"
+        model_version = "1"
+        dimension = 3
+
+        def __init__(self) -> None:
+            self.batches: list[int] = []
+
+        def embed_documents(self, texts: list[str]) -> list[list[float]]:
+            self.batches.append(len(texts))
+            return [[1.0, 0.1, 0.0] if "付款" in text else [0.0, 0.1, 1.0] for text in texts]
+
+        def embed_query(self, text: str) -> list[float]:
+            return self.embed_documents([text])[0]
+
+    embedder = _TopicEmbedder()
+    provider = EmbeddingSimilaritySemanticChunkingProvider(embedder=embedder, breakpoint_percentile=50, batch_size=2)
+    block_text = "甲方付款一次。乙方付款两次。 合同期限一年。\n期限可以续展。"
+    blocks = [{"text": block_text, "metadata": {"page": 1}}, {"text": "违约责任。", "metadata": {"page": 2}}]
+
+    segments = provider.segment(strategy="semantic_llm", source_name="contract.txt", blocks=blocks)
+    assert [segment.text for segment in segments] == ["甲方付款一次。乙方付款两次。", "合同期限一年。\n期限可以续展。", "违约责任。"]
+    assert [segment.metadata["block_index"] for segment in segments] == [0, 0, 1]
+    for segment in segments:
+        block = blocks[segment.metadata["block_index"]]
+        assert block["text"][segment.metadata["offset_start"] : segment.metadata["offset_end"]] == segment.text
+    assert segments[0].metadata["page"] == 1 and segments[0].metadata["source"] == "contract.txt"
+    assert embedder.batches == [2, 2, 1]
+
+    bounded = provider.segment(
+        strategy="semantic_llm",
+        source_name="contract.txt",
+        blocks=blocks,
+        bounds=ChunkingBounds(target_tokens=1, max_tokens=1, overlap_tokens=0, min_tokens=1),
+    )
+    assert [segment.text for segment in bounded] == ["甲方付款一次。", "乙方付款两次。", "合同期限一年。", "期限可以续展。", "违约责任。"]
+
+    merged = provider.segment(
+        strategy="semantic_llm",
+        source_name="contract.txt",
+        blocks=blocks,
+        bounds=ChunkingBounds(target_tokens=3, max_tokens=100, overlap_tokens=0, min_tokens=3),
+    )
+    assert [segment.text for segment in merged] == [block_text, "违约责任。"]
+
+
+def test_embedding_similarity_provider_chunks_with_fake_embedder(app, tmp_path: Path):
+    from app.rag.providers.semantic_chunking_provider import EmbeddingSimilaritySemanticChunkingProvider
+
+    app.config["RAG_CHUNK_AI_PROVIDER"] = "embedding"
+    app.config["RAG_CHUNK_STRATEGY_ALLOWED"] = ("paragraph", "semantic_llm")
+    sample = tmp_path / "embedding-semantic.txt"
+    sample.write_text("第一段。第二段。第三段。第四段。第五段。", encoding="utf-8")
+    with app.app_context():
+        semantic_provider = get_semantic_chunking_provider()
+        payloads, applied = parse_and_chunk_document(
+            file_path=str(sample),
+            extension="txt",
+            document_id=99,
+            source_name="embedding-semantic.txt",
+            chunker=get_chunker(),
+            semantic_provider=semantic_provider,
+            chunking_request=ChunkingRequest(
+                strategy="semantic_llm",
+                version="v2",
+                target_tokens=20,
+                max_tokens=40,
+                overlap_tokens=0,
+                min_tokens=4,
+            ),
+            chunk_size=1200,
+            overlap=150,
+        )
+        payloads = list(payloads)
+    assert isinstance(semantic_provider, EmbeddingSimilaritySemanticChunkingProvider)
+    assert applied.fallback_used is False
+    assert applied.provider == "embedding-similarity"
+    assert payloads
+
+
+def test_rag_lexical_search_is_scoped_per_user_in_shared_workspace_id(client, app, db_session):
+    app.config["RAG_ENABLED"] = True
+    app.config["RAG_AUTO_INDEX_ON_UPLOAD"] = False
+
+    crowding_user = _create_user(db_session, "rag-lexical-crowd@example.com")
+    crowding_headers = _auth_headers(client, crowding_user.id)
+    for index in range(4):
+        upload_payload = _upload_text_document(
+            client, crowding_headers, "default", f"crowd-{index}.txt", f"合同编号 HT-2024-001 第{index}份副本。"
+        )
+        _index_document(client, crowding_headers, "default", int(upload_payload["id"]))
+
+    owner = _create_user(db_session, "rag-lexical-owner@example.com")
+    owner_headers = _auth_headers(client, owner.id)
+    upload_payload = _upload_text_document(client, owner_headers, "default", "owner.txt", "本人合同编号 HT-2024-001。")
+    _index_document(client, owner_headers, "default", int(upload_payload["id"]))
+
+    response = client.post(
+        "/api/rag/search",
+        json={"workspaceId": "default", "query": "HT-2024-001", "topK": 1, "mode": "lexical"},
+        headers=owner_headers,
+    )
+    assert response.status_code == 200
+    chunks = response.get_json()["data"]["chunks"]
+    assert [chunk["source"] for chunk in chunks] == ["owner.txt"]
+
+
+def test_rag_lexical_search_applies_filters_before_the_candidate_cut(client, app, db_session):
+    app.config["RAG_ENABLED"] = True
+    app.config["RAG_AUTO_INDEX_ON_UPLOAD"] = False
+
+    user = _create_user(db_session, "rag-lexical-filter@example.com")
+    headers = _auth_headers(client, user.id)
+    for index in range(6):
+        crowd = _upload_text_document(
+            client, headers, "ws-lexical-filter", f"crowd-{index}.txt", "HT-2024-001 HT-2024-001 HT-2024-001"
+        )
+        _index_document(client, headers, "ws-lexical-filter", int(crowd["id"]))
+    target = _upload_text_document(
+        client,
+        headers,
+        "ws-lexical-filter",
+        "target.txt",
+        "附件列出了合同编号 HT-2024-001 以及其他很多与本次检索无关的条款和说明文字。",
+    )
+    _index_document(client, headers, "ws-lexical-filter", int(target["id"]))
+
+    response = client.post(
+        "/api/rag/search",
+        json={
+            "workspaceId": "ws-lexical-filter",
+            "query": "HT-2024-001",
+            "topK": 1,
+            "mode": "lexical",
+            "filters": {"document_id": int(target["id"])},
+        },
+        headers=headers,
+    )
+    assert response.status_code == 200
+    chunks = response.get_json()["data"]["chunks"]
+    assert [chunk["source"] for chunk in chunks] == ["target.txt"]
+
+
+def test_lexical_hits_do_not_mix_users_sharing_a_workspace_id(tmp_path: Path):
+    from flask import Flask
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from app.models import Base, RagChunk, RagDocument
+    from app.rag.lexical_index import reset_lexical_indexes_for_tests
+    from app.rag.service import _lexical_hits
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    flask_app = Flask(__name__)
+    flask_app.config["RAG_UPLOAD_DIR"] = str(tmp_path / "rag_uploads")
+    flask_app.extensions["db_sessionmaker"] = sessionmaker(bind=engine, expire_on_commit=False, future=True)
+
+    def _add_document(db, *, document_id: int, user_id: int, text: str) -> None:
+        db.add(
+            RagDocument(
+                id=document_id,
+                user_id=user_id,
+                workspace_id="default",
+                source_name=f"doc-{document_id}.txt",
+                file_name=f"doc-{document_id}.txt",
+                file_extension="txt",
+                mime_type="text/plain",
+                storage_path=f"/tmp/doc-{document_id}.txt",
+                status="indexed",
+            )
+        )
+        db.add(
+            RagChunk(
+                document_id=document_id,
+                user_id=user_id,
+                workspace_id="default",
+                chunk_id=f"chunk-{document_id}",
+                content=text,
+                source=f"doc-{document_id}.txt",
+                metadata_json={},
+                embedding_model="fake",
+                embedding_version="1",
+                embedding_dimension=8,
+            )
+        )
+
+    reset_lexical_indexes_for_tests()
+    with flask_app.app_context():
+        with flask_app.extensions["db_sessionmaker"]() as db:
+            for document_id in range(1, 5):
+                _add_document(db, document_id=document_id, user_id=1, text=f"合同编号 HT-2024-001 副本{document_id}")
+            _add_document(db, document_id=5, user_id=2, text="本人合同编号 HT-2024-001")
+            db.commit()
+
+        owner_hits = _lexical_hits(user_id=2, workspace_id="default", query="HT-2024-001", limit=1, filters={})
+        crowd_hits = _lexical_hits(user_id=1, workspace_id="default", query="HT-2024-001", limit=10, filters={})
+
+    assert [hit.chunk_id for hit in owner_hits] == ["chunk-5"]
+    assert sorted(hit.chunk_id for hit in crowd_hits) == [f"chunk-{index}" for index in range(1, 5)]
+    reset_lexical_indexes_for_tests()
+
+
+def test_lexical_hits_apply_filters_beyond_the_first_ranked_window(tmp_path: Path):
+    from flask import Flask
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from app.models import Base, RagChunk, RagDocument
+    from app.rag.lexical_index import reset_lexical_indexes_for_tests
+    from app.rag.service import _lexical_hits
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    flask_app = Flask(__name__)
+    flask_app.config["RAG_UPLOAD_DIR"] = str(tmp_path / "rag_uploads")
+    flask_app.extensions["db_sessionmaker"] = sessionmaker(bind=engine, expire_on_commit=False, future=True)
+
+    reset_lexical_indexes_for_tests()
+    with flask_app.app_context():
+        with flask_app.extensions["db_sessionmaker"]() as db:
+            for document_id in range(1, 62):
+                text = "合同编号 HT-2024-001 HT-2024-001" if document_id < 61 else "附录：合同编号 HT-2024-001 及其他无关条款说明"
+                db.add(
+                    RagDocument(
+                        id=document_id,
+                        user_id=1,
+                        workspace_id="default",
+                        source_name=f"doc-{document_id}.txt",
+                        file_name=f"doc-{document_id}.txt",
+                        file_extension="txt",
+                        mime_type="text/plain",
+                        storage_path=f"/tmp/doc-{document_id}.txt",
+                        status="indexed",
+                    )
+                )
+                db.add(
+                    RagChunk(
+                        document_id=document_id,
+                        user_id=1,
+                        workspace_id="default",
+                        chunk_id=f"chunk-{document_id}",
+                        content=text,
+                        source=f"doc-{document_id}.txt",
+                        metadata_json={"document_id": document_id},
+                        embedding_model="fake",
+                        embedding_version="1",
+                        embedding_dimension=8,
+                    )
+                )
+            db.commit()
+
+        filtered = _lexical_hits(user_id=1, workspace_id="default", query="HT-2024-001", limit=50, filters={"document_id": 61})
+        unfiltered = _lexical_hits(user_id=1, workspace_id="default", query="HT-2024-001", limit=50, filters={})
+
+    assert [hit.chunk_id for hit in filtered] == ["chunk-61"]
+    assert len(unfiltered) == 50
+    assert "chunk-61" not in {hit.chunk_id for hit in unfiltered}
+    reset_lexical_indexes_for_tests()
+
+
+def test_claim_index_job_reclaims_running_jobs_without_a_lease(tmp_path: Path):
+    from flask import Flask
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from app.models import Base, RagDocument, RagIndexJob
+    from app.rag.job_queue import claim_index_job
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    flask_app = Flask(__name__)
+    flask_app.config["RAG_UPLOAD_DIR"] = str(tmp_path / "rag_uploads")
+    flask_app.extensions["db_sessionmaker"] = sessionmaker(bind=engine, expire_on_commit=False, future=True)
+
+    with flask_app.app_context():
+        with flask_app.extensions["db_sessionmaker"]() as db:
+            db.add(
+                RagDocument(
+                    id=1,
+                    user_id=1,
+                    workspace_id="ws-legacy",
+                    source_name="legacy.txt",
+                    file_name="legacy.txt",
+                    file_extension="txt",
+                    mime_type="text/plain",
+                    storage_path="/tmp/legacy.txt",
+                    status="indexing",
+                )
+            )
+            db.add(RagIndexJob(id=1, document_id=1, user_id=1, workspace_id="ws-legacy", status="running"))
+            db.commit()
+
+        claimed = claim_index_job(worker_id="worker-b", lease_seconds=60, max_attempts=3)
+
+    assert claimed is not None
+    assert claimed.job_id == 1
+    assert claimed.attempts == 1
+
+
+def test_load_hit_segment_texts_resolves_segment_unit_hits_from_content(tmp_path: Path):
+    from flask import Flask
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from app.models import Base, RagDocument
+    from app.rag.service import load_hit_segment_texts
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    flask_app = Flask(__name__)
+    flask_app.config["RAG_UPLOAD_DIR"] = str(tmp_path / "rag_uploads")
+    flask_app.extensions["db_sessionmaker"] = sessionmaker(bind=engine, expire_on_commit=False, future=True)
+
+    with flask_app.app_context():
+        with flask_app.extensions["db_sessionmaker"]() as db:
+            db.add(
+                RagDocument(
+                    id=1,
+                    user_id=1,
+                    workspace_id="default",
+                    source_name="doc.txt",
+                    file_name="doc.txt",
+                    file_extension="txt",
+                    mime_type="text/plain",
+                    storage_path="/tmp/doc.txt",
+                    status="indexed",
+                )
+            )
+            db.add(
+                RagSemanticSegment(
+                    document_id=1,
+                    user_id=1,
+                    workspace_id="default",
+                    segment_id="sentence-seg",
+                    text="第一句。第二句。",
+                )
+            )
+            db.commit()
+
+        hits = [
+            RetrievalHit(
+                chunk_id="c-1",
+                score=0.9,
+                source="doc.txt",
+                page=None,
+                section=None,
+                content="整段内容。",
+                metadata={"semantic_segment_id": "unit-seg", "embedding_unit": "segment"},
+            ),
+            RetrievalHit(
+                chunk_id="c-2",
+                score=0.8,
+                source="doc.txt",
+                page=None,
+                section=None,
+                content="第一句。",
+                metadata={"semantic_segment_id": "sentence-seg"},
+            ),
+        ]
+        segment_texts = load_hit_segment_texts(user_id=1, workspace_id="default", hits=hits)
+
+    assert segment_texts == {"unit-seg": "整段内容。", "sentence-seg": "第一句。第二句。"}
+
+
+def test_agent_rag_tool_returns_each_segment_text_once(monkeypatch):
+    from flask import Flask
+
+    from app.agent.graph.nodes import _extract_segment_context
+    from app.agent.tools import AgentToolContext
+    from app.agent.tools import rag as rag_tool_module
+
+    hits = [
+        RetrievalHit(
+            chunk_id=f"c-{index}",
+            score=1.0 - index / 10,
+            source="doc.txt",
+            page=None,
+            section=None,
+            content=f"第{index}句。",
+            metadata={"semantic_segment_id": "seg-1", "semantic_sentence_index": index},
+        )
+        for index in range(3)
+    ]
+    monkeypatch.setattr(rag_tool_module, "rag_search", lambda **kwargs: hits)
+    monkeypatch.setattr(
+        rag_tool_module,
+        "load_hit_segment_texts",
+        lambda **kwargs: {"seg-1": "第0句。第1句。第2句。"},
+    )
+
+    flask_app = Flask(__name__)
+    flask_app.config["RAG_ENABLED"] = True
+    tool = rag_tool_module.create_rag_search_tool(AgentToolContext(user_id=1, workspace_id="ws"))
+    with flask_app.app_context():
+        result = tool.invoke(query="句")
+
+    assert result["segments"] == {"seg-1": "第0句。第1句。第2句。"}
+    assert all("text" not in chunk["semantic_segment"] for chunk in result["chunks"])
+    assert _extract_segment_context(result["chunks"][1], result["segments"]) == ("seg-1", "第0句。第1句。第2句。")